@@ -1,15 +1,22 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, Header, HTTPException, Query, Response
+from pydantic import BaseModel, Field
 from typing import List, Optional
-import json
 import logging
-from app.engine.index import get_index
-from llama_index.core.settings import Settings
-from app.api.services.activity_generator import ActivityGenerator, OUTPUT_DIR
+from app.engine.index import aget_index
+from app.engine.llm import acomplete, parse_json_response
+from app.engine.retrieval import aget_retriever, aretrieve_context
+from app.api.services.artifacts import document_download, get_artifact_store
+from app.api.services.class_set import MAX_VARIANTS
+from app.api.services.renderer import document_filename
+from app.api.services.generation_cache import CachePolicy, cached_generation, lookup_generation
+from app.api.services.streaming import sse_response, stream_json_generation
 
 activity_router = APIRouter()
 logger = logging.getLogger("uvicorn")
 
+# Incrementar sempre que o prompt mudar, para invalidar o cache de geração
+PROMPT_VERSION = "1"
+
 class ActivityRequest(BaseModel):
     disciplina: str
     assunto: str
@@ -23,112 +30,212 @@ class ActivityResponse(BaseModel):
 
 from llama_index.core.vector_stores import MetadataFilter, MetadataFilters
 
+async def build_activity_prompt(request: ActivityRequest) -> str:
+    """Recupera o contexto (BNCC/CIEB) e monta o prompt da atividade."""
+    index = await aget_index()
+    if index is None:
+        # Fallback: proceed without retrieval if necessary, or just warn
+        # raise HTTPException(status_code=500, detail="Index not initialized")
+        logger.warning("Index not initialized for activity generation")
+        retriever = None
+        context_text = ""
+    else:
+        # Filtros: Queremos Atividades (CIEB) e Alinhamento (BNCC)
+        filters = MetadataFilters(
+            filters=[
+                MetadataFilter(key="category", value="normativa"), # BNCC
+                MetadataFilter(key="category", value="apoio"),     # CIEB
+            ],
+            condition="or"
+        )
+
+        retriever = await aget_retriever(
+            index,
+            similarity_top_k=5,
+            filters=filters
+        )
+        query = (
+            f"Habilidades e competências da BNCC para "
+            f"{request.nivel}, disciplina {request.disciplina}, "
+            f"sobre o tema {request.assunto}."
+        )
+        context_text = await aretrieve_context(retriever, query)
+
+    prompt = (
+        f"Você é um professor de {request.disciplina} experiente no Ensino Básico.\n"
+        f"Sua tarefa é criar uma Atividade Avaliativa sobre '{request.assunto}' para alunos do {request.nivel}.\n\n"
+        "DIRETRIZES DE QUALIDADE (IMPORTANTE):\n"
+        "1. ADEQUAÇÃO AO NÍVEL: A linguagem e a dificuldade devem ser ACESSÍVEIS para a série solicitada. Evite termos acadêmicos ou questões complexas demais.\n"
+        "2. FOCO NA DISCIPLINA: A atividade deve ser sobre a matéria solicitada. Se for Matemática, foque em Matemática. Se for História, foque em História. NÃO force temas de tecnologia se não fizer sentido.\n"
+        "3. SEM ALUCINAÇÕES: Não invente nomes de empresas, escolas ou softwares fictícios (ex: 'Escola ConectaTech', 'App MathLife'). Use contextos reais ou genéricos.\n"
+        "4. TEXTO DE APOIO OPCIONAL: Se ALGUMA questão usar a expressão 'Segundo o texto' (ou variações de maiúsculas/minúsculas), você DEVE preencher o campo 'content' com um texto curto de apoio (máx. 2 parágrafos). Esse texto será exibido ANTES das questões e deve conter, de forma explícita, as informações necessárias para responder às perguntas que começam com 'Segundo o texto'.\n"
+        "5. Se NENHUMA questão usar a expressão 'Segundo o texto', o campo 'content' deve ser uma string vazia (\"\") e as questões não podem depender de um texto de apoio externo.\n"
+        "6. BNCC E CIEB COMO BASE: Use o contexto abaixo (que pode conter normas da BNCC e exemplos do CIEB) para alinhar as habilidades e inspirar as questões.\n\n"
+        "Contexto (BNCC/CIEB):\n"
+        f"{context_text}\n\n"
+        "Estrutura da Atividade:\n"
+        "1. Texto de Apoio (campo 'content'): Curto, direto e fácil de ler (máx. 2 parágrafos). Só deve ser preenchido se houver questões com 'Segundo o texto'.\n"
+        "2. Questões: 5 questões de múltipla escolha. Devem ser claras e objetivas.\n"
+        "3. Alternativas: Simples e diretas.\n\n"
+        "A saída deve ser EXATAMENTE um JSON válido com a seguinte estrutura:\n"
+        "{\n"
+        '  "title": "Título Criativo da Atividade",\n'
+        '  "objective": "Objetivo pedagógico da atividade (em 1 parágrafo)",\n'
+        '  "bncc_skills": [\n'
+        '    "Código(s) e descrição(ões) da(s) habilidade(s) da BNCC usadas"\n'
+        "  ],\n"
+        '  "content": "Um texto de apoio curto e direto OU string vazia se nenhuma questão usar \\"Segundo o texto\\".",\n'
+        '  "questions": [\n'
+        "    {\n"
+        '      "enunciado": "Enunciado da questão 1 (pode começar com \\"Segundo o texto\\" se fizer sentido)",\n'
+        '      "alternativas": [\n'
+        '        "A) alternativa A",\n'
+        '        "B) alternativa B",\n'
+        '        "C) alternativa C",\n'
+        '        "D) alternativa D"\n'
+        "      ],\n"
+        '      "correta": "A"\n'
+        "    },\n"
+        "    {\n"
+        '      "enunciado": "Enunciado da questão 2",\n'
+        '      "alternativas": [\n'
+        '        "A) alternativa A",\n'
+        '        "B) alternativa B",\n'
+        '        "C) alternativa C",\n'
+        '        "D) alternativa D"\n'
+        "      ],\n"
+        '      "correta": "C"\n'
+        "    }\n"
+        "  ]\n"
+        "}\n\n"
+        "Não inclua markdown ```json ... ```; responda apenas com o JSON puro.\n"
+    )
+    return prompt
+
+
+async def generate_activity_content(request: ActivityRequest) -> dict:
+    """Gera o JSON da atividade com o LLM."""
+    response = await acomplete(await build_activity_prompt(request))
+    return parse_json_response(response.text)
+
+
+async def build_activity_response(request: ActivityRequest, activity_data: dict) -> ActivityResponse:
+    """Gera o arquivo (PDF ou DOCX) da atividade e monta a resposta."""
+    fmt = "docx" if request.format.lower() == "docx" else "pdf"
+    artifact = await get_artifact_store().get_or_render("activity", fmt, activity_data)
+    return ActivityResponse(
+        download_url=artifact.url,
+        filename=artifact.filename,
+        content=activity_data
+    )
+
+
+async def get_activity_content(request: ActivityRequest, policy: CachePolicy = CachePolicy()):
+    """Gera (ou lê do cache) o conteúdo da atividade. Devolve `(conteúdo, veio_do_cache)`."""
+    return await cached_generation(
+        "activity",
+        request.model_dump(exclude={"format"}),
+        PROMPT_VERSION,
+        lambda: generate_activity_content(request),
+        policy,
+    )
+
+
+async def run_activity(request: ActivityRequest, policy: CachePolicy = CachePolicy()):
+    """Gera (ou lê do cache) o conteúdo da atividade e o arquivo. Devolve `(resposta, veio_do_cache)`."""
+    activity_data, cache_hit = await get_activity_content(request, policy)
+    return await build_activity_response(request, activity_data), cache_hit
+
+
+async def activity_job(payload: dict) -> dict:
+    response, _ = await run_activity(ActivityRequest(**payload))
+    return response.model_dump()
+
+
 @activity_router.post("/generate", response_model=ActivityResponse)
-async def generate_activity(request: ActivityRequest):
+async def generate_activity(
+    request: ActivityRequest,
+    response: Response,
+    cache_control: Optional[str] = Header(None),
+    download: bool = Query(False, description="Devolve o arquivo direto, sem gravar em disco"),
+):
     try:
-        index = get_index()
-        if index is None:
-             # Fallback: proceed without retrieval if necessary, or just warn
-             # raise HTTPException(status_code=500, detail="Index not initialized")
-             logger.warning("Index not initialized for activity generation")
-             retriever = None
-             context_text = ""
-        else:
-            # Filtros: Queremos Atividades (CIEB) e Alinhamento (BNCC)
-            filters = MetadataFilters(
-                filters=[
-                    MetadataFilter(key="category", value="normativa"), # BNCC
-                    MetadataFilter(key="category", value="apoio"),     # CIEB
-                ],
-                condition="or"
+        if download:
+            activity_data, cache_hit = await get_activity_content(
+                request, CachePolicy.from_header(cache_control)
             )
-
-            retriever = index.as_retriever(
-                similarity_top_k=5,
-                filters=filters
-            )
-            query = (
-                f"Habilidades e competências da BNCC para "
-                f"{request.nivel}, disciplina {request.disciplina}, "
-                f"sobre o tema {request.assunto}."
+            fmt = "docx" if request.format.lower() == "docx" else "pdf"
+            return await document_download(
+                "activity",
+                fmt,
+                activity_data,
+                document_filename("atividade", activity_data.get("title"), fmt),
+                {"X-Cache": "HIT" if cache_hit else "MISS"},
             )
-            nodes = retriever.retrieve(query)
-            context_text = "\n\n".join([n.get_content() for n in nodes])
-
-        prompt = (
-            f"Você é um professor de {request.disciplina} experiente no Ensino Básico.\n"
-            f"Sua tarefa é criar uma Atividade Avaliativa sobre '{request.assunto}' para alunos do {request.nivel}.\n\n"
-            "DIRETRIZES DE QUALIDADE (IMPORTANTE):\n"
-            "1. ADEQUAÇÃO AO NÍVEL: A linguagem e a dificuldade devem ser ACESSÍVEIS para a série solicitada. Evite termos acadêmicos ou questões complexas demais.\n"
-            "2. FOCO NA DISCIPLINA: A atividade deve ser sobre a matéria solicitada. Se for Matemática, foque em Matemática. Se for História, foque em História. NÃO force temas de tecnologia se não fizer sentido.\n"
-            "3. SEM ALUCINAÇÕES: Não invente nomes de empresas, escolas ou softwares fictícios (ex: 'Escola ConectaTech', 'App MathLife'). Use contextos reais ou genéricos.\n"
-            "4. TEXTO DE APOIO OPCIONAL: Se ALGUMA questão usar a expressão 'Segundo o texto' (ou variações de maiúsculas/minúsculas), você DEVE preencher o campo 'content' com um texto curto de apoio (máx. 2 parágrafos). Esse texto será exibido ANTES das questões e deve conter, de forma explícita, as informações necessárias para responder às perguntas que começam com 'Segundo o texto'.\n"
-            "5. Se NENHUMA questão usar a expressão 'Segundo o texto', o campo 'content' deve ser uma string vazia (\"\") e as questões não podem depender de um texto de apoio externo.\n"
-            "6. BNCC E CIEB COMO BASE: Use o contexto abaixo (que pode conter normas da BNCC e exemplos do CIEB) para alinhar as habilidades e inspirar as questões.\n\n"
-            "Contexto (BNCC/CIEB):\n"
-            f"{context_text}\n\n"
-            "Estrutura da Atividade:\n"
-            "1. Texto de Apoio (campo 'content'): Curto, direto e fácil de ler (máx. 2 parágrafos). Só deve ser preenchido se houver questões com 'Segundo o texto'.\n"
-            "2. Questões: 5 questões de múltipla escolha. Devem ser claras e objetivas.\n"
-            "3. Alternativas: Simples e diretas.\n\n"
-            "A saída deve ser EXATAMENTE um JSON válido com a seguinte estrutura:\n"
-            "{\n"
-            '  "title": "Título Criativo da Atividade",\n'
-            '  "objective": "Objetivo pedagógico da atividade (em 1 parágrafo)",\n'
-            '  "bncc_skills": [\n'
-            '    "Código(s) e descrição(ões) da(s) habilidade(s) da BNCC usadas"\n'
-            "  ],\n"
-            '  "content": "Um texto de apoio curto e direto OU string vazia se nenhuma questão usar \\"Segundo o texto\\".",\n'
-            '  "questions": [\n'
-            "    {\n"
-            '      "enunciado": "Enunciado da questão 1 (pode começar com \\"Segundo o texto\\" se fizer sentido)",\n'
-            '      "alternativas": [\n'
-            '        "A) alternativa A",\n'
-            '        "B) alternativa B",\n'
-            '        "C) alternativa C",\n'
-            '        "D) alternativa D"\n'
-            "      ],\n"
-            '      "correta": "A"\n'
-            "    },\n"
-            "    {\n"
-            '      "enunciado": "Enunciado da questão 2",\n'
-            '      "alternativas": [\n'
-            '        "A) alternativa A",\n'
-            '        "B) alternativa B",\n'
-            '        "C) alternativa C",\n'
-            '        "D) alternativa D"\n'
-            "      ],\n"
-            '      "correta": "C"\n'
-            "    }\n"
-            "  ]\n"
-            "}\n\n"
-            "Não inclua markdown ```json ... ```; responda apenas com o JSON puro.\n"
-        )
-        
-        response = Settings.llm.complete(prompt)
-        response_text = response.text.strip()
-        
-        # Clean up markdown code blocks if present
-        if response_text.startswith("```json"):
-            response_text = response_text.replace("```json", "").replace("```", "")
-        elif response_text.startswith("```"):
-            response_text = response_text.replace("```", "")
-            
-        activity_data = json.loads(response_text)
-        
-        # 3. Generate File
-        if request.format.lower() == "docx":
-            filename = ActivityGenerator.generate_docx(activity_data)
-        else:
-            filename = ActivityGenerator.generate_pdf(activity_data)
-            
-        
-        return ActivityResponse(
-            download_url=f"/api/files/output/generated_activities/{filename}",
-            filename=filename,
-            content=activity_data
+
+        activity_response, cache_hit = await run_activity(
+            request, CachePolicy.from_header(cache_control)
         )
-        
+        response.headers["X-Cache"] = "HIT" if cache_hit else "MISS"
+        return activity_response
+
     except Exception as e:
         logger.exception("Error generating activity")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@activity_router.post("/generate/stream")
+async def generate_activity_stream(
+    request: ActivityRequest,
+    cache_control: Optional[str] = Header(None),
+):
+    """
+    Versão SSE de /generate: eventos `token` com o texto do LLM à medida que é
+    gerado e um evento `result` final com a mesma resposta de /generate.
+    """
+    policy = CachePolicy.from_header(cache_control)
+    key, cached = await lookup_generation(
+        "activity", request.model_dump(exclude={"format"}), PROMPT_VERSION, policy
+    )
+
+    async def to_result(activity_data):
+        return (await build_activity_response(request, activity_data)).model_dump()
+
+    events = stream_json_generation(
+        key, cached, lambda: build_activity_prompt(request), to_result, policy
+    )
+    return sse_response(events, {"X-Cache": "HIT" if cached is not None else "MISS"})
+
+
+class ClassSetRequest(BaseModel):
+    # Atividade já gerada (campo `content` da resposta de /generate)
+    content: dict
+    variants: int = Field(..., ge=1, le=MAX_VARIANTS)
+    format: str = "pdf"
+    seed: int = 0
+
+
+@activity_router.post("/class-set", response_model=ActivityResponse)
+async def generate_class_set(
+    request: ClassSetRequest,
+    download: bool = Query(False, description="Devolve o arquivo direto, sem gravar em disco"),
+):
+    """
+    Gera `variants` versões da atividade, com questões e alternativas embaralhadas,
+    e o gabarito de todas em um único PDF/DOCX, sem novas chamadas ao LLM.
+    """
+    fmt = "docx" if request.format.lower() == "docx" else "pdf"
+    data = {"activity": request.content, "variants": request.variants, "seed": request.seed}
+    try:
+        if download:
+            return await document_download(
+                "class-set",
+                fmt,
+                data,
+                document_filename("turma", request.content.get("title"), fmt),
+            )
+        artifact = await get_artifact_store().get_or_render("class-set", fmt, data)
+        return ActivityResponse(download_url=artifact.url, filename=artifact.filename)
+    except Exception as e:
+        logger.exception("Error generating class set")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,51 @@
+import logging
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException
+
+from app.api.services.artifacts import get_artifact_store
+from app.engine.executor import run_blocking
+from app.engine.index import get_index_status, reload_index
+
+admin_router = APIRouter()
+logger = logging.getLogger("uvicorn")
+
+
+def check_admin_key(x_admin_key: Optional[str]):
+    # Sem ADMIN_API_KEY configurada os endpoints ficam abertos (projeto single-user)
+    admin_key = os.getenv("ADMIN_API_KEY")
+    if admin_key and x_admin_key != admin_key:
+        raise HTTPException(status_code=403, detail="Invalid admin key")
+
+
+@admin_router.get("/index")
+async def index_status(x_admin_key: Optional[str] = Header(None)):
+    check_admin_key(x_admin_key)
+    return get_index_status()
+
+
+@admin_router.post("/index/reload")
+async def force_index_reload(x_admin_key: Optional[str] = Header(None)):
+    check_admin_key(x_admin_key)
+    try:
+        await run_blocking(reload_index, True)
+    except Exception as e:
+        logger.exception("Error reloading index")
+        raise HTTPException(status_code=500, detail=str(e))
+    return get_index_status()
+
+
+@admin_router.get("/output")
+async def output_stats(x_admin_key: Optional[str] = Header(None)):
+    """Ocupação dos diretórios de documentos gerados e taxa de acerto do store."""
+    check_admin_key(x_admin_key)
+    return await run_blocking(get_artifact_store().stats)
+
+
+@admin_router.post("/output/sweep")
+async def force_output_sweep(x_admin_key: Optional[str] = Header(None)):
+    check_admin_key(x_admin_key)
+    store = get_artifact_store()
+    removed = await run_blocking(store.sweep)
+    return {"removed": removed, **(await run_blocking(store.stats))}
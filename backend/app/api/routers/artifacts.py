@@ -0,0 +1,37 @@
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Response
+from fastapi.responses import FileResponse
+
+from app.api.services.artifacts import IMMUTABLE_CACHE_CONTROL, get_artifact_store
+from app.engine.executor import run_blocking
+
+artifacts_router = APIRouter()
+logger = logging.getLogger("uvicorn")
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+@artifacts_router.get("/{segment}/{filename}")
+async def download_artifact(
+    segment: str,
+    filename: str,
+    if_none_match: Optional[str] = Header(None),
+):
+    store = get_artifact_store()
+    kind = store.kind_for_segment(segment)
+    artifact = await run_blocking(store.get, kind, filename) if kind else None
+    if artifact is None:
+        raise HTTPException(status_code=404, detail="Artifact not found")
+
+    await run_blocking(store.touch, artifact, True)
+    headers = {"ETag": artifact.etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    if etag_matches(if_none_match, artifact.etag):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(artifact.path, filename=artifact.filename, headers=headers)
@@ -0,0 +1,185 @@
+import asyncio
+import hashlib
+import json
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+
+from app.api.routers.activity import activity_job
+from app.api.routers.slides import slides_job
+from app.api.routers.unit import lesson_plan_job, suggest_job
+from app.api.services.jobs import get_job_queue
+from app.api.services.pipeline import (
+    PipelineNode,
+    get_pipeline_limit,
+    get_pipeline_store,
+    run_dag,
+    stage_progress,
+)
+from app.engine.executor import run_blocking
+
+course_router = APIRouter()
+logger = logging.getLogger("uvicorn")
+
+STAGES = ["suggest", "lesson-plan", "activity", "slides"]
+
+# Execuções do mesmo pipeline são serializadas: a segunda encontra as etapas já feitas.
+# pipeline_id -> (lock, execuções usando ou esperando o lock)
+_pipeline_locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
+
+
+class CourseRequest(BaseModel):
+    disciplina: str
+    serieAno: str
+    format: str = "pdf"
+    slides_count: int = 5
+    include_slides: bool = True
+
+
+class CoursePipelineRequest(CourseRequest):
+    # Descarta o progresso salvo e refaz todas as etapas
+    restart: bool = False
+
+
+class CourseResponse(BaseModel):
+    pipeline_id: str
+    job_id: Optional[str] = None
+    progress: Dict[str, Dict[str, int]]
+    nodes: Dict[str, Dict[str, Any]] = {}
+
+
+def pipeline_id_for(request: CourseRequest) -> str:
+    fields = CourseRequest(**request.model_dump()).model_dump()
+    fields["disciplina"] = fields["disciplina"].strip().lower()
+    fields["serieAno"] = fields["serieAno"].strip().lower()
+    raw = json.dumps(fields, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+@asynccontextmanager
+async def pipeline_lock(pipeline_id: str):
+    """Lock do pipeline, descartado quando a última execução que o usa termina."""
+    lock, users = _pipeline_locks.get(pipeline_id) or (asyncio.Lock(), 0)
+    _pipeline_locks[pipeline_id] = (lock, users + 1)
+    try:
+        async with lock:
+            yield
+    finally:
+        _, users = _pipeline_locks[pipeline_id]
+        if users == 1:
+            del _pipeline_locks[pipeline_id]
+        else:
+            _pipeline_locks[pipeline_id] = (lock, users - 1)
+
+
+def unit_nodes(request: CourseRequest, suggestions: dict) -> List[PipelineNode]:
+    """
+    Plano de aula, atividade e slides de cada unidade sugerida. Os três partem só
+    da unidade (nome e descrição), então rodam em paralelo.
+    """
+    nodes = []
+    for i, unit in enumerate(suggestions["sugestoes"]):
+        plan_payload = {
+            "disciplina": request.disciplina,
+            "serieAno": request.serieAno,
+            "unidade": unit["nome"],
+            "descricao": unit["descricao"],
+        }
+        activity_payload = {
+            "disciplina": request.disciplina,
+            "assunto": unit["nome"],
+            "nivel": request.serieAno,
+            "format": request.format,
+        }
+        slides_payload = {
+            "topic": unit["nome"],
+            "slides_count": request.slides_count,
+            "serieAno": request.serieAno,
+        }
+        nodes.append(PipelineNode(
+            f"lesson-plan:{i}", "lesson-plan",
+            lambda _, payload=plan_payload: lesson_plan_job(payload),
+            deps=["suggest"],
+        ))
+        nodes.append(PipelineNode(
+            f"activity:{i}", "activity",
+            lambda _, payload=activity_payload: activity_job(payload),
+            deps=["suggest"],
+        ))
+        if request.include_slides:
+            nodes.append(PipelineNode(
+                f"slides:{i}", "slides",
+                lambda _, payload=slides_payload: slides_job(payload),
+                deps=["suggest"],
+            ))
+    return nodes
+
+
+async def course_job(payload: dict) -> dict:
+    """
+    Gera o pacote do bimestre: sugestões de unidades e depois o plano de aula, a
+    atividade e os slides de cada unidade. As etapas rodam em paralelo, sob o
+    limite global de PIPELINE_CONCURRENCY.
+    """
+    request = CoursePipelineRequest(**payload)
+    pipeline_id = pipeline_id_for(request)
+    store = get_pipeline_store()
+    limit = get_pipeline_limit()
+    suggest = PipelineNode(
+        "suggest", "suggest",
+        lambda _: suggest_job({"disciplina": request.disciplina, "serieAno": request.serieAno}),
+    )
+
+    async with pipeline_lock(pipeline_id):
+        if request.restart:
+            # Dentro do lock, para não apagar o progresso de uma execução em andamento
+            await run_blocking(store.clear, pipeline_id)
+        # As etapas por unidade só são conhecidas depois das sugestões
+        results = await run_dag(pipeline_id, [suggest], store, limit)
+        if "suggest" not in results:
+            raise RuntimeError("Unit suggestion failed")
+        nodes = unit_nodes(request, results["suggest"])
+        results = await run_dag(pipeline_id, [suggest, *nodes], store, limit)
+
+    failed = [node.id for node in nodes if node.id not in results]
+    if failed:
+        raise RuntimeError(f"Pipeline stages failed: {', '.join(failed)}")
+    return {"pipeline_id": pipeline_id, "results": results}
+
+
+async def pipeline_status(pipeline_id: str, job_id: Optional[str] = None) -> CourseResponse:
+    nodes = await run_blocking(get_pipeline_store().nodes, pipeline_id)
+    return CourseResponse(
+        pipeline_id=pipeline_id,
+        job_id=job_id,
+        progress=stage_progress(nodes, STAGES),
+        nodes=nodes,
+    )
+
+
+@course_router.post("/pipeline", response_model=CourseResponse, status_code=202)
+async def start_course_pipeline(request: CoursePipelineRequest):
+    """
+    Enfileira o pipeline do bimestre. Repetir a mesma requisição retoma o pipeline,
+    refazendo apenas as etapas que falharam ou não chegaram a rodar.
+    """
+    pipeline_id = pipeline_id_for(request)
+    try:
+        queue = get_job_queue()
+        queue.register("course", course_job)
+        job = await queue.submit("course", request.model_dump())
+    except Exception as e:
+        logger.exception("Error starting course pipeline")
+        raise HTTPException(status_code=500, detail=str(e))
+    return await pipeline_status(pipeline_id, job["id"])
+
+
+@course_router.get("/pipeline/{pipeline_id}", response_model=CourseResponse)
+async def get_course_pipeline(pipeline_id: str):
+    status = await pipeline_status(pipeline_id)
+    if not status.nodes:
+        raise HTTPException(status_code=404, detail="Pipeline not found")
+    return status
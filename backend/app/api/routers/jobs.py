@@ -0,0 +1,97 @@
+import logging
+from typing import Any, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel
+
+from app.api.routers.activity import ActivityRequest, activity_job
+from app.api.routers.course import course_job
+from app.api.routers.slides import SlideRequest, slides_job
+from app.api.routers.unit import (
+    LessonPlanRequest,
+    UnitSuggestionRequest,
+    lesson_plan_job,
+    suggest_job,
+)
+from app.api.services.jobs import get_job_queue
+
+jobs_router = APIRouter()
+logger = logging.getLogger("uvicorn")
+
+# Maior espera aceita no long-polling (segundos)
+MAX_WAIT = 60.0
+
+JOB_HANDLERS = {
+    "activity": activity_job,
+    "lesson-plan": lesson_plan_job,
+    "suggest": suggest_job,
+    "slides": slides_job,
+    "course": course_job,
+}
+
+
+class JobResponse(BaseModel):
+    id: str
+    kind: str
+    status: str
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
+
+
+def get_queue():
+    queue = get_job_queue()
+    for kind, handler in JOB_HANDLERS.items():
+        queue.register(kind, handler)
+    return queue
+
+
+async def start_job_queue():
+    """Chamado no startup: retoma os jobs que ficaram pendentes no último reinício."""
+    await get_queue().start()
+
+
+async def stop_job_queue():
+    """Chamado no shutdown: cancela os workers; jobs interrompidos são retomados no próximo startup."""
+    await get_job_queue().stop()
+
+
+async def enqueue(kind: str, request: BaseModel) -> JobResponse:
+    try:
+        job = await get_queue().submit(kind, request.model_dump())
+    except Exception as e:
+        logger.exception(f"Error enqueuing {kind} job")
+        raise HTTPException(status_code=500, detail=str(e))
+    return JobResponse(**job)
+
+
+@jobs_router.post("/activity", response_model=JobResponse, status_code=202)
+async def enqueue_activity(request: ActivityRequest):
+    return await enqueue("activity", request)
+
+
+@jobs_router.post("/lesson-plan", response_model=JobResponse, status_code=202)
+async def enqueue_lesson_plan(request: LessonPlanRequest):
+    return await enqueue("lesson-plan", request)
+
+
+@jobs_router.post("/suggest", response_model=JobResponse, status_code=202)
+async def enqueue_suggest(request: UnitSuggestionRequest):
+    return await enqueue("suggest", request)
+
+
+@jobs_router.post("/slides", response_model=JobResponse, status_code=202)
+async def enqueue_slides(request: SlideRequest):
+    return await enqueue("slides", request)
+
+
+@jobs_router.get("/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, description="Segundos para esperar o job terminar (long-polling)"),
+):
+    job = await get_queue().wait(job_id, min(wait, MAX_WAIT))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JobResponse(**job)
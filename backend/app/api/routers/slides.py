@@ -1,12 +1,20 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-import httpx
-import os
+from fastapi import APIRouter, Header, HTTPException, Response
+from pydantic import BaseModel, Field
+import hashlib
 import logging
-from app.engine.index import get_index
-from llama_index.core.settings import Settings
+from app.engine.index import aget_index
+from app.engine.llm import acomplete
+from app.engine.retrieval import aget_retriever, aretrieve_context
+from app.api.services.generation_cache import (
+    CachePolicy,
+    cached_generation,
+    lookup_generation,
+    store_generation,
+)
+from app.api.services.presenton import CircuitOpenError, PresentonError, get_presenton_client
+from app.api.services.single_flight import generation_flights
 
-from typing import List, Optional
+from typing import Dict, List, Literal, Optional, Tuple
 
 slides_router = APIRouter()
 logger = logging.getLogger("uvicorn")
@@ -16,126 +24,186 @@ class SlideRequest(BaseModel):
     slides_count: int = 5
     language: str = "pt-BR"
     serieAno: Optional[str] = None
+    # Pedir só um formato deixa o outro para depois, sob demanda (reaproveitando o roteiro)
+    formats: List[Literal["pptx", "pdf"]] = Field(["pptx", "pdf"], min_length=1)
 
 import asyncio
 
-@slides_router.post("/generate")
-async def generate_slides(request: SlideRequest):
-    api_key = os.getenv("PRESENTON_API_KEY")
-    base_url = os.getenv("PRESENTON_BASE_URL", "https://api.presenton.ai")
-    
-    if not api_key:
+# Incrementar sempre que o prompt mudar
+PROMPT_VERSION = "1"
+# Incrementar sempre que o payload enviado ao Presenton mudar
+DECK_VERSION = "1"
+
+
+def get_tone(serie_ano: Optional[str]) -> Tuple[str, bool]:
+    """Define tom e estilo do roteiro com base na série/ano."""
+    if not serie_ano:
+        return "", False
+    young_grades = ["1º ano", "2º ano", "3º ano", "4º ano", "5º ano", "1 ano", "2 ano", "3 ano", "4 ano", "5 ano", "Fundamental I"]
+    if any(grade.lower() in serie_ano.lower() for grade in young_grades):
+        tone_instruction = (
+            "O público-alvo são crianças pequenas (Ensino Fundamental I). "
+            "Use uma linguagem muito simples, alegre, lúdica e divertida. "
+            "Inclua analogias criativas e emojis para tornar o conteúdo visualmente atraente e amigável."
+        )
+        return tone_instruction, True
+    return "O público-alvo são estudantes. Use uma linguagem clara, objetiva e educativa.", False
+
+
+async def generate_slide_content(request: SlideRequest, tone_instruction: str) -> str:
+    """Recupera o contexto e gera o roteiro dos slides com o LLM."""
+    index = await aget_index()
+    context = ""
+    if index:
+        retriever = await aget_retriever(index, similarity_top_k=3)
+        context = await aretrieve_context(retriever, request.topic)
+
+    prompt = (
+        f"Crie um roteiro de conteúdo para uma apresentação de slides educacional sobre: '{request.topic}'.\n"
+        f"Série/Ano: {request.serieAno if request.serieAno else 'Não especificado'}.\n"
+        f"{tone_instruction}\n"
+        f"A apresentação deve ter aproximadamente {request.slides_count} slides.\n"
+        f"Use o seguinte contexto da BNCC/Currículo APENAS como base para o conteúdo pedagógico, mas NÃO inclua seções de metadados, alinhamento ou códigos da BNCC nos slides.\n"
+        f"Contexto:\n{context}\n\n"
+        "Gere APENAS o conteúdo dos slides (título e corpo). O foco deve ser puramente no assunto da aula.\n"
+        "Não mencione 'BNCC', 'Competências' ou 'Habilidades' no texto final."
+    )
+
+    completion = await acomplete(prompt)
+    return str(completion)
+
+
+def deck_result(deck: Dict[str, dict], presenton) -> dict:
+    """Monta a resposta a partir dos formatos já exportados do deck."""
+    pptx_data, pdf_data = deck.get("pptx"), deck.get("pdf")
+    main = pptx_data or pdf_data or {}
+    result = {
+        "pptx_url": presenton.make_url(pptx_data.get("path")) if pptx_data else None,
+        "pdf_url": presenton.make_url(pdf_data.get("path")) if pdf_data else None,
+        "edit_url": presenton.make_url(main.get("edit_path")),
+        "presentation_id": main.get("presentation_id"),
+        # Cada formato exportado é uma apresentação separada no Presenton, com id e edição próprios
+        "presentations": {
+            fmt: {
+                "presentation_id": data.get("presentation_id"),
+                "edit_url": presenton.make_url(data.get("edit_path")),
+            }
+            for fmt, data in deck.items()
+        },
+    }
+    # Backward compatibility for existing UI
+    result["download_url"] = result["pptx_url"]
+    result["url"] = result["edit_url"]
+    return result
+
+
+async def run_slides(request: SlideRequest, policy: CachePolicy = CachePolicy()) -> Tuple[dict, bool]:
+    """
+    Gera (ou reaproveita) o roteiro e exporta no Presenton só os formatos pedidos
+    que ainda não estão no cache do deck. Devolve `(resultado, veio_do_cache)`.
+    """
+    presenton = get_presenton_client()
+
+    if not presenton.api_key:
         raise HTTPException(status_code=500, detail="PRESENTON_API_KEY not configured")
 
-    # 1. Generate Content using RAG/LLM
+    tone_instruction, is_young_audience = get_tone(request.serieAno)
+    mood = "fun" if is_young_audience else "professional"
+
+    # 1. Generate Content using RAG/LLM (cache + requisições idênticas simultâneas compartilham a geração)
     try:
-        index = get_index()
-        context = ""
-        if index:
-            retriever = index.as_retriever(similarity_top_k=3)
-            nodes = retriever.retrieve(request.topic)
-            context = "\n\n".join([n.get_content() for n in nodes])
-        
-        # 1. Determine Tone and Style based on serieAno
-        tone_instruction = ""
-        is_young_audience = False
-        if request.serieAno:
-            young_grades = ["1º ano", "2º ano", "3º ano", "4º ano", "5º ano", "1 ano", "2 ano", "3 ano", "4 ano", "5 ano", "Fundamental I"]
-            if any(grade.lower() in request.serieAno.lower() for grade in young_grades):
-                is_young_audience = True
-                tone_instruction = (
-                    "O público-alvo são crianças pequenas (Ensino Fundamental I). "
-                    "Use uma linguagem muito simples, alegre, lúdica e divertida. "
-                    "Inclua analogias criativas e emojis para tornar o conteúdo visualmente atraente e amigável."
-                )
-            else:
-                tone_instruction = "O público-alvo são estudantes. Use uma linguagem clara, objetiva e educativa."
-
-        prompt = (
-            f"Crie um roteiro de conteúdo para uma apresentação de slides educacional sobre: '{request.topic}'.\n"
-            f"Série/Ano: {request.serieAno if request.serieAno else 'Não especificado'}.\n"
-            f"{tone_instruction}\n"
-            f"A apresentação deve ter aproximadamente {request.slides_count} slides.\n"
-            f"Use o seguinte contexto da BNCC/Currículo APENAS como base para o conteúdo pedagógico, mas NÃO inclua seções de metadados, alinhamento ou códigos da BNCC nos slides.\n"
-            f"Contexto:\n{context}\n\n"
-            "Gere APENAS o conteúdo dos slides (título e corpo). O foco deve ser puramente no assunto da aula.\n"
-            "Não mencione 'BNCC', 'Competências' ou 'Habilidades' no texto final."
+        generated_content, _ = await cached_generation(
+            "slides.content",
+            request.model_dump(exclude={"formats"}),
+            PROMPT_VERSION,
+            lambda: generate_slide_content(request, tone_instruction),
+            policy,
         )
-        
-        completion = Settings.llm.complete(prompt)
-        generated_content = str(completion)
-        
     except Exception as e:
         logger.error(f"Content generation failed: {str(e)}")
         generated_content = f"Apresentação sobre {request.topic}"
 
-    # 2. Call Presenton API (Parallel for PPTX and PDF)
-    base_url = base_url.rstrip("/")
-    url = f"{base_url}/api/v1/ppt/presentation/generate"
-    
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {api_key}",
+    # 2. Deck já exportado para este roteiro?
+    deck_fields = {
+        "topic": request.topic,
+        "serieAno": request.serieAno,
+        "slides_count": request.slides_count,
+        "language": request.language,
+        "mood": mood,
+        "content_hash": hashlib.sha256(generated_content.encode("utf-8")).hexdigest(),
     }
-    
+    deck_key, cached_deck = await lookup_generation("slides.deck", deck_fields, DECK_VERSION, policy)
+    deck: Dict[str, dict] = dict(cached_deck or {})
+    missing = [fmt for fmt in dict.fromkeys(request.formats) if fmt not in deck]
+    if not missing:
+        return deck_result(deck, presenton), True
+
+    # 3. Call Presenton API only for the missing formats
     # Common payload fields
     base_payload = {
         "content": generated_content,
         "n_slides": request.slides_count,
         "language": request.language,
         "template": "general", # Reverted to 'general' as 'creative' is not a valid template ID
-        "mood": "fun" if is_young_audience else "professional",
+        "mood": mood,
         "author": "Cultura Digital"
     }
 
     async def call_presenton(format_type):
-        payload = {**base_payload, "export_as": format_type}
-        async with httpx.AsyncClient() as client:
-            logger.info(f"Calling Presenton API for {format_type}: {url}")
-            response = await client.post(url, json=payload, headers=headers, timeout=120.0)
-            if response.status_code != 200:
-                logger.error(f"Presenton API Error ({format_type}): {response.text}")
-                return None
-            return response.json()
+        logger.info(f"Calling Presenton API for {format_type}")
+        try:
+            data = await presenton.generate({**base_payload, "export_as": format_type})
+        except CircuitOpenError:
+            raise
+        except PresentonError as e:
+            logger.error(f"Presenton API Error ({format_type}): {str(e)}")
+            return None
+        return {key: data.get(key) for key in ("path", "edit_path", "presentation_id")}
 
     try:
-        # Run both requests in parallel
         results = await asyncio.gather(
-            call_presenton("pptx"),
-            call_presenton("pdf")
+            *[
+                generation_flights.run(f"{deck_key}:{fmt}", lambda fmt=fmt: call_presenton(fmt))
+                for fmt in missing
+            ]
         )
-        
-        pptx_data, pdf_data = results
-        
-        if not pptx_data and not pdf_data:
-             raise HTTPException(status_code=500, detail="Failed to generate slides in any format")
-
-        # Helper to construct full URL
-        def make_full_url(path):
-            if not path:
-                return None
-            if path.startswith("http"):
-                return path
-            
-            clean_base = base_url.strip().rstrip("/")
-            if path.startswith("/"):
-                return f"{clean_base}{path}"
-            return f"{clean_base}/{path}"
-
-        result = {
-            "pptx_url": make_full_url(pptx_data.get('path')) if pptx_data else None,
-            "pdf_url": make_full_url(pdf_data.get('path')) if pdf_data else None,
-            "edit_url": make_full_url(pptx_data.get('edit_path')) if pptx_data else None,
-            "presentation_id": pptx_data.get("presentation_id") if pptx_data else None
-        }
-        
-        # Backward compatibility for existing UI
-        result["download_url"] = result["pptx_url"]
-        result["url"] = result["edit_url"]
-        
+        exported = {fmt: data for fmt, data in zip(missing, results) if data}
+        if not exported:
+            raise HTTPException(status_code=500, detail="Failed to generate slides in any format")
+
+        # Relê o deck: outra requisição pode ter exportado outro formato enquanto isso
+        _, latest = await lookup_generation("slides.deck", deck_fields, DECK_VERSION, policy)
+        deck = {**(latest or {}), **deck, **exported}
+        await store_generation(deck_key, deck, policy)
+
+        result = deck_result(deck, presenton)
         logger.info(f"Constructed Result: {result}")
-        return result
-            
+        return result, False
+
+    except HTTPException:
+        raise
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to generate slides: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@slides_router.post("/generate")
+async def generate_slides(
+    request: SlideRequest,
+    response: Response,
+    cache_control: Optional[str] = Header(None),
+):
+    """
+    Gera a apresentação nos formatos de `formats` (padrão: pptx e pdf). Pedir depois
+    outro formato com os mesmos dados reaproveita o roteiro e o deck em cache.
+    """
+    result, cache_hit = await run_slides(request, CachePolicy.from_header(cache_control))
+    response.headers["X-Cache"] = "HIT" if cache_hit else "MISS"
+    return result
+
+
+async def slides_job(payload: dict) -> dict:
+    result, _ = await run_slides(SlideRequest(**payload))
+    return result
@@ -1,15 +1,26 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Query, Response
 from pydantic import BaseModel
-from typing import List, Dict, Optional
-import json
+from typing import AsyncIterator, List, Dict, Optional, Tuple
+import asyncio
 import logging
-from app.engine.index import get_index
-from llama_index.core.settings import Settings
-from app.api.services.lesson_plan_generator import LessonPlanGenerator
+from app.engine.bncc import aget_skill_index, format_skills, missing_skills, rank_skills
+from app.engine.index import aget_index
+from app.engine.llm import acomplete, parse_json_response
+from app.engine.retrieval import aget_retriever, aretrieve_context
+from app.api.services.generation_cache import CachePolicy, cached_generation, lookup_generation
+from app.api.services.streaming import sse_event, sse_response, stream_json_generation
+from app.api.services.artifacts import document_download, get_artifact_store
+from app.api.services.renderer import document_filename
 
 unit_router = APIRouter()
 logger = logging.getLogger("uvicorn")
 
+# Incrementar sempre que o prompt mudar, para invalidar o cache de geração
+SUGGEST_PROMPT_VERSION = "2"
+LESSON_PLAN_PROMPT_VERSION = "3"
+# Habilidades da BNCC enviadas no prompt do plano de aula (as mais próximas da unidade)
+LESSON_PLAN_MAX_SKILLS = 12
+
 class UnitSuggestionRequest(BaseModel):
     disciplina: str
     serieAno: str
@@ -32,89 +43,280 @@ class LessonPlanResponse(BaseModel):
 
 from llama_index.core.vector_stores import MetadataFilter, MetadataFilters
 
-@unit_router.post("/lesson-plan", response_model=LessonPlanResponse)
-async def generate_lesson_plan(request: LessonPlanRequest):
-    try:
-        index = get_index()
-        
-        # Filtros: Priorizar BNCC (normativa), CIEB (apoio), Leis (legal) e Pareceres (pedagogica)
-        filters = MetadataFilters(
-            filters=[
-                MetadataFilter(key="category", value="normativa"),  # BNCC
-                MetadataFilter(key="category", value="apoio"),      # CIEB
-                MetadataFilter(key="category", value="legal"),      # Leis e Resoluções
-                MetadataFilter(key="category", value="pedagogica"), # Pareceres (Conceitos)
-            ],
-            condition="or"
+async def retrieve_lesson_plan_context(
+    disciplina: str, serie_ano: str, unidade: Optional[str] = None
+) -> Tuple[List[dict], str]:
+    """
+    Recupera a base normativa do plano de aula: as habilidades da BNCC da
+    série/disciplina (tabela) e o contexto da busca vetorial nas normas.
+    Sem `unidade`, a busca cobre a série/disciplina e pode ser compartilhada por várias unidades.
+    """
+    skills = (await aget_skill_index()).lookup(serie_ano, disciplina)
+    missing = missing_skills(skills)
+    if missing:
+        logger.warning(
+            f"BNCC skill table incomplete for {serie_ano}/{disciplina} "
+            f"(missing {', '.join(missing)}), also using vector retrieval"
         )
+    # Com a tabela completa a busca não precisa trazer as habilidades da BNCC,
+    # só as normas de Computação e Educação Digital
+    skills_complete = bool(skills) and not missing
+    index = await aget_index()
 
-        retriever = index.as_retriever(
-            similarity_top_k=5, 
-            filters=filters
-        ) if index else None
-
-        context_text = ""
-        if retriever:
-            query = (
-                f"Habilidades e competências BNCC para {request.serieAno}, "
-                f"disciplina {request.disciplina}, unidade {request.unidade}. "
-                f"Incluir diretrizes de Cultura Digital/Computação (CNE/CEB, Resolução 01/2022) e Política Nacional de Educação Digital."
-            )
-            try:
-                nodes = retriever.retrieve(query)
-                context_text = "\n\n".join([n.get_content() for n in nodes])
-            except Exception as e:
-                logger.warning(f"Falha ao recuperar contexto (embeddings indisponíveis): {e}")
-                context_text = ""
-
-        prompt = (
-            "Você é um coordenador pedagógico experiente, especialista em BNCC e nas Normas sobre Computação na Educação Básica (Resolução CNE/CEB nº 1/2022).\n"
-            "Crie um Plano de Aula detalhado e estruturado para a seguinte unidade:\n\n"
-            f'Disciplina: "{request.disciplina}"\n'
-            f'Série/Ano: "{request.serieAno}"\n'
-            f'Unidade: "{request.unidade}"\n'
-            f'Descrição: "{request.descricao}"\n\n'
-            "BASE NORMATIVA OBRIGATÓRIA:\n"
-            "1. BNCC (Base Nacional Comum Curricular): Competências gerais e habilidades específicas da disciplina.\n"
-            "2. RESOLUÇÃO CNE/CEB Nº 1/2022: Normas sobre Computação na Educação Básica (Eixos: Pensamento Computacional, Mundo Digital e Cultura Digital).\n"
-            "3. LEI Nº 14.533/2023: Política Nacional de Educação Digital.\n\n"
-            "Use o seguinte contexto recuperado (que contém trechos das normas citadas) como base técnica:\n"
-            f"{context_text}\n\n"
-            "REGRAS DE SAÍDA:\n"
-            "Responda EXATAMENTE com um JSON válido no seguinte formato:\n"
-            "{\n"
-            '  "titulo": "Título da Aula",\n'
-            '  "duracao": "Duração prevista (ex: 50 min)",\n'
-            '  "serieAno": "Série/Ano",\n'
-            '  "objetivos": ["objetivo 1", "objetivo 2"],\n'
-            '  "conteudoProgramatico": ["tópico 1", "tópico 2"],\n'
-            '  "estrategiasEnsino": ["metodologia ou passo a passo 1", "metodologia ou passo a passo 2"],\n'
-            '  "bncc": ["EF05HI01 - descrição articulada com a Resolução CNE/CEB nº 1/2022", "Eixo: Pensamento Computacional - descrição conforme norma"],\n'
-            '  "avaliacao": "Descrição textual de como a avaliação será realizada",\n'
-            '  "recursos": ["recurso 1", "recurso 2"],\n'
-            '  "referencias": ["referência bibliográfica ou link 1", "referência 2"]\n'
-            "}\n\n"
-            "INSTRUÇÕES:\n"
-            "- No campo 'bncc', você DEVE citar as habilidades da BNCC e as competências da Resolução CNE/CEB nº 1/2022 de forma integrada/misturada, mostrando como a Computação apoia a habilidade da disciplina.\n"
-            "- Exemplo de item em 'bncc': 'EF05MA01 articulado com Eixo Mundo Digital (Res. 01/2022): [Descrição da integração]'.\n"
-            "- O campo 'referencias' deve citar obrigatoriamente a BNCC e a Resolução CNE/CEB nº 1/2022.\n"
-            "- Mantenha linguagem objetiva e estritamente alinhada às normas pedagógicas brasileiras.\n"
-            "- Não inclua markdown ```json ... ```; responda apenas com o JSON puro."
+    # Filtros: Priorizar BNCC (normativa), CIEB (apoio), Leis (legal) e Pareceres (pedagogica)
+    categories = [
+        MetadataFilter(key="category", value="apoio"),      # CIEB
+        MetadataFilter(key="category", value="legal"),      # Leis e Resoluções
+        MetadataFilter(key="category", value="pedagogica"), # Pareceres (Conceitos)
+    ]
+    if not skills_complete:
+        categories.insert(0, MetadataFilter(key="category", value="normativa"))  # BNCC
+    filters = MetadataFilters(filters=categories, condition="or")
+
+    retriever = await aget_retriever(
+        index,
+        similarity_top_k=5,
+        filters=filters
+    ) if index else None
+
+    context_text = ""
+    if retriever:
+        unit_clause = f", unidade {unidade}" if unidade else ""
+        if skills_complete:
+            subject = f"Computação na Educação Básica para {serie_ano}"
+        else:
+            subject = f"Habilidades e competências BNCC para {serie_ano}"
+        query = (
+            f"{subject}, "
+            f"disciplina {disciplina}{unit_clause}. "
+            f"Incluir diretrizes de Cultura Digital/Computação (CNE/CEB, Resolução 01/2022) e Política Nacional de Educação Digital."
+        )
+        try:
+            context_text = await aretrieve_context(retriever, query)
+        except Exception as e:
+            logger.warning(f"Falha ao recuperar contexto (embeddings indisponíveis): {e}")
+            context_text = ""
+    return skills, context_text
+
+
+async def build_lesson_plan_prompt(
+    request: LessonPlanRequest,
+    shared_context: Optional[Tuple[List[dict], str]] = None,
+) -> str:
+    """Monta o prompt do plano de aula; `shared_context` reaproveita uma recuperação já feita."""
+    if shared_context is None:
+        shared_context = await retrieve_lesson_plan_context(
+            request.disciplina, request.serieAno, request.unidade
         )
+    skills, context_text = shared_context
+    if skills:
+        skills = rank_skills(
+            skills, f"{request.unidade} {request.descricao}", LESSON_PLAN_MAX_SKILLS
+        )
+        skills_text = "Habilidades da BNCC para esta série e disciplina:\n" + format_skills(skills)
+        context_text = f"{skills_text}\n\n{context_text}" if context_text else skills_text
+
+    prompt = (
+        "Você é um coordenador pedagógico experiente, especialista em BNCC e nas Normas sobre Computação na Educação Básica (Resolução CNE/CEB nº 1/2022).\n"
+        "Crie um Plano de Aula detalhado e estruturado para a seguinte unidade:\n\n"
+        f'Disciplina: "{request.disciplina}"\n'
+        f'Série/Ano: "{request.serieAno}"\n'
+        f'Unidade: "{request.unidade}"\n'
+        f'Descrição: "{request.descricao}"\n\n'
+        "BASE NORMATIVA OBRIGATÓRIA:\n"
+        "1. BNCC (Base Nacional Comum Curricular): Competências gerais e habilidades específicas da disciplina.\n"
+        "2. RESOLUÇÃO CNE/CEB Nº 1/2022: Normas sobre Computação na Educação Básica (Eixos: Pensamento Computacional, Mundo Digital e Cultura Digital).\n"
+        "3. LEI Nº 14.533/2023: Política Nacional de Educação Digital.\n\n"
+        "Use o seguinte contexto recuperado (que contém trechos das normas citadas) como base técnica:\n"
+        f"{context_text}\n\n"
+        "REGRAS DE SAÍDA:\n"
+        "Responda EXATAMENTE com um JSON válido no seguinte formato:\n"
+        "{\n"
+        '  "titulo": "Título da Aula",\n'
+        '  "duracao": "Duração prevista (ex: 50 min)",\n'
+        '  "serieAno": "Série/Ano",\n'
+        '  "objetivos": ["objetivo 1", "objetivo 2"],\n'
+        '  "conteudoProgramatico": ["tópico 1", "tópico 2"],\n'
+        '  "estrategiasEnsino": ["metodologia ou passo a passo 1", "metodologia ou passo a passo 2"],\n'
+        '  "bncc": ["EF05HI01 - descrição articulada com a Resolução CNE/CEB nº 1/2022", "Eixo: Pensamento Computacional - descrição conforme norma"],\n'
+        '  "avaliacao": "Descrição textual de como a avaliação será realizada",\n'
+        '  "recursos": ["recurso 1", "recurso 2"],\n'
+        '  "referencias": ["referência bibliográfica ou link 1", "referência 2"]\n'
+        "}\n\n"
+        "INSTRUÇÕES:\n"
+        "- No campo 'bncc', você DEVE citar as habilidades da BNCC e as competências da Resolução CNE/CEB nº 1/2022 de forma integrada/misturada, mostrando como a Computação apoia a habilidade da disciplina.\n"
+        "- Exemplo de item em 'bncc': 'EF05MA01 articulado com Eixo Mundo Digital (Res. 01/2022): [Descrição da integração]'.\n"
+        "- O campo 'referencias' deve citar obrigatoriamente a BNCC e a Resolução CNE/CEB nº 1/2022.\n"
+        "- Mantenha linguagem objetiva e estritamente alinhada às normas pedagógicas brasileiras.\n"
+        "- Não inclua markdown ```json ... ```; responda apenas com o JSON puro."
+    )
+    return prompt
+
+
+async def generate_lesson_plan_content(
+    request: LessonPlanRequest,
+    shared_context: Optional[Tuple[List[dict], str]] = None,
+) -> dict:
+    """Gera o JSON do plano de aula com o LLM."""
+    response = await acomplete(await build_lesson_plan_prompt(request, shared_context))
+    return parse_json_response(response.text)
 
-        response = Settings.llm.complete(prompt)
-        response_text = response.text.strip()
-        if response_text.startswith("```json"):
-            response_text = response_text.replace("```json", "").replace("```", "")
-        elif response_text.startswith("```"):
-            response_text = response_text.replace("```", "")
-        data = json.loads(response_text)
+
+async def lesson_plan_job(payload: dict) -> dict:
+    request = LessonPlanRequest(**payload)
+    data, _ = await cached_generation(
+        "units.lesson_plan",
+        request.model_dump(),
+        LESSON_PLAN_PROMPT_VERSION,
+        lambda: generate_lesson_plan_content(request),
+    )
+    return LessonPlanResponse(conteudo=data).model_dump()
+
+
+@unit_router.post("/lesson-plan", response_model=LessonPlanResponse)
+async def generate_lesson_plan(
+    request: LessonPlanRequest,
+    response: Response,
+    cache_control: Optional[str] = Header(None),
+):
+    try:
+        data, cache_hit = await cached_generation(
+            "units.lesson_plan",
+            request.model_dump(),
+            LESSON_PLAN_PROMPT_VERSION,
+            lambda: generate_lesson_plan_content(request),
+            CachePolicy.from_header(cache_control),
+        )
+        response.headers["X-Cache"] = "HIT" if cache_hit else "MISS"
         return LessonPlanResponse(conteudo=data)
 
     except Exception as e:
         logger.error(f"Error generating lesson plan: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+
+@unit_router.post("/lesson-plan/stream")
+async def generate_lesson_plan_stream(
+    request: LessonPlanRequest,
+    cache_control: Optional[str] = Header(None),
+):
+    """
+    Versão SSE de /lesson-plan: eventos `token` com o texto do LLM à medida que é
+    gerado e um evento `result` final com a mesma resposta de /lesson-plan.
+    """
+    policy = CachePolicy.from_header(cache_control)
+    key, cached = await lookup_generation(
+        "units.lesson_plan", request.model_dump(), LESSON_PLAN_PROMPT_VERSION, policy
+    )
+
+    async def to_result(data):
+        return LessonPlanResponse(conteudo=data).model_dump()
+
+    events = stream_json_generation(
+        key, cached, lambda: build_lesson_plan_prompt(request), to_result, policy
+    )
+    return sse_response(events, {"X-Cache": "HIT" if cached is not None else "MISS"})
+
+class LessonPlanBatchRequest(BaseModel):
+    disciplina: str
+    serieAno: str
+    # Sem unidades, usa as sugestões de /suggest (do cache, se já geradas)
+    unidades: Optional[List[UnitSuggestion]] = None
+
+
+async def iter_lesson_plans(
+    disciplina: str,
+    serie_ano: str,
+    unidades: List[UnitSuggestion],
+    policy: CachePolicy = CachePolicy(),
+) -> AsyncIterator[Tuple[int, LessonPlanRequest, Optional[dict], Optional[Exception]]]:
+    """
+    Gera os planos de todas as unidades ao mesmo tempo e devolve
+    `(posição, requisição, plano, erro)` na ordem em que ficam prontos.
+    A recuperação da base normativa é feita uma vez e compartilhada, e só se algum plano não estiver em cache.
+    """
+    shared_context: Optional[asyncio.Task] = None
+
+    async def get_shared_context():
+        nonlocal shared_context
+        if shared_context is None:
+            shared_context = asyncio.ensure_future(
+                retrieve_lesson_plan_context(disciplina, serie_ano)
+            )
+        return await shared_context
+
+    async def generate(request: LessonPlanRequest) -> dict:
+        return await generate_lesson_plan_content(request, await get_shared_context())
+
+    async def plan(position: int, request: LessonPlanRequest):
+        try:
+            data, _ = await cached_generation(
+                "units.lesson_plan",
+                request.model_dump(),
+                LESSON_PLAN_PROMPT_VERSION,
+                lambda: generate(request),
+                policy,
+            )
+            return position, request, data, None
+        except Exception as e:
+            logger.error(f"Error generating lesson plan for {request.unidade}: {str(e)}")
+            return position, request, None, e
+
+    requests = [
+        LessonPlanRequest(
+            disciplina=disciplina, serieAno=serie_ano, unidade=unit.nome, descricao=unit.descricao
+        )
+        for unit in unidades
+    ]
+    for next_plan in asyncio.as_completed([plan(i, r) for i, r in enumerate(requests)]):
+        yield await next_plan
+
+
+@unit_router.post("/lesson-plans/batch")
+async def generate_lesson_plans_batch(
+    request: LessonPlanBatchRequest,
+    cache_control: Optional[str] = Header(None),
+):
+    """
+    Gera os planos de aula de todas as unidades em paralelo (SSE). Eventos:
+    `units` (as unidades usadas), `plan` a cada plano pronto (`index`, `unidade`, `conteudo`),
+    `error` por plano que falhou e `done` ao final.
+    """
+    policy = CachePolicy.from_header(cache_control)
+
+    async def events():
+        unidades = request.unidades
+        if unidades is None:
+            try:
+                suggestions = await suggest_job(
+                    {"disciplina": request.disciplina, "serieAno": request.serieAno}
+                )
+            except Exception as e:
+                logger.error(f"Error generating unit suggestions: {str(e)}")
+                yield sse_event("error", {"detail": str(e)})
+                return
+            unidades = [UnitSuggestion(**unit) for unit in suggestions["sugestoes"]]
+        yield sse_event("units", [unit.model_dump() for unit in unidades])
+
+        failed = 0
+        async for position, plan_request, data, error in iter_lesson_plans(
+            request.disciplina, request.serieAno, unidades, policy
+        ):
+            if error is not None:
+                failed += 1
+                yield sse_event(
+                    "error",
+                    {"index": position, "unidade": plan_request.unidade, "detail": str(error)},
+                )
+            else:
+                yield sse_event(
+                    "plan",
+                    {"index": position, "unidade": plan_request.unidade, "conteudo": data},
+                )
+        yield sse_event("done", {"total": len(unidades), "failed": failed})
+
+    return sse_response(events())
+
 class LessonPlanPdfRequest(BaseModel):
     data: Dict[str, object]
 
@@ -123,86 +325,118 @@ class LessonPlanPdfResponse(BaseModel):
     download_url: str
 
 @unit_router.post("/lesson-plan/pdf", response_model=LessonPlanPdfResponse)
-async def generate_lesson_plan_pdf(request: LessonPlanPdfRequest):
+async def generate_lesson_plan_pdf(
+    request: LessonPlanPdfRequest,
+    download: bool = Query(False, description="Devolve o PDF direto, sem gravar em disco"),
+):
     try:
-        filename = LessonPlanGenerator.generate_pdf(request.data or {})
-        return LessonPlanPdfResponse(
-            filename=filename,
-            download_url=f"/api/files/output/generated_plans/{filename}",
-        )
+        data = request.data or {}
+        if download:
+            return await document_download(
+                "lesson-plan", "pdf", data, document_filename("plano", data.get("titulo"), "pdf")
+            )
+        artifact = await get_artifact_store().get_or_render("lesson-plan", "pdf", data)
+        return LessonPlanPdfResponse(filename=artifact.filename, download_url=artifact.url)
     except Exception as e:
         logger.error(f"Error generating lesson plan PDF: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
-@unit_router.post("/suggest", response_model=UnitSuggestionResponse)
-async def suggest_units(request: UnitSuggestionRequest):
-    try:
-        index = get_index()
-        
-        # Filtros: Focar em documentos de currículo (BNCC/CIEB) para sugestão de unidades
-        filters = MetadataFilters(
-            filters=[
-                MetadataFilter(key="category", value="normativa"),  # BNCC
-                MetadataFilter(key="category", value="apoio"),      # CIEB
-            ],
-            condition="or"
+async def generate_unit_suggestions(request: UnitSuggestionRequest) -> dict:
+    """Recupera as unidades temáticas da BNCC e gera as 4 sugestões com o LLM."""
+    skills = (await aget_skill_index()).lookup(request.serieAno, request.disciplina)
+    # Tabela completa dispensa a busca vetorial; incompleta, a busca complementa
+    skills_complete = bool(skills) and not missing_skills(skills)
+    index = None if skills_complete else await aget_index()
+
+    # Filtros: Focar em documentos de currículo (BNCC/CIEB) para sugestão de unidades
+    filters = MetadataFilters(
+        filters=[
+            MetadataFilter(key="category", value="normativa"),  # BNCC
+            MetadataFilter(key="category", value="apoio"),      # CIEB
+        ],
+        condition="or"
+    )
+
+    if skills_complete:
+        retriever = None
+    elif index is None:
+        logger.warning("Index not initialized, using LLM knowledge only")
+        retriever = None
+    else:
+        retriever = await aget_retriever(
+            index,
+            similarity_top_k=5,
+            filters=filters
         )
 
-        if index is None:
-             logger.warning("Index not initialized, using LLM knowledge only")
-             retriever = None
-        else:
-            retriever = index.as_retriever(
-                similarity_top_k=5,
-                filters=filters
-            )
+    context_text = ""
+    if retriever:
+        query = (
+            f"Quais são as unidades temáticas da BNCC para "
+            f"{request.serieAno}, disciplina {request.disciplina}?"
+        )
+        try:
+            context_text = await aretrieve_context(retriever, query)
+        except Exception as e:
+            logger.warning(f"Falha ao recuperar contexto (embeddings indisponíveis): {e}")
+            context_text = ""
+    if skills:
+        skills_text = "Habilidades da BNCC para esta série e disciplina:\n" + format_skills(skills)
+        context_text = f"{skills_text}\n\n{context_text}" if context_text else skills_text
 
-        context_text = ""
-        if retriever:
-            query = (
-                f"Quais são as unidades temáticas da BNCC para "
-                f"{request.serieAno}, disciplina {request.disciplina}?"
-            )
-            try:
-                nodes = retriever.retrieve(query)
-                context_text = "\n\n".join([n.get_content() for n in nodes])
-            except Exception as e:
-                logger.warning(f"Falha ao recuperar contexto (embeddings indisponíveis): {e}")
-                context_text = ""
-
-        prompt = (
-            "Você é um especialista em currículo escolar alinhado à BNCC.\n"
-            "Sua tarefa é sugerir EXATAMENTE 4 unidades de ensino lógicas, sequenciais e distintas para cobrir todo o ano letivo.\n\n"
-            f'Série/Ano: "{request.serieAno}"\n'
-            f'Disciplina: "{request.disciplina}"\n\n'
-            "Contexto da BNCC (se houver):\n"
-            f"{context_text}\n\n"
-            "REGRAS OBRIGATÓRIAS:\n"
-            "1. Gere exatamente 4 unidades (Bimestre 1, 2, 3 e 4).\n"
-            "2. Os nomes das unidades devem ser TEMÁTICOS e DESCRITIVOS (ex: 'Introdução à Lógica', 'Cidadania Digital'), NÃO use apenas 'Unidade 1'.\n"
-            "3. As unidades devem seguir uma progressão lógica de dificuldade.\n"
-            "4. Não repita nomes ou temas.\n\n"
-            "Responda EXATAMENTE com um JSON válido no seguinte formato:\n"
-            "{\n"
-            '  "sugestoes": [\n'
-            '    { "nome": "Título Temático da Unidade 1", "descricao": "Descrição clara dos objetivos e temas abordados." },\n'
-            '    { "nome": "Título Temático da Unidade 2", "descricao": "Descrição clara dos objetivos e temas abordados." },\n'
-            '    { "nome": "Título Temático da Unidade 3", "descricao": "Descrição clara dos objetivos e temas abordados." },\n'
-            '    { "nome": "Título Temático da Unidade 4", "descricao": "Descrição clara dos objetivos e temas abordados." }\n'
-            "  ]\n"
-            "}\n\n"
-            "Não inclua markdown ```json ... ```; responda apenas com o JSON puro."
+    prompt = (
+        "Você é um especialista em currículo escolar alinhado à BNCC.\n"
+        "Sua tarefa é sugerir EXATAMENTE 4 unidades de ensino lógicas, sequenciais e distintas para cobrir todo o ano letivo.\n\n"
+        f'Série/Ano: "{request.serieAno}"\n'
+        f'Disciplina: "{request.disciplina}"\n\n'
+        "Contexto da BNCC (se houver):\n"
+        f"{context_text}\n\n"
+        "REGRAS OBRIGATÓRIAS:\n"
+        "1. Gere exatamente 4 unidades (Bimestre 1, 2, 3 e 4).\n"
+        "2. Os nomes das unidades devem ser TEMÁTICOS e DESCRITIVOS (ex: 'Introdução à Lógica', 'Cidadania Digital'), NÃO use apenas 'Unidade 1'.\n"
+        "3. As unidades devem seguir uma progressão lógica de dificuldade.\n"
+        "4. Não repita nomes ou temas.\n\n"
+        "Responda EXATAMENTE com um JSON válido no seguinte formato:\n"
+        "{\n"
+        '  "sugestoes": [\n'
+        '    { "nome": "Título Temático da Unidade 1", "descricao": "Descrição clara dos objetivos e temas abordados." },\n'
+        '    { "nome": "Título Temático da Unidade 2", "descricao": "Descrição clara dos objetivos e temas abordados." },\n'
+        '    { "nome": "Título Temático da Unidade 3", "descricao": "Descrição clara dos objetivos e temas abordados." },\n'
+        '    { "nome": "Título Temático da Unidade 4", "descricao": "Descrição clara dos objetivos e temas abordados." }\n'
+        "  ]\n"
+        "}\n\n"
+        "Não inclua markdown ```json ... ```; responda apenas com o JSON puro."
+    )
+    
+    response = await acomplete(prompt)
+    return parse_json_response(response.text)
+
+
+async def suggest_job(payload: dict) -> dict:
+    request = UnitSuggestionRequest(**payload)
+    data, _ = await cached_generation(
+        "units.suggest",
+        request.model_dump(),
+        SUGGEST_PROMPT_VERSION,
+        lambda: generate_unit_suggestions(request),
+    )
+    return UnitSuggestionResponse(**data).model_dump()
+
+
+@unit_router.post("/suggest", response_model=UnitSuggestionResponse)
+async def suggest_units(
+    request: UnitSuggestionRequest,
+    response: Response,
+    cache_control: Optional[str] = Header(None),
+):
+    try:
+        data, cache_hit = await cached_generation(
+            "units.suggest",
+            request.model_dump(),
+            SUGGEST_PROMPT_VERSION,
+            lambda: generate_unit_suggestions(request),
+            CachePolicy.from_header(cache_control),
         )
-        
-        response = Settings.llm.complete(prompt)
-        response_text = response.text.strip()
-        
-        # Clean up markdown code blocks if present
-        if response_text.startswith("```json"):
-            response_text = response_text.replace("```json", "").replace("```", "")
-        elif response_text.startswith("```"):
-            response_text = response_text.replace("```", "")
-            
-        data = json.loads(response_text)
+        response.headers["X-Cache"] = "HIT" if cache_hit else "MISS"
         return data
 
     except Exception as e:
@@ -1,23 +1,105 @@
 import os
 from fpdf import FPDF
+from fpdf.enums import Align, WrapMode, XPos, YPos
+from fpdf.line_break import MultiLineBreak
 from fpdf.errors import FPDFException
 from docx import Document
 from docx.shared import Pt
+import io
 import uuid
+from typing import List, Optional
 
 OUTPUT_DIR = "output/generated_activities"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+def _break_lines(pdf: FPDF, width: float, text: str, align: str) -> list:
+    """Quebra `text` em linhas (`TextLine`) como `multi_cell` faz, sem desenhar nada."""
+    text = pdf.normalize_text(text).replace("\r", "")
+    fragments = (
+        pdf._preload_bidirectional_text(text, False)
+        if pdf.text_shaping
+        else pdf._preload_font_styles(text, False)
+    )
+    line_break = MultiLineBreak(
+        fragments, width, [pdf.c_margin, pdf.c_margin], align=Align.coerce(align), wrapmode=WrapMode.WORD
+    )
+    lines = []
+    line = line_break.get_line()
+    while line is not None:
+        lines.append(line)
+        line = line_break.get_line()
+    return lines
+
+
+def _write_text(pdf: FPDF, layout: Optional[dict], w: float, h: float, text: str, align: str = "J"):
+    """`multi_cell`, mas com as linhas já quebradas guardadas em `layout` (se informado)."""
+    width = w or pdf.w - pdf.r_margin - pdf.x
+    lines = None
+    if layout is not None:
+        key = (text, width, h, align, pdf.font_family, pdf.font_style, pdf.font_size_pt)
+        lines = layout.get(key)
+        if lines is None:
+            lines = layout[key] = _break_lines(pdf, width, text, align)
+    if not lines:
+        pdf.multi_cell(w, h, text, align=align)
+        return
+    # Mesmo desenho do multi_cell, inclusive o espaçamento do texto justificado
+    for index, line in enumerate(lines):
+        pdf._perform_page_break_if_need_be(h)
+        last = index == len(lines) - 1
+        pdf._render_styled_text_line(
+            line, h=h, new_x=XPos.RIGHT if last else XPos.LEFT, new_y=YPos.NEXT
+        )
+    if lines[-1].trailing_nl:
+        pdf.ln()
+
 class ActivityGenerator:
     @staticmethod
     def generate_pdf(data: dict) -> str:
+        filename = f"atividade_{uuid.uuid4()}.pdf"
+        with open(os.path.join(OUTPUT_DIR, filename), "wb") as f:
+            f.write(ActivityGenerator.render_pdf(data))
+        return filename
+
+    @staticmethod
+    def render_pdf(data: dict) -> bytes:
+        """Gera o PDF em memória, sem gravar em disco."""
+        pdf = FPDF()
+        ActivityGenerator.write_pdf(pdf, data)
+        return bytes(pdf.output())
+
+    @staticmethod
+    def render_class_set_pdf(variants: List[dict], answer_key: List[List[str]]) -> bytes:
+        """Todas as versões da atividade e o gabarito em um único PDF."""
         pdf = FPDF()
+        # Textos repetidos entre as versões (texto de apoio, questões, alternativas)
+        layout: dict = {}
+        for number, variant in enumerate(variants, 1):
+            ActivityGenerator.write_pdf(pdf, variant, f"Versão {number}", layout)
+        pdf.add_page()
+        pdf.set_font("Helvetica", "B", 16)
+        pdf.cell(0, 10, "Gabarito", ln=True, align="C")
+        pdf.ln(5)
+        pdf.set_font("Helvetica", size=11)
+        for number, answers in enumerate(answer_key, 1):
+            line = "  ".join(f"{idx}-{answer}" for idx, answer in enumerate(answers, 1))
+            pdf.set_x(pdf.l_margin)
+            pdf.multi_cell(pdf.w - pdf.l_margin - pdf.r_margin, 8, f"Versão {number}:  {line}")
+        return bytes(pdf.output())
+
+    @staticmethod
+    def write_pdf(pdf: FPDF, data: dict, version: str = "", layout: Optional[dict] = None):
+        """
+        Escreve a atividade a partir de uma nova página de `pdf`. Com `layout`, a
+        quebra de linha de cada texto é calculada uma vez e reaproveitada.
+        """
         pdf.add_page()
         pdf.set_font("Helvetica", size=12)
         
         # Header
         pdf.set_font("Helvetica", "B", 16)
-        pdf.cell(0, 10, "Atividade Educacional", ln=True, align="C")
+        header = f"Atividade Educacional - {version}" if version else "Atividade Educacional"
+        pdf.cell(0, 10, header, ln=True, align="C")
         pdf.ln(10)
         
         pdf.set_font("Helvetica", size=12)
@@ -29,7 +111,7 @@ class ActivityGenerator:
         pdf.set_font("Helvetica", "B", 14)
         title = data.get("title", "Sem Título")
         safe_title = str(title).encode('latin-1', 'replace').decode('latin-1')
-        pdf.multi_cell(0, 10, safe_title, align="C")
+        _write_text(pdf, layout, 0, 10, safe_title, align="C")
         pdf.ln(5)
         
         # Objective
@@ -38,7 +120,7 @@ class ActivityGenerator:
         pdf.set_font("Helvetica", size=12)
         objective = data.get("objective", "")
         safe_objective = str(objective).encode('latin-1', 'replace').decode('latin-1')
-        pdf.multi_cell(0, 10, safe_objective)
+        _write_text(pdf, layout, 0, 10, safe_objective)
         pdf.ln(5)
 
         bncc_skills = data.get("bncc_skills") or []
@@ -52,9 +134,9 @@ class ActivityGenerator:
                 pdf.set_x(pdf.l_margin)
                 width = pdf.w - pdf.l_margin - pdf.r_margin
                 try:
-                    pdf.multi_cell(width, 8, f"- {safe_skill}")
+                    _write_text(pdf, layout, width, 8, f"- {safe_skill}")
                 except FPDFException:
-                    pdf.multi_cell(width, 8, "-")
+                    _write_text(pdf, layout, width, 8, "-")
             pdf.ln(5)
         
         # Content (Context)
@@ -64,7 +146,7 @@ class ActivityGenerator:
             pdf.set_font("Helvetica", size=11)
             content = data.get("content", "")
             safe_content = str(content).encode('latin-1', 'replace').decode('latin-1')
-            pdf.multi_cell(0, 10, safe_content)
+            _write_text(pdf, layout, 0, 10, safe_content)
             pdf.ln(5)
         
         pdf.set_font("Helvetica", "B", 12)
@@ -80,7 +162,7 @@ class ActivityGenerator:
                 pdf.set_x(pdf.l_margin)
                 width = pdf.w - pdf.l_margin - pdf.r_margin
                 try:
-                    pdf.multi_cell(width, 10, f"{idx}. {safe_enunciado}")
+                    _write_text(pdf, layout, width, 10, f"{idx}. {safe_enunciado}")
                 except FPDFException:
                     # Se até o enunciado der erro, apenas pula a linha da questão
                     pdf.cell(0, 10, f"{idx}.", ln=True)
@@ -91,7 +173,7 @@ class ActivityGenerator:
                     pdf.set_x(pdf.l_margin)
                     width = pdf.w - pdf.l_margin - pdf.r_margin
                     try:
-                        pdf.multi_cell(width, 8, safe_alt)
+                        _write_text(pdf, layout, width, 8, safe_alt)
                     except FPDFException:
                         # Se a alternativa der erro, escreve só um traço e segue
                         pdf.cell(0, 8, "-", ln=True)
@@ -99,22 +181,46 @@ class ActivityGenerator:
                 pdf.set_font("Helvetica", size=12)
             else:
                 safe_question = str(q).encode("latin-1", "replace").decode("latin-1")
-                pdf.multi_cell(0, 10, f"{idx}. {safe_question}")
+                _write_text(pdf, layout, 0, 10, f"{idx}. {safe_question}")
                 pdf.ln(5)
                 pdf.ln(20)
-            
-        filename = f"atividade_{uuid.uuid4()}.pdf"
-        filepath = os.path.join(OUTPUT_DIR, filename)
-        pdf.output(filepath)
-        
-        return filename
 
     @staticmethod
     def generate_docx(data: dict) -> str:
+        filename = f"atividade_{uuid.uuid4()}.docx"
+        with open(os.path.join(OUTPUT_DIR, filename), "wb") as f:
+            f.write(ActivityGenerator.render_docx(data))
+        return filename
+
+    @staticmethod
+    def render_docx(data: dict) -> bytes:
+        """Gera o DOCX em memória, sem gravar em disco."""
         doc = Document()
-        
+        ActivityGenerator.write_docx(doc, data)
+        buffer = io.BytesIO()
+        doc.save(buffer)
+        return buffer.getvalue()
+
+    @staticmethod
+    def render_class_set_docx(variants: List[dict], answer_key: List[List[str]]) -> bytes:
+        """Todas as versões da atividade e o gabarito em um único DOCX, uma versão por página."""
+        doc = Document()
+        for number, variant in enumerate(variants, 1):
+            ActivityGenerator.write_docx(doc, variant, f"Versão {number}")
+            doc.add_page_break()
+        doc.add_heading('Gabarito', 0)
+        for number, answers in enumerate(answer_key, 1):
+            line = "  ".join(f"{idx}-{answer}" for idx, answer in enumerate(answers, 1))
+            doc.add_paragraph(f"Versão {number}:  {line}")
+        buffer = io.BytesIO()
+        doc.save(buffer)
+        return buffer.getvalue()
+
+    @staticmethod
+    def write_docx(doc: Document, data: dict, version: str = ""):
+        """Acrescenta a atividade ao final de `doc`."""
         # Header
-        doc.add_heading('Atividade Educacional', 0)
+        doc.add_heading(f"Atividade Educacional - {version}" if version else 'Atividade Educacional', 0)
         
         p = doc.add_paragraph()
         p.add_run("Escola: _______________________________________________________\n")
@@ -151,9 +257,3 @@ class ActivityGenerator:
                 doc.add_paragraph(f"{idx}. {q}")
                 doc.add_paragraph("_" * 80)
                 doc.add_paragraph("")
-            
-        filename = f"atividade_{uuid.uuid4()}.docx"
-        filepath = os.path.join(OUTPUT_DIR, filename)
-        doc.save(filepath)
-        
-        return filename
@@ -0,0 +1,321 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.api.services import activity_generator, class_set, lesson_plan_generator
+from app.api.services.renderer import document_response, render_bytes
+from app.api.services.single_flight import SingleFlight
+from app.engine.executor import run_blocking
+
+logger = logging.getLogger("uvicorn")
+
+# Incrementar sempre que o layout dos geradores mudar, para não servir documentos antigos
+RENDER_VERSION = "3"
+
+# kind -> (segmento da URL, diretório, prefixo do arquivo)
+ARTIFACT_KINDS: Dict[str, Tuple[str, str, str]] = {
+    "activity": ("activities", activity_generator.OUTPUT_DIR, "atividade"),
+    "lesson-plan": ("plans", lesson_plan_generator.OUTPUT_DIR, "plano"),
+    "class-set": ("class-sets", class_set.OUTPUT_DIR, "turma"),
+}
+FILENAME_PATTERN = re.compile(r"^[a-z]+_[0-9a-f]{32}\.(pdf|docx)$")
+# Documentos são imutáveis: o nome muda junto com o conteúdo de entrada
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Arquivos .tmp mais antigos que isso são restos de gravações interrompidas
+STALE_TMP_AGE = 3600
+
+
+@dataclass
+class Artifact:
+    kind: str
+    filename: str
+    path: str
+    etag: str
+    # True quando veio do store, sem renderizar
+    hit: bool = False
+
+    @property
+    def url(self) -> str:
+        return f"/api/artifacts/{ARTIFACT_KINDS[self.kind][0]}/{self.filename}"
+
+
+def artifact_key(kind: str, fmt: str, data: dict) -> str:
+    """Hash da entrada canônica (dados + formato): o mesmo plano gera sempre o mesmo nome."""
+    payload = {"kind": kind, "format": fmt, "data": data, "render_version": RENDER_VERSION}
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def content_etag(content: bytes) -> str:
+    return f'"{hashlib.sha256(content).hexdigest()}"'
+
+
+class ArtifactStore:
+    """
+    Documentos renderizados endereçados pelo conteúdo de entrada: uma exportação
+    repetida é servida do disco sem renderizar de novo.
+
+    Os diretórios têm limite de tamanho, de número de arquivos e de idade:
+    `sweep` apaga os expirados e depois os baixados há mais tempo (LRU).
+    """
+
+    def __init__(
+        self,
+        kinds: Dict[str, Tuple[str, str, str]] = ARTIFACT_KINDS,
+        max_bytes: int = 1024 ** 3,
+        max_files: int = 5000,
+        ttl: float = 30 * 24 * 3600,
+    ):
+        self.kinds = kinds
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        # path -> (mtime_ns, etag), para não reler o arquivo a cada download
+        self._etags: Dict[str, Tuple[int, str]] = {}
+        self._flights = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.downloads = 0
+        self.evictions = 0
+
+    def kind_for_segment(self, segment: str) -> Optional[str]:
+        for kind, (url_segment, _, _) in self.kinds.items():
+            if url_segment == segment:
+                return kind
+        return None
+
+    def path(self, kind: str, filename: str) -> str:
+        return os.path.join(self.kinds[kind][1], filename)
+
+    def filename(self, kind: str, key: str, fmt: str) -> str:
+        return f"{self.kinds[kind][2]}_{key}.{fmt}"
+
+    def etag(self, path: str) -> str:
+        mtime_ns = os.stat(path).st_mtime_ns
+        with self.lock:
+            cached = self._etags.get(path)
+        if cached and cached[0] == mtime_ns:
+            return cached[1]
+        with open(path, "rb") as f:
+            etag = content_etag(f.read())
+        with self.lock:
+            self._etags[path] = (mtime_ns, etag)
+        return etag
+
+    def get(self, kind: str, filename: str) -> Optional[Artifact]:
+        if kind not in self.kinds or not FILENAME_PATTERN.match(filename):
+            return None
+        path = self.path(kind, filename)
+        if not os.path.isfile(path):
+            return None
+        return Artifact(kind, filename, path, self.etag(path), hit=True)
+
+    def save(self, kind: str, filename: str, content: bytes) -> Artifact:
+        path = self.path(kind, filename)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+        etag = content_etag(content)
+        with self.lock:
+            self._etags[path] = (os.stat(path).st_mtime_ns, etag)
+        return Artifact(kind, filename, path, etag)
+
+    def touch(self, artifact: Artifact, download: bool = False):
+        """Marca o último acesso no atime do arquivo (mantendo o mtime), base do LRU."""
+        try:
+            stat = os.stat(artifact.path)
+            os.utime(artifact.path, ns=(time.time_ns(), stat.st_mtime_ns))
+        except FileNotFoundError:
+            return
+        with self.lock:
+            if download:
+                self.downloads += 1
+            else:
+                self.hits += 1
+
+    def _files(self) -> List[Tuple[str, os.stat_result]]:
+        files = []
+        for _, directory, _ in self.kinds.values():
+            try:
+                entries = list(os.scandir(directory))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                try:
+                    if entry.is_file():
+                        files.append((entry.path, entry.stat()))
+                except FileNotFoundError:
+                    continue
+        return files
+
+    def _remove(self, path: str) -> bool:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return False
+        with self.lock:
+            self._etags.pop(path, None)
+        return True
+
+    def sweep(self) -> int:
+        """Apaga os arquivos expirados (TTL) e, acima dos limites, os de acesso mais antigo. Devolve quantos apagou."""
+        now = time.time()
+        removed = 0
+        kept = []
+        for path, stat in self._files():
+            last_access = max(stat.st_atime, stat.st_mtime)
+            if path.endswith(".tmp"):
+                if now - stat.st_mtime > STALE_TMP_AGE:
+                    self._remove(path)
+                continue
+            if self.ttl > 0 and now - last_access > self.ttl:
+                removed += self._remove(path)
+            else:
+                kept.append((last_access, path, stat.st_size))
+
+        kept.sort()
+        total_bytes = sum(size for _, _, size in kept)
+        count = len(kept)
+        for _, path, size in kept:
+            if total_bytes <= self.max_bytes and count <= self.max_files:
+                break
+            if self._remove(path):
+                removed += 1
+            total_bytes -= size
+            count -= 1
+
+        with self.lock:
+            self.evictions += removed
+        if removed:
+            logger.info(f"Output sweep removed {removed} files")
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        files = [(path, stat) for path, stat in self._files() if not path.endswith(".tmp")]
+        by_kind = {}
+        for kind, (_, directory, _) in self.kinds.items():
+            sizes = [stat.st_size for path, stat in files if os.path.dirname(path) == directory]
+            by_kind[kind] = {"files": len(sizes), "bytes": sum(sizes)}
+        total_files = len(files)
+        total_bytes = sum(stat.st_size for _, stat in files)
+        with self.lock:
+            requests = self.hits + self.misses
+            return {
+                "files": total_files,
+                "bytes": total_bytes,
+                "max_files": self.max_files,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "occupancy": {
+                    "files": total_files / self.max_files if self.max_files else 0,
+                    "bytes": total_bytes / self.max_bytes if self.max_bytes else 0,
+                },
+                "by_kind": by_kind,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / requests if requests else 0,
+                "downloads": self.downloads,
+                "evictions": self.evictions,
+            }
+
+    async def lookup(self, kind: str, fmt: str, data: dict) -> Optional[Artifact]:
+        fmt = fmt.lower()
+        filename = self.filename(kind, artifact_key(kind, fmt, data), fmt)
+        artifact = await run_blocking(self.get, kind, filename)
+        if artifact is None:
+            with self.lock:
+                self.misses += 1
+        else:
+            await run_blocking(self.touch, artifact)
+        return artifact
+
+    async def get_or_render(self, kind: str, fmt: str, data: dict) -> Artifact:
+        """Devolve o documento do store ou renderiza (uma vez só, mesmo com pedidos simultâneos) e grava."""
+        fmt = fmt.lower()
+        filename = self.filename(kind, artifact_key(kind, fmt, data), fmt)
+        artifact = await run_blocking(self.get, kind, filename)
+        if artifact is not None:
+            await run_blocking(self.touch, artifact)
+            return artifact
+
+        async def render_and_save():
+            with self.lock:
+                self.misses += 1
+            content = await render_bytes(kind, fmt, data)
+            return await run_blocking(self.save, kind, filename, content)
+
+        return await self._flights.run(filename, render_and_save)
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+_artifact_store: Optional[ArtifactStore] = None
+
+
+_sweeper: Optional[asyncio.Task] = None
+
+
+def get_artifact_store() -> ArtifactStore:
+    global _artifact_store
+    if _artifact_store is None:
+        _artifact_store = ArtifactStore(
+            max_bytes=int(os.getenv("OUTPUT_MAX_BYTES", str(1024 ** 3))),
+            max_files=int(os.getenv("OUTPUT_MAX_FILES", "5000")),
+            ttl=float(os.getenv("OUTPUT_TTL", str(30 * 24 * 3600))),
+        )
+    return _artifact_store
+
+
+async def _sweep_forever(interval: float):
+    while True:
+        try:
+            await run_blocking(get_artifact_store().sweep)
+        except Exception:
+            logger.exception("Error sweeping output directories")
+        await asyncio.sleep(interval)
+
+
+async def start_output_sweeper():
+    """Chamado no startup: limpa os diretórios de saída a cada OUTPUT_SWEEP_INTERVAL segundos."""
+    global _sweeper
+    interval = float(os.getenv("OUTPUT_SWEEP_INTERVAL", "600"))
+    if _sweeper is None and interval > 0:
+        _sweeper = asyncio.create_task(_sweep_forever(interval), name="output-sweeper")
+
+
+async def stop_output_sweeper():
+    global _sweeper
+    if _sweeper is not None:
+        _sweeper.cancel()
+        await asyncio.gather(_sweeper, return_exceptions=True)
+        _sweeper = None
+
+
+async def document_download(
+    kind: str, fmt: str, data: dict, filename: str, headers: Optional[dict] = None
+):
+    """
+    Resposta de download direto: usa o documento do store se já existir; senão
+    renderiza em memória, sem gravar em disco.
+    """
+    artifact = await get_artifact_store().lookup(kind, fmt, data)
+    if artifact is not None:
+        content, etag = await run_blocking(_read_file, artifact.path), artifact.etag
+    else:
+        content = await render_bytes(kind, fmt, data)
+        etag = content_etag(content)
+    return document_response(content, filename, {"ETag": etag, **(headers or {})})
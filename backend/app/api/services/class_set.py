@@ -0,0 +1,68 @@
+import random
+import re
+import string
+from typing import List, Optional, Tuple
+
+OUTPUT_DIR = "output/generated_class_sets"
+
+# "A) texto", "b. texto", "C - texto"...
+ALTERNATIVE_LABEL = re.compile(r"^\s*([A-Za-z])\s*[\)\.\-:]\s*")
+# Maior número de versões aceito em um único documento
+MAX_VARIANTS = 200
+
+# Formas do campo `correta`: "A", "a)", "(b)", "C) texto"...
+ANSWER_LABEL = re.compile(r"^\s*\(?([A-Za-z])\s*(?:[\)\.\-:]|$)")
+# ..."Alternativa C", "Letra b", "Opção D"...
+ANSWER_NAMED = re.compile(r"\b(?:alternativa|letra|op[cç][aã]o)\s+([A-Za-z])\b", re.IGNORECASE)
+# ...ou a última letra maiúscula isolada no texto ("A resposta é C")
+ANSWER_LETTER = re.compile(r"\b([A-Z])\b")
+
+
+def correct_index(question: dict, alternatives: List[str]) -> Optional[int]:
+    """Posição da alternativa correta a partir do campo `correta` ("A", "c)", "Letra B"...)."""
+    answer = str(question.get("correta") or question.get("answer") or "").strip()
+    match = ANSWER_LABEL.search(answer) or ANSWER_NAMED.search(answer)
+    if match:
+        letter = match.group(1)
+    else:
+        letters = ANSWER_LETTER.findall(answer)
+        if not letters:
+            return None
+        letter = letters[-1]
+    index = ord(letter.upper()) - ord("A")
+    return index if 0 <= index < len(alternatives) else None
+
+
+def shuffle_activity(data: dict, rng: random.Random) -> Tuple[dict, List[str]]:
+    """
+    Embaralha a ordem das questões e das alternativas, reescrevendo as letras.
+    Devolve `(atividade, gabarito)`; questões sem resposta conhecida ficam com "-".
+    """
+    questions = list(data.get("questions") or [])
+    rng.shuffle(questions)
+    shuffled, answers = [], []
+    for question in questions:
+        if not isinstance(question, dict):
+            shuffled.append(question)
+            answers.append("-")
+            continue
+        alternatives = list(question.get("alternativas") or question.get("options") or [])
+        correct = correct_index(question, alternatives)
+        order = list(range(len(alternatives)))
+        rng.shuffle(order)
+        labels = string.ascii_uppercase
+        relabeled = [
+            f"{labels[position]}) {ALTERNATIVE_LABEL.sub('', str(alternatives[original]), count=1)}"
+            for position, original in enumerate(order)
+        ]
+        answer = labels[order.index(correct)] if correct is not None else "-"
+        shuffled.append({**question, "alternativas": relabeled, "correta": answer})
+        answers.append(answer)
+    return {**data, "questions": shuffled}, answers
+
+
+def build_class_set(data: dict, variants: int, seed: int = 0) -> Tuple[List[dict], List[List[str]]]:
+    """N versões embaralhadas da atividade e o gabarito de cada uma. A mesma semente gera as mesmas versões."""
+    rng = random.Random(seed)
+    shuffled = [shuffle_activity(data, rng) for _ in range(variants)]
+    return [variant for variant, _ in shuffled], [answers for _, answers in shuffled]
@@ -0,0 +1,219 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from cachetools import TTLCache
+from llama_index.core.settings import Settings
+
+from app.api.services.single_flight import generation_flights
+from app.engine.executor import run_blocking
+
+logger = logging.getLogger("uvicorn")
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """
+    Política derivada do header `Cache-Control` da requisição:
+    - `no-cache`: ignora o cache na leitura, mas grava o novo resultado;
+    - `no-store`: não lê nem grava.
+    """
+
+    read: bool = True
+    write: bool = True
+
+    @classmethod
+    def from_header(cls, cache_control: Optional[str]) -> "CachePolicy":
+        if not cache_control:
+            return cls()
+        directives = {d.strip().lower() for d in cache_control.split(",")}
+        if "no-store" in directives:
+            return cls(read=False, write=False)
+        if "no-cache" in directives or "max-age=0" in directives:
+            return cls(read=False, write=True)
+        return cls()
+
+
+def normalize_value(value: Any) -> Any:
+    if isinstance(value, str):
+        value = unicodedata.normalize("NFKC", value)
+        return re.sub(r"\s+", " ", value).strip().casefold()
+    if isinstance(value, dict):
+        return {k: normalize_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize_value(v) for v in value]
+    return value
+
+
+def current_model_name() -> str:
+    try:
+        return Settings.llm.metadata.model_name
+    except Exception:
+        return "unknown"
+
+
+class GenerationCache:
+    """
+    Cache de gerações em dois níveis: LRU/TTL em memória e SQLite em disco,
+    para que os resultados sobrevivam a reinícios do servidor.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        maxsize: int = 256,
+        ttl: float = 7 * 24 * 3600,
+        purge_every: int = 100,
+    ):
+        self.path = path
+        self.ttl = ttl
+        # A cada `purge_every` gravações, apaga do SQLite as linhas expiradas
+        self.purge_every = purge_every
+        self._writes = 0
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS generations ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._connection.commit()
+        return self._connection
+
+    @staticmethod
+    def make_key(kind: str, fields: Dict[str, Any], prompt_version: str) -> str:
+        payload = {
+            "kind": kind,
+            "fields": normalize_value(fields),
+            "model": current_model_name(),
+            "prompt_version": prompt_version,
+        }
+        raw = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self.lock:
+            value = self.memory.get(key)
+            if value is not None:
+                self.hits += 1
+                return value
+            row = self._db().execute(
+                "SELECT value, expires_at FROM generations WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] < time.time():
+                self.misses += 1
+                return None
+            value = json.loads(row[0])
+            self.memory[key] = value
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any):
+        raw = json.dumps(value, ensure_ascii=False)
+        with self.lock:
+            self.memory[key] = value
+            db = self._db()
+            now = time.time()
+            db.execute(
+                "INSERT OR REPLACE INTO generations (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, raw, now + self.ttl),
+            )
+            self._writes += 1
+            if self.purge_every > 0 and self._writes % self.purge_every == 0:
+                db.execute("DELETE FROM generations WHERE expires_at < ?", (now,))
+            db.commit()
+
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+            db = self._db()
+            db.execute("DELETE FROM generations")
+            db.commit()
+
+    async def aget(self, key: str) -> Optional[Any]:
+        return await run_blocking(self.get, key)
+
+    async def aset(self, key: str, value: Any):
+        await run_blocking(self.set, key, value)
+
+
+_generation_cache: Optional[GenerationCache] = None
+
+
+def get_generation_cache() -> Optional[GenerationCache]:
+    global _generation_cache
+    if os.getenv("GENERATION_CACHE_ENABLED", "true").lower() != "true":
+        return None
+    if _generation_cache is None:
+        _generation_cache = GenerationCache(
+            path=os.getenv("GENERATION_CACHE_PATH", "cache/generation.sqlite3"),
+            maxsize=int(os.getenv("GENERATION_CACHE_SIZE", "256")),
+            ttl=float(os.getenv("GENERATION_CACHE_TTL", str(7 * 24 * 3600))),
+            purge_every=int(os.getenv("GENERATION_CACHE_PURGE_EVERY", "100")),
+        )
+    return _generation_cache
+
+
+async def lookup_generation(
+    kind: str,
+    fields: Dict[str, Any],
+    prompt_version: str,
+    policy: CachePolicy = CachePolicy(),
+) -> Tuple[str, Optional[Any]]:
+    """Devolve `(chave, resultado_em_cache)`; o resultado é None se não houver ou se a política não permitir ler."""
+    cache = get_generation_cache()
+    key = GenerationCache.make_key(kind, fields, prompt_version)
+    if cache is None or not policy.read:
+        return key, None
+    return key, await cache.aget(key)
+
+
+async def store_generation(key: str, result: Any, policy: CachePolicy = CachePolicy()):
+    cache = get_generation_cache()
+    if cache is None or not policy.write:
+        return
+    try:
+        await cache.aset(key, result)
+    except Exception as e:
+        logger.warning(f"Falha ao gravar no cache de geração: {e}")
+
+
+async def cached_generation(
+    kind: str,
+    fields: Dict[str, Any],
+    prompt_version: str,
+    generate: Callable[[], Awaitable[Any]],
+    policy: CachePolicy = CachePolicy(),
+) -> Tuple[Any, bool]:
+    """
+    Devolve `(resultado, veio_do_cache)`. Só resultados gerados com sucesso são gravados.
+    Requisições idênticas simultâneas compartilham a mesma geração em andamento.
+    """
+    key, cached = await lookup_generation(kind, fields, prompt_version, policy)
+    if cached is not None:
+        return cached, True
+
+    async def generate_and_store():
+        result = await generate()
+        await store_generation(key, result, policy)
+        return result
+
+    flight_key = f"{key}:{'store' if policy.write else 'no-store'}"
+    return await generation_flights.run(flight_key, generate_and_store), False
@@ -0,0 +1,94 @@
+import json
+from typing import Any, List, NamedTuple, Optional
+
+
+class ListItem(NamedTuple):
+    field: str
+    index: int
+    value: Any
+
+
+class IncrementalJSONParser:
+    """
+    Lê um objeto JSON em pedaços (ex: tokens do LLM) e devolve cada item das
+    listas de primeiro nível (`questions[i]`, `objetivos[i]`...) assim que ele
+    termina, sem esperar o documento inteiro. Texto antes do `{` inicial
+    (ex: ```json) é ignorado.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.stack: List[str] = []
+        self.in_string = False
+        self.escape = False
+        self.string_start = 0
+        self.expect_key = False
+        self.field: Optional[str] = None
+        self.item_start: Optional[int] = None
+        self.index = 0
+
+    def _in_list(self) -> bool:
+        return self.stack == ["{", "["]
+
+    def _emit(self, end: int, items: List[ListItem]):
+        text = self.buffer[self.item_start:end].strip()
+        self.item_start = None
+        items.append(ListItem(self.field, self.index, json.loads(text)))
+        self.index += 1
+
+    def feed(self, chunk: str) -> List[ListItem]:
+        self.buffer += chunk
+        items: List[ListItem] = []
+        while self.pos < len(self.buffer):
+            i = self.pos
+            c = self.buffer[i]
+            self.pos += 1
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif c == "\\":
+                    self.escape = True
+                elif c == '"':
+                    self.in_string = False
+                    if len(self.stack) == 1 and self.expect_key:
+                        self.field = json.loads(self.buffer[self.string_start:i + 1])
+                    elif self._in_list() and self.item_start == self.string_start:
+                        self._emit(i + 1, items)
+                continue
+
+            if not self.stack and c != "{":
+                continue
+            if c == '"':
+                self.in_string = True
+                self.string_start = i
+                if self._in_list() and self.item_start is None:
+                    self.item_start = i
+            elif c in "{[":
+                if self._in_list() and self.item_start is None:
+                    self.item_start = i
+                self.stack.append(c)
+                if len(self.stack) == 1:
+                    self.expect_key = True
+                elif self._in_list():
+                    self.index = 0
+                    self.item_start = None
+            elif c in "}]":
+                self.stack.pop()
+                if self._in_list() and self.item_start is not None:
+                    # Fim de um item objeto/lista
+                    self._emit(i + 1, items)
+                elif self.stack == ["{"] and c == "]" and self.item_start is not None:
+                    # Fim da lista com um item número/true/false/null pendente
+                    self._emit(i, items)
+            elif c == ",":
+                if self._in_list() and self.item_start is not None:
+                    self._emit(i, items)
+                elif len(self.stack) == 1:
+                    self.expect_key = True
+            elif c == ":" and len(self.stack) == 1:
+                self.expect_key = False
+            elif self._in_list() and self.item_start is None and not c.isspace():
+                self.item_start = i
+        return items
@@ -0,0 +1,230 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.engine.executor import run_blocking
+
+logger = logging.getLogger("uvicorn")
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED = (SUCCEEDED, FAILED)
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class JobStore:
+    """Estado dos jobs em SQLite, para que sobrevivam a reinícios do servidor."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.row_factory = sqlite3.Row
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL, "
+                "status TEXT NOT NULL, result TEXT, error TEXT, "
+                "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._connection.commit()
+        return self._connection
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "id": row["id"],
+            "kind": row["kind"],
+            "payload": json.loads(row["payload"]),
+            "status": row["status"],
+            "result": json.loads(row["result"]) if row["result"] is not None else None,
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+
+    def create(self, kind: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self.lock:
+            db = self._db()
+            db.execute(
+                "INSERT INTO jobs (id, kind, payload, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload, ensure_ascii=False), QUEUED, now, now),
+            )
+            db.commit()
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            row = self._db().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def update(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None):
+        raw_result = json.dumps(result, ensure_ascii=False) if result is not None else None
+        with self.lock:
+            db = self._db()
+            db.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, raw_result, error, time.time(), job_id),
+            )
+            db.commit()
+
+    def unfinished(self) -> List[Dict[str, Any]]:
+        """Jobs na fila ou interrompidos no meio da execução, do mais antigo ao mais novo."""
+        with self.lock:
+            rows = self._db().execute(
+                "SELECT * FROM jobs WHERE status IN (?, ?) ORDER BY created_at", (QUEUED, RUNNING)
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def prune(self, max_age: float) -> int:
+        """Apaga os jobs terminados há mais de `max_age` segundos. Devolve quantos saíram."""
+        with self.lock:
+            db = self._db()
+            cursor = db.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (*FINISHED, time.time() - max_age),
+            )
+            db.commit()
+        return cursor.rowcount
+
+
+class JobQueue:
+    """
+    Fila de jobs com um número fixo de workers async: no máximo `workers` gerações
+    rodam ao mesmo tempo, não importa quantas requisições cheguem.
+    """
+
+    def __init__(self, store: JobStore, workers: int = 4, retention: float = 7 * 24 * 3600, prune_every: int = 100):
+        self.store = store
+        self.workers = workers
+        # Jobs terminados (com o resultado completo) ficam `retention` segundos no
+        # SQLite; a limpeza roda no start e a cada `prune_every` jobs. 0 desliga.
+        self.retention = retention
+        self.prune_every = prune_every
+        self._finished = 0
+        self.handlers: Dict[str, JobHandler] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._done: Dict[str, asyncio.Event] = {}
+
+    def register(self, kind: str, handler: JobHandler):
+        self.handlers[kind] = handler
+
+    @property
+    def started(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self):
+        """Inicia os workers e recoloca na fila os jobs que não terminaram antes do reinício."""
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue()
+        await self._prune()
+        for job in await run_blocking(self.store.unfinished):
+            self._queue.put_nowait(job["id"])
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"job-worker-{i}") for i in range(self.workers)
+        ]
+        logger.info(f"Started {self.workers} job workers ({self._queue.qsize()} jobs pending)")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    async def submit(self, kind: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        if kind not in self.handlers:
+            raise ValueError(f"Invalid job kind: {kind}")
+        await self.start()
+        job = await run_blocking(self.store.create, kind, payload)
+        self._queue.put_nowait(job["id"])
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await run_blocking(self.store.get, job_id)
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """Long-polling: espera o job terminar por até `timeout` segundos e devolve o estado atual."""
+        job = await self.get(job_id)
+        if job is None or job["status"] in FINISHED or timeout <= 0:
+            return job
+        event = self._done.setdefault(job_id, asyncio.Event())
+        # O job pode ter terminado entre a leitura acima e a criação do evento
+        job = await self.get(job_id)
+        if job["status"] in FINISHED:
+            return job
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return await self.get(job_id)
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        job = await self.get(job_id)
+        if job is None or job["status"] in FINISHED:
+            return
+        await run_blocking(self.store.update, job_id, RUNNING)
+        try:
+            result = await self.handlers[job["kind"]](job["payload"])
+            await run_blocking(self.store.update, job_id, SUCCEEDED, result)
+        except Exception as e:
+            logger.exception(f"Job {job_id} ({job['kind']}) failed")
+            # HTTPException (ex: generate_slides) guarda a mensagem em `detail`
+            error = str(getattr(e, "detail", None) or e)
+            await run_blocking(self.store.update, job_id, FAILED, None, error)
+        finally:
+            event = self._done.pop(job_id, None)
+            if event is not None:
+                event.set()
+        self._finished += 1
+        if self.prune_every > 0 and self._finished % self.prune_every == 0:
+            await self._prune()
+
+    async def _prune(self):
+        if self.retention <= 0:
+            return
+        removed = await run_blocking(self.store.prune, self.retention)
+        if removed:
+            logger.info(f"Removed {removed} finished jobs older than {self.retention:.0f}s")
+
+
+_job_queue: Optional[JobQueue] = None
+
+
+def get_job_queue() -> JobQueue:
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue(
+            JobStore(os.getenv("JOB_STORE_PATH", "cache/jobs.sqlite3")),
+            workers=int(os.getenv("JOB_WORKERS", "4")),
+            retention=float(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 3600))),
+        )
+    return _job_queue
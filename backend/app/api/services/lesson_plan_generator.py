@@ -9,6 +9,14 @@ os.makedirs(OUTPUT_DIR, exist_ok=True)
 class LessonPlanGenerator:
     @staticmethod
     def generate_pdf(data: dict) -> str:
+        filename = f"plano_{uuid.uuid4()}.pdf"
+        with open(os.path.join(OUTPUT_DIR, filename), "wb") as f:
+            f.write(LessonPlanGenerator.render_pdf(data))
+        return filename
+
+    @staticmethod
+    def render_pdf(data: dict) -> bytes:
+        """Gera o PDF em memória, sem gravar em disco."""
         pdf = FPDF()
         pdf.add_page()
         pdf.set_font("Helvetica", size=12)
@@ -127,9 +135,5 @@ class LessonPlanGenerator:
                 except FPDFException:
                     pdf.multi_cell(width, 8, "-")
             pdf.ln(5)
- 
-        filename = f"plano_{uuid.uuid4()}.pdf"
-        filepath = os.path.join(OUTPUT_DIR, filename)
-        pdf.output(filepath)
- 
-        return filename
+
+        return bytes(pdf.output())
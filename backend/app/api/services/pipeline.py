@@ -0,0 +1,177 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.engine.executor import run_blocking
+
+logger = logging.getLogger("uvicorn")
+
+PENDING = "pending"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+@dataclass
+class PipelineNode:
+    """Uma etapa do DAG. `run` recebe os resultados das dependências, por id."""
+
+    id: str
+    stage: str
+    run: Callable[[Dict[str, Any]], Awaitable[Any]]
+    deps: List[str] = field(default_factory=list)
+
+
+class PipelineStore:
+    """Resultado de cada etapa dos pipelines em SQLite, para retomar sem refazer o que já terminou."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS pipeline_nodes ("
+                "pipeline_id TEXT NOT NULL, node_id TEXT NOT NULL, stage TEXT NOT NULL, "
+                "status TEXT NOT NULL, result TEXT, error TEXT, updated_at REAL NOT NULL, "
+                "PRIMARY KEY (pipeline_id, node_id))"
+            )
+            self._connection.commit()
+        return self._connection
+
+    def set(
+        self,
+        pipeline_id: str,
+        node: PipelineNode,
+        status: str,
+        result: Any = None,
+        error: Optional[str] = None,
+    ):
+        raw_result = json.dumps(result, ensure_ascii=False) if result is not None else None
+        with self.lock:
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO pipeline_nodes "
+                "(pipeline_id, node_id, stage, status, result, error, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (pipeline_id, node.id, node.stage, status, raw_result, error, time.time()),
+            )
+            db.commit()
+
+    def nodes(self, pipeline_id: str) -> Dict[str, Dict[str, Any]]:
+        with self.lock:
+            rows = self._db().execute(
+                "SELECT node_id, stage, status, result, error FROM pipeline_nodes "
+                "WHERE pipeline_id = ? ORDER BY rowid",
+                (pipeline_id,),
+            ).fetchall()
+        return {
+            node_id: {
+                "stage": stage,
+                "status": status,
+                "result": json.loads(result) if result is not None else None,
+                "error": error,
+            }
+            for node_id, stage, status, result, error in rows
+        }
+
+    def clear(self, pipeline_id: str):
+        with self.lock:
+            db = self._db()
+            db.execute("DELETE FROM pipeline_nodes WHERE pipeline_id = ?", (pipeline_id,))
+            db.commit()
+
+
+def stage_progress(nodes: Dict[str, Dict[str, Any]], stages: List[str]) -> Dict[str, Dict[str, int]]:
+    """Quantas etapas de cada estágio estão em cada status."""
+    progress = {stage: {PENDING: 0, RUNNING: 0, SUCCEEDED: 0, FAILED: 0} for stage in stages}
+    for node in nodes.values():
+        progress.setdefault(node["stage"], {PENDING: 0, RUNNING: 0, SUCCEEDED: 0, FAILED: 0})
+        progress[node["stage"]][node["status"]] += 1
+    return progress
+
+
+async def run_dag(
+    pipeline_id: str,
+    nodes: List[PipelineNode],
+    store: PipelineStore,
+    limit: asyncio.Semaphore,
+) -> Dict[str, Any]:
+    """
+    Executa as etapas respeitando as dependências: etapas independentes rodam em
+    paralelo, limitadas por `limit`. Etapas que já terminaram com sucesso (numa
+    execução anterior) não são refeitas; as que dependem de uma etapa que falhou
+    ficam com status failed. Devolve os resultados por id.
+    """
+    done = {
+        node_id: node["result"]
+        for node_id, node in (await run_blocking(store.nodes, pipeline_id)).items()
+        if node["status"] == SUCCEEDED
+    }
+    for node in nodes:
+        if node.id not in done:
+            await run_blocking(store.set, pipeline_id, node, PENDING)
+    tasks: Dict[str, asyncio.Task] = {}
+
+    async def run_node(node: PipelineNode):
+        if node.id in done:
+            return done[node.id]
+        dep_results = {}
+        for dep in node.deps:
+            try:
+                dep_results[dep] = await tasks[dep]
+            except Exception:
+                await run_blocking(store.set, pipeline_id, node, FAILED, None, f"Dependency {dep} failed")
+                raise
+        async with limit:
+            await run_blocking(store.set, pipeline_id, node, RUNNING)
+            try:
+                result = await node.run(dep_results)
+            except Exception as e:
+                logger.error(f"Pipeline {pipeline_id}: {node.id} failed: {str(e)}")
+                error = str(getattr(e, "detail", None) or e)
+                await run_blocking(store.set, pipeline_id, node, FAILED, None, error)
+                raise
+        await run_blocking(store.set, pipeline_id, node, SUCCEEDED, result)
+        return result
+
+    for node in nodes:
+        tasks[node.id] = asyncio.ensure_future(run_node(node))
+    await asyncio.gather(*tasks.values(), return_exceptions=True)
+    return {
+        node_id: task.result()
+        for node_id, task in tasks.items()
+        if not task.exception()
+    }
+
+
+_pipeline_store: Optional[PipelineStore] = None
+_pipeline_limit: Optional[asyncio.Semaphore] = None
+
+
+def get_pipeline_store() -> PipelineStore:
+    global _pipeline_store
+    if _pipeline_store is None:
+        # Mesmo banco da fila de jobs, em outra tabela
+        _pipeline_store = PipelineStore(os.getenv("JOB_STORE_PATH", "cache/jobs.sqlite3"))
+    return _pipeline_store
+
+
+def get_pipeline_limit() -> asyncio.Semaphore:
+    """Limite global de etapas rodando ao mesmo tempo, somando todos os pipelines."""
+    global _pipeline_limit
+    if _pipeline_limit is None:
+        _pipeline_limit = asyncio.Semaphore(int(os.getenv("PIPELINE_CONCURRENCY", "4")))
+    return _pipeline_limit
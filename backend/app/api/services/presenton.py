@@ -0,0 +1,251 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger("uvicorn")
+
+GENERATE_PATH = "/api/v1/ppt/presentation/generate"
+
+
+class PresentonError(Exception):
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class CircuitOpenError(PresentonError):
+    """O Presenton falhou seguidamente: as chamadas falham na hora até o próximo teste."""
+
+
+class CircuitBreaker:
+    """
+    Abre após `failure_threshold` falhas seguidas; depois de `reset_timeout` segundos
+    deixa passar uma chamada de teste (half-open) e fecha de novo se ela der certo.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def before_call(self):
+        state = self.state
+        if state == "open" or (state == "half-open" and self._trial_running):
+            raise CircuitOpenError("Presenton unavailable (circuit open)")
+        if state == "half-open":
+            self._trial_running = True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+
+    def record_cancel(self):
+        self._trial_running = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_running = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            # Falha no teste half-open reabre o circuito por mais `reset_timeout`
+            self.opened_at = time.monotonic()
+            logger.warning(f"Presenton circuit opened after {self.failures} failures")
+
+
+class PresentonClient:
+    """
+    Cliente HTTP do Presenton compartilhado pela aplicação: conexões keep-alive
+    reaproveitadas entre requisições, retries com backoff e circuit breaker.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: Optional[str],
+        timeout: float = 120.0,
+        connect_timeout: float = 10.0,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        http2: bool = False,
+        retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        breaker: Optional[CircuitBreaker] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.base_url = base_url.strip().rstrip("/")
+        self.api_key = api_key
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+        self.http2 = http2
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._closing: set = set()
+
+    def _http2_available(self) -> bool:
+        if not self.http2:
+            return False
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("PRESENTON_HTTP2 enabled but the 'h2' package is not installed, using HTTP/1.1")
+            return False
+        return True
+
+    def client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        # O pool de conexões pertence ao event loop em que foi criado
+        if self._client is None or self._loop is not loop:
+            if self._client is not None:
+                self._discard(self._client, self._loop, loop)
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={
+                    "Content-Type": "application/json",
+                    "Authorization": f"Bearer {self.api_key}",
+                },
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=self._http2_available(),
+                transport=self.transport,
+            )
+            self._loop = loop
+        return self._client
+
+    def _discard(self, client: httpx.AsyncClient, old_loop, loop: asyncio.AbstractEventLoop):
+        """Fecha o cliente de um event loop anterior sem bloquear o atual."""
+        if old_loop is not None and not old_loop.is_closed() and old_loop.is_running():
+            # As conexões pertencem ao loop antigo: fecha por lá
+            asyncio.run_coroutine_threadsafe(self._aclose(client), old_loop)
+            return
+        task = loop.create_task(self._aclose(client))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    @staticmethod
+    async def _aclose(client: httpx.AsyncClient):
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.warning(f"Failed to close stale Presenton client: {e}")
+
+    async def close(self):
+        # Clientes antigos ainda sendo fechados neste loop
+        loop = asyncio.get_running_loop()
+        pending = [task for task in self._closing if task.get_loop() is loop]
+        if pending:
+            await asyncio.gather(*pending)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._loop = None
+
+    def make_url(self, path: Optional[str]) -> Optional[str]:
+        """URL completa para os caminhos relativos devolvidos pela API."""
+        if not path:
+            return None
+        if path.startswith("http"):
+            return path
+        if path.startswith("/"):
+            return f"{self.base_url}{path}"
+        return f"{self.base_url}/{path}"
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: espalha os retries de requisições que falharam juntas
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def _post(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """POST com retry em timeouts, erros de conexão, 429 e 5xx. Erros 4xx falham na hora."""
+        last_error: Optional[PresentonError] = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(self._backoff(attempt - 1))
+            try:
+                response = await self.client().post(path, json=payload)
+            except httpx.TransportError as e:
+                # Inclui timeouts (httpx.TimeoutException)
+                last_error = PresentonError(f"{type(e).__name__}: {e}")
+                logger.warning(f"Presenton request failed (attempt {attempt + 1}): {last_error}")
+                continue
+            if response.status_code == 429 or response.status_code >= 500:
+                last_error = PresentonError(response.text, response.status_code)
+                logger.warning(
+                    f"Presenton returned {response.status_code} (attempt {attempt + 1})"
+                )
+                continue
+            if response.status_code != 200:
+                raise PresentonError(response.text, response.status_code)
+            return response.json()
+        raise last_error
+
+    async def generate(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Gera a apresentação; falha na hora se o circuito estiver aberto."""
+        self.breaker.before_call()
+        try:
+            result = await self._post(GENERATE_PATH, payload)
+        except PresentonError as e:
+            # Erros do cliente (4xx) não indicam que o Presenton está fora do ar
+            if e.status_code is not None and 400 <= e.status_code < 500 and e.status_code != 429:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+            raise
+        except asyncio.CancelledError:
+            # Cliente desconectou: libera a chamada de teste do half-open sem contar falha
+            self.breaker.record_cancel()
+            raise
+        except Exception:
+            # Ex: resposta 200 com JSON inválido
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return result
+
+
+_presenton_client: Optional[PresentonClient] = None
+
+
+def get_presenton_client() -> PresentonClient:
+    global _presenton_client
+    if _presenton_client is None:
+        _presenton_client = PresentonClient(
+            base_url=os.getenv("PRESENTON_BASE_URL", "https://api.presenton.ai"),
+            api_key=os.getenv("PRESENTON_API_KEY"),
+            timeout=float(os.getenv("PRESENTON_TIMEOUT", "120")),
+            max_connections=int(os.getenv("PRESENTON_MAX_CONNECTIONS", "20")),
+            http2=os.getenv("PRESENTON_HTTP2", "false").lower() == "true",
+            retries=int(os.getenv("PRESENTON_RETRIES", "2")),
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.getenv("PRESENTON_BREAKER_THRESHOLD", "5")),
+                reset_timeout=float(os.getenv("PRESENTON_BREAKER_RESET", "30")),
+            ),
+        )
+    return _presenton_client
+
+
+async def close_presenton_client():
+    if _presenton_client is not None:
+        await _presenton_client.close()
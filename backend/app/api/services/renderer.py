@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import re
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+from urllib.parse import quote
+
+from fastapi.responses import StreamingResponse
+
+from app.api.services.activity_generator import ActivityGenerator
+from app.api.services.class_set import build_class_set
+from app.api.services.lesson_plan_generator import LessonPlanGenerator
+from app.engine.executor import run_blocking
+
+logger = logging.getLogger("uvicorn")
+
+MEDIA_TYPES = {
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+}
+# Tamanho de cada pedaço enviado na resposta em streaming
+CHUNK_SIZE = 64 * 1024
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_render_pool_size() -> int:
+    """RENDER_POOL_SIZE=0 desliga o pool de processos (renderiza no pool de threads)."""
+    return int(os.getenv("RENDER_POOL_SIZE") or os.cpu_count() or 1)
+
+
+def _warm_worker():
+    # Roda ao subir cada processo: fpdf/python-docx (e as fontes padrão) já ficam
+    # carregados antes do primeiro documento
+    from docx import Document
+    from fpdf import FPDF
+
+    FPDF().set_font("Helvetica")
+    Document()
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def render_document(kind: str, fmt: str, data: dict) -> bytes:
+    """Renderiza o documento em memória e devolve o conteúdo (roda dentro do worker)."""
+    if kind == "activity":
+        if fmt == "docx":
+            return ActivityGenerator.render_docx(data)
+        return ActivityGenerator.render_pdf(data)
+    if kind == "lesson-plan":
+        return LessonPlanGenerator.render_pdf(data)
+    if kind == "class-set":
+        variants, answer_key = build_class_set(data["activity"], data["variants"], data.get("seed", 0))
+        if fmt == "docx":
+            return ActivityGenerator.render_class_set_docx(variants, answer_key)
+        return ActivityGenerator.render_class_set_pdf(variants, answer_key)
+    raise ValueError(f"Invalid document kind: {kind}")
+
+
+def get_render_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    size = get_render_pool_size()
+    if size <= 0:
+        return None
+    if _pool is None:
+        # spawn: o servidor já tem threads (uvicorn, pool de bloqueantes), e fork com threads é inseguro
+        _pool = ProcessPoolExecutor(
+            max_workers=size,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_worker,
+        )
+    return _pool
+
+
+async def warm_render_pool():
+    """Chamado no startup: sobe todos os workers para o primeiro documento não pagar o import."""
+    pool = get_render_pool()
+    if pool is None:
+        return
+    size = get_render_pool_size()
+    loop = asyncio.get_running_loop()
+    # Um ping por worker: com todos ocupados ao mesmo tempo, o pool sobe os `size` processos
+    await asyncio.gather(*[loop.run_in_executor(pool, _ping) for _ in range(size)])
+    logger.info(f"Render pool ready ({size} workers)")
+
+
+def shutdown_render_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def _run_in_pool(func: Callable[..., Any], *args) -> Any:
+    pool = get_render_pool()
+    if pool is None:
+        return await run_blocking(func, *args)
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(pool, func, *args)
+    except BrokenProcessPool:
+        # Um worker morreu (ex: falta de memória): recria o pool na próxima chamada
+        logger.error("Render pool broken, restarting")
+        shutdown_render_pool()
+        raise
+
+
+async def render_bytes(kind: str, fmt: str, data: dict) -> bytes:
+    """
+    Renderiza um PDF/DOCX em memória sem bloquear o event loop: no pool de processos
+    (vários documentos ao mesmo tempo usam vários núcleos) ou, com
+    RENDER_POOL_SIZE=0, no pool de threads.
+    """
+    return await _run_in_pool(render_document, kind, fmt.lower(), data)
+
+
+def document_filename(prefix: str, title: Optional[str], fmt: str) -> str:
+    """Nome para download a partir do título: "atividade_fracoes_no_dia_a_dia.pdf"."""
+    folded = unicodedata.normalize("NFKD", str(title or "")).encode("ascii", "ignore").decode("ascii")
+    slug = re.sub(r"[^a-z0-9]+", "_", folded.lower()).strip("_")[:60].rstrip("_")
+    return f"{prefix}_{slug}.{fmt}" if slug else f"{prefix}.{fmt}"
+
+
+def document_response(content: bytes, filename: str, headers: Optional[dict] = None) -> StreamingResponse:
+    """Envia o documento direto da memória, em pedaços, como anexo para download."""
+    fmt = filename.rsplit(".", 1)[-1].lower()
+
+    def chunks():
+        view = memoryview(content)
+        for start in range(0, len(view), CHUNK_SIZE):
+            yield bytes(view[start:start + CHUNK_SIZE])
+
+    return StreamingResponse(
+        chunks(),
+        media_type=MEDIA_TYPES.get(fmt, "application/octet-stream"),
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="{filename}"; filename*=UTF-8\'\'{quote(filename)}'
+            ),
+            "Content-Length": str(len(content)),
+            **(headers or {}),
+        },
+    )
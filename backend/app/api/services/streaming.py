@@ -0,0 +1,74 @@
+import json
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+from fastapi.responses import StreamingResponse
+
+from app.api.services.generation_cache import CachePolicy, store_generation
+from app.api.services.incremental_json import IncrementalJSONParser
+from app.engine.llm import astream_complete, parse_json_response
+
+logger = logging.getLogger("uvicorn")
+
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def sse_response(events: AsyncIterator[str], headers: Optional[dict] = None) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Impede que proxies (ex: nginx) acumulem o stream antes de repassar
+            "X-Accel-Buffering": "no",
+            **(headers or {}),
+        },
+    )
+
+
+async def stream_json_generation(
+    cache_key: str,
+    cached: Optional[Any],
+    build_prompt: Callable[[], Awaitable[str]],
+    to_result: Callable[[Any], Awaitable[Any]],
+    policy: CachePolicy = CachePolicy(),
+) -> AsyncIterator[str]:
+    """
+    Gera os eventos SSE de uma geração em JSON:
+    - `token`: cada trecho de texto do LLM (`{"text": ...}`);
+    - `item`: cada item de lista de primeiro nível já completo
+      (`{"field": "questions", "index": 0, "value": {...}}`);
+    - `result`: o objeto final, convertido e validado por `to_result`;
+    - `error`: falha na geração (`{"detail": ...}`).
+    Com resultado em cache, emite apenas o `result`.
+    """
+    try:
+        if cached is not None:
+            yield sse_event("result", await to_result(cached))
+            return
+
+        prompt = await build_prompt()
+        chunks = []
+        parser = IncrementalJSONParser()
+        async for delta in astream_complete(prompt):
+            if not delta:
+                continue
+            chunks.append(delta)
+            yield sse_event("token", {"text": delta})
+            try:
+                items = parser.feed(delta) if parser else []
+            except ValueError:
+                # JSON malformado: para de emitir itens; o erro aparece no parse do documento completo
+                parser, items = None, []
+            for item in items:
+                yield sse_event("item", item._asdict())
+
+        data = parse_json_response("".join(chunks))
+        result = await to_result(data)
+        await store_generation(cache_key, data, policy)
+        yield sse_event("result", result)
+    except Exception as e:
+        logger.exception("Error streaming generation")
+        yield sse_event("error", {"detail": str(e)})
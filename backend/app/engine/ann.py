@@ -0,0 +1,88 @@
+import os
+from typing import Optional
+
+import numpy as np
+
+# Linhas por bloco ao atribuir vetores aos centróides (limita a memória da matriz de distâncias)
+ASSIGN_BLOCK_ROWS = 16384
+# Vetores usados para treinar o k-means, por lista
+TRAINING_ROWS_PER_LIST = 256
+
+
+class IVFIndex:
+    """
+    Índice aproximado estilo IVF: um k-means esférico divide os vetores
+    (normalizados) em `nlist` listas; a busca só pontua as linhas das `nprobe`
+    listas cujos centróides estão mais próximos da consulta.
+    As linhas de cada lista ficam ordenadas num único array (formato CSR).
+    """
+
+    def __init__(self, centroids: np.ndarray, offsets: np.ndarray, rows: np.ndarray):
+        self.centroids = centroids
+        self.offsets = offsets
+        self.rows = rows
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def build(
+        cls,
+        matrix: np.ndarray,
+        nlist: Optional[int] = None,
+        iterations: int = 10,
+        seed: int = 0,
+    ) -> "IVFIndex":
+        num_rows = len(matrix)
+        if not nlist:
+            nlist = max(1, int(4 * np.sqrt(num_rows)))
+        nlist = min(nlist, num_rows)
+        rng = np.random.default_rng(seed)
+
+        sample_size = min(num_rows, nlist * TRAINING_ROWS_PER_LIST)
+        sample = np.asarray(
+            matrix[np.sort(rng.choice(num_rows, sample_size, replace=False))],
+            dtype=np.float32,
+        )
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+        for _ in range(iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # Lista vazia mantém o centróide anterior
+            empty = norms[:, 0] == 0
+            sums[empty] = centroids[empty]
+            norms[empty] = 1.0
+            centroids = (sums / norms).astype(np.float32)
+
+        labels = np.empty(num_rows, dtype=np.int64)
+        for start in range(0, num_rows, ASSIGN_BLOCK_ROWS):
+            block = np.asarray(matrix[start:start + ASSIGN_BLOCK_ROWS], dtype=np.float32)
+            labels[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+
+        rows = np.argsort(labels, kind="stable")
+        counts = np.bincount(labels, minlength=nlist)
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        return cls(centroids, offsets, rows)
+
+    def search(self, query_vector: np.ndarray, nprobe: int) -> np.ndarray:
+        """Linhas (ordenadas) das `nprobe` listas mais próximas da consulta normalizada."""
+        nprobe = min(max(nprobe, 1), self.nlist)
+        similarities = self.centroids @ query_vector
+        probes = np.argpartition(-similarities, nprobe - 1)[:nprobe]
+        rows = np.concatenate(
+            [self.rows[self.offsets[i]:self.offsets[i + 1]] for i in probes]
+        )
+        return np.sort(rows)
+
+    def save(self, path: str):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, centroids=self.centroids, offsets=self.offsets, rows=self.rows)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        with np.load(path) as data:
+            return cls(data["centroids"], data["offsets"], data["rows"])
@@ -0,0 +1,252 @@
+import json
+import logging
+import os
+import re
+import threading
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.engine.executor import run_blocking
+
+logger = logging.getLogger("uvicorn")
+
+SKILLS_FILENAME = "bncc_skills.json"
+SKILLS_VERSION = 2
+
+# Ex: (EF05MA01) Ler, escrever e ordenar números naturais ... decimal.
+# O "(" é opcional: em algumas páginas do PDF ele se perde na extração ("EF09GE01) Analisar...")
+SKILL_PATTERN = re.compile(r"\(?(E[FI]\d{2}[A-Z]{2}\d{2})\)")
+# A descrição termina no primeiro ponto final seguido de quebra de linha
+DESCRIPTION_END = re.compile(r"\.\s*(?:\n|$)")
+
+STAGES = {"EF": "Ensino Fundamental", "EI": "Educação Infantil"}
+
+COMPONENTS = {
+    "LP": "Língua Portuguesa",
+    "MA": "Matemática",
+    "CI": "Ciências",
+    "GE": "Geografia",
+    "HI": "História",
+    "AR": "Arte",
+    "EF": "Educação Física",
+    "LI": "Língua Inglesa",
+    "ER": "Ensino Religioso",
+}
+
+# Campos de experiência da Educação Infantil
+FIELDS_OF_EXPERIENCE = {
+    "EO": "O eu, o outro e o nós",
+    "CG": "Corpo, gestos e movimentos",
+    "TS": "Traços, sons, cores e formas",
+    "EF": "Escuta, fala, pensamento e imaginação",
+    "ET": "Espaços, tempos, quantidades, relações e transformações",
+}
+
+# Nomes de disciplina aceitos (sem acento, minúsculos) para cada componente
+COMPONENT_ALIASES = {
+    "LP": ["lingua portuguesa", "portugues"],
+    "MA": ["matematica"],
+    "CI": ["ciencias", "ciencia", "ciencias da natureza"],
+    "GE": ["geografia"],
+    "HI": ["historia"],
+    "AR": ["arte", "artes"],
+    "EF": ["educacao fisica"],
+    "LI": ["lingua inglesa", "ingles"],
+    "ER": ["ensino religioso"],
+}
+
+
+def fold(text: str) -> str:
+    """Remove acentos e normaliza espaços/maiúsculas."""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", text).strip().casefold()
+
+
+def skill_years(code: str) -> List[int]:
+    """
+    Anos a que a habilidade se refere. No Ensino Fundamental o par de dígitos é
+    um ano ("05") ou um bloco de anos ("15" = 1º ao 5º, "69" = 6º ao 9º).
+    Na Educação Infantil é o grupo etário (01, 02 ou 03).
+    """
+    digits = code[2:4]
+    if code.startswith("EI") or digits[0] == "0":
+        return [int(digits)]
+    return list(range(int(digits[0]), int(digits[1]) + 1))
+
+
+def parse_skill(code: str, description: str) -> dict:
+    stage, area = code[:2], code[4:6]
+    names = FIELDS_OF_EXPERIENCE if stage == "EI" else COMPONENTS
+    return {
+        "code": code,
+        "description": description,
+        "stage": STAGES[stage],
+        "years": skill_years(code),
+        "component": names.get(area, area),
+    }
+
+
+def extract_skills(text: str) -> List[dict]:
+    """Extrai as habilidades (código e descrição) de um texto da BNCC."""
+    skills: Dict[str, dict] = {}
+    matches = list(SKILL_PATTERN.finditer(text))
+    for i, match in enumerate(matches):
+        code = match.group(1)
+        if code in skills or code[:2] not in STAGES:
+            continue
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        body = text[match.end():end]
+        description_end = DESCRIPTION_END.search(body)
+        if description_end:
+            body = body[:description_end.start() + 1]
+        description = re.sub(r"\s+", " ", body).strip()
+        if description:
+            skills[code] = parse_skill(code, description)
+    return list(skills.values())
+
+
+def extract_skills_by_file(documents: Iterable, source_file_of) -> Dict[str, List[dict]]:
+    """Junta as páginas de cada arquivo da BNCC (categoria normativa) e extrai as habilidades."""
+    pages: Dict[str, List[str]] = {}
+    for doc in documents:
+        if doc.metadata.get("category") == "normativa":
+            pages.setdefault(source_file_of(doc.id_), []).append(doc.text)
+    return {path: extract_skills("\n".join(texts)) for path, texts in pages.items()}
+
+
+def grade_year(serie_ano: str) -> Optional[Tuple[str, int]]:
+    """Converte "5º ano", "5° Ano" ou "Quinto ano" em (etapa, ano) do Ensino Fundamental."""
+    folded = fold(serie_ano)
+    if "medio" in folded or "infantil" in folded:
+        return None
+    match = re.search(r"(\d+)", folded)
+    if match:
+        year = int(match.group(1))
+    else:
+        ordinals = ["primeiro", "segundo", "terceiro", "quarto", "quinto",
+                    "sexto", "setimo", "oitavo", "nono"]
+        year = next((i + 1 for i, word in enumerate(ordinals) if word in folded), None)
+    if year is None or not 1 <= year <= 9:
+        return None
+    return "EF", year
+
+
+def component_code(disciplina: str) -> Optional[str]:
+    folded = fold(disciplina)
+    for code, aliases in COMPONENT_ALIASES.items():
+        if folded in aliases:
+            return code
+    return None
+
+
+class SkillIndex:
+    """
+    Tabela de habilidades da BNCC indexada por (etapa, ano, componente),
+    consultada diretamente pelos routers em vez da busca vetorial.
+    """
+
+    def __init__(self, files: Dict[str, List[dict]]):
+        self.files = files
+        self.by_code: Dict[str, dict] = {}
+        self.by_grade: Dict[Tuple[str, int, str], List[dict]] = {}
+        for skills in files.values():
+            for skill in skills:
+                self.by_code.setdefault(skill["code"], skill)
+        for code in sorted(self.by_code):
+            skill = self.by_code[code]
+            for year in skill["years"]:
+                key = (code[:2], year, code[4:6])
+                self.by_grade.setdefault(key, []).append(skill)
+
+    def __len__(self) -> int:
+        return len(self.by_code)
+
+    def get(self, code: str) -> Optional[dict]:
+        return self.by_code.get(code.upper())
+
+    def lookup(self, serie_ano: str, disciplina: str) -> List[dict]:
+        """Habilidades da série e disciplina pedidas; lista vazia se não forem reconhecidas."""
+        grade = grade_year(serie_ano)
+        component = component_code(disciplina)
+        if grade is None or component is None:
+            return []
+        stage, year = grade
+        return self.by_grade.get((stage, year, component), [])
+
+
+def missing_skills(skills: List[dict]) -> List[str]:
+    """
+    Códigos que faltam na numeração das habilidades (ex: EF09GE02 sem o EF09GE01):
+    sinal de que a extração perdeu alguma e a tabela não cobre a série/disciplina inteira.
+    """
+    numbers: Dict[str, set] = {}
+    for skill in skills:
+        numbers.setdefault(skill["code"][:6], set()).add(int(skill["code"][6:]))
+    return [
+        f"{prefix}{n:02d}"
+        for prefix, found in sorted(numbers.items())
+        for n in range(1, max(found) + 1)
+        if n not in found
+    ]
+
+
+def format_skills(skills: List[dict]) -> str:
+    return "\n".join(f"{skill['code']} - {skill['description']}" for skill in skills)
+
+
+def rank_skills(skills: List[dict], text: str, limit: int) -> List[dict]:
+    """Ordena por palavras em comum com `text` (ex: a unidade), mantendo a ordem dos códigos no empate."""
+    words = {w for w in re.findall(r"\w+", fold(text)) if len(w) > 3}
+    if len(skills) <= limit or not words:
+        return skills[:limit]
+    overlap = [
+        len(words & set(re.findall(r"\w+", fold(skill["description"])))) for skill in skills
+    ]
+    order = sorted(range(len(skills)), key=lambda i: -overlap[i])
+    return [skills[i] for i in sorted(order[:limit])]
+
+
+def load_skill_files(storage_dir: str) -> Dict[str, List[dict]]:
+    path = os.path.join(storage_dir, SKILLS_FILENAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("version") != SKILLS_VERSION:
+        return {}
+    return data["files"]
+
+
+def save_skill_files(storage_dir: str, files: Dict[str, List[dict]]):
+    os.makedirs(storage_dir, exist_ok=True)
+    path = os.path.join(storage_dir, SKILLS_FILENAME)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": SKILLS_VERSION, "files": files}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+_skill_index_lock = threading.Lock()
+_skill_index: Optional[SkillIndex] = None
+_skill_index_mtime: Optional[int] = None
+
+
+def get_skill_index() -> SkillIndex:
+    """Tabela carregada de STORAGE_DIR; recarregada quando o generate regrava o arquivo."""
+    global _skill_index, _skill_index_mtime
+    path = os.path.join(os.getenv("STORAGE_DIR", "storage"), SKILLS_FILENAME)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        mtime = None
+    with _skill_index_lock:
+        if _skill_index is None or mtime != _skill_index_mtime:
+            _skill_index = SkillIndex(load_skill_files(os.path.dirname(path)))
+            _skill_index_mtime = mtime
+            logger.info(f"Loaded {len(_skill_index)} BNCC skills from {path}")
+        return _skill_index
+
+
+async def aget_skill_index() -> SkillIndex:
+    return await run_blocking(get_skill_index)
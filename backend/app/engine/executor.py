@@ -0,0 +1,28 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Pool de threads dedicado às chamadas bloqueantes (LLMs e retrievers sem API async),
+    separado do pool padrão usado pelo Starlette para arquivos estáticos.
+    """
+    global _executor
+    if _executor is None:
+        max_workers = int(os.getenv("BLOCKING_POOL_SIZE", "32"))
+        _executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="blocking-call"
+        )
+    return _executor
+
+
+async def run_blocking(func: Callable[..., Any], *args, **kwargs) -> Any:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_executor(), functools.partial(func, *args, **kwargs)
+    )
@@ -3,36 +3,189 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+import json
 import logging
 import os
+import sys
+from typing import Dict, List, Optional
 
+from app.engine.bncc import (
+    extract_skills_by_file,
+    load_skill_files,
+    save_skill_files,
+)
+from app.engine.index import get_storage_context
+from app.engine.lexical import BM25_FILENAME, build_lexical_index
 from app.engine.loaders import get_documents
+from app.engine.loaders.file import list_data_files, source_file_of
+from app.engine.loaders.parse_cache import file_hash
+from app.engine.vector_store import (
+    create_vector_store,
+    insert_nodes,
+    remove_vector_store_files,
+)
 from app.settings import init_settings
 from llama_index.core.indices import (
     VectorStoreIndex,
+    load_index_from_storage,
 )
+from llama_index.core.ingestion import run_transformations
+from llama_index.core.settings import Settings
+from llama_index.core.storage import StorageContext
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger()
 
+MANIFEST_FILENAME = "manifest.json"
+MANIFEST_VERSION = 1
 
-def generate_datasource():
-    init_settings()
-    logger.info("Creating new index")
-    storage_dir = os.environ.get("STORAGE_DIR", "storage")
-    # load the documents and create the index
-    documents = get_documents()
+
+def index_settings() -> dict:
+    """Parâmetros que, se mudarem, exigem reconstruir o índice inteiro."""
+    return {
+        "chunk_size": Settings.chunk_size,
+        "chunk_overlap": Settings.chunk_overlap,
+        "embed_model": type(Settings.embed_model).__name__,
+        "embed_model_name": getattr(Settings.embed_model, "model_name", None),
+        "vector_store_backend": os.getenv("VECTOR_STORE_BACKEND", "mmap"),
+        "vector_store_dtype": os.getenv("VECTOR_STORE_DTYPE", "float32"),
+    }
+
+
+def load_manifest(storage_dir: str) -> Optional[dict]:
+    path = os.path.join(storage_dir, MANIFEST_FILENAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def save_manifest(storage_dir: str, files: Dict[str, dict]):
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "settings": index_settings(),
+        "files": files,
+    }
+    path = os.path.join(storage_dir, MANIFEST_FILENAME)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def load_documents(input_files: Optional[List[str]] = None):
+    documents = get_documents(input_files)
     # Set private=false to mark the document as public (required for filtering)
     for doc in documents:
         doc.metadata["private"] = "false"
-    index = VectorStoreIndex.from_documents(
-        documents,
-        show_progress=True,
+    return documents
+
+
+def build_manifest_files(hashes: Dict[str, str], documents) -> Dict[str, dict]:
+    doc_ids: Dict[str, List[str]] = {path: [] for path in hashes}
+    for doc in documents:
+        doc_ids.setdefault(source_file_of(doc.id_), []).append(doc.id_)
+    return {
+        path: {"hash": hashes[path], "doc_ids": doc_ids.get(path, [])}
+        for path in hashes
+    }
+
+
+def build_full_index(storage_dir: str, hashes: Dict[str, str]):
+    logger.info("Creating new index")
+    # load the documents and create the index
+    documents = load_documents()
+    storage_context = StorageContext.from_defaults(vector_store=create_vector_store())
+    nodes = run_transformations(
+        documents, Settings.transformations, show_progress=True
     )
+    index = VectorStoreIndex(nodes=[], storage_context=storage_context, show_progress=True)
+    insert_nodes(index, nodes, Settings.embed_model)
+    for doc in documents:
+        index.docstore.set_document_hash(doc.id_, doc.hash)
+    # O backend pode ter mudado: sem isso, get_storage_context acharia o store antigo
+    remove_vector_store_files(storage_dir)
     # store it for later
     index.storage_context.persist(storage_dir)
+    build_lexical_index(index, storage_dir)
+    save_skill_files(storage_dir, extract_skills_by_file(documents, source_file_of))
+    save_manifest(storage_dir, build_manifest_files(hashes, documents))
     logger.info(f"Finished creating new index. Stored in {storage_dir}")
 
 
+def update_index(storage_dir: str, manifest: dict, hashes: Dict[str, str]):
+    previous = manifest["files"]
+    added = [path for path in hashes if path not in previous]
+    changed = [
+        path for path in hashes
+        if path in previous and previous[path]["hash"] != hashes[path]
+    ]
+    removed = [path for path in previous if path not in hashes]
+
+    if not (added or changed or removed):
+        logger.info(f"Index in {storage_dir} is up to date")
+        # Tabela ausente ou de uma versão anterior da extração
+        if not load_skill_files(storage_dir):
+            build_skill_index(storage_dir)
+        if not os.path.exists(os.path.join(storage_dir, BM25_FILENAME)):
+            build_lexical_index(load_index_from_storage(get_storage_context(storage_dir)), storage_dir)
+        return
+
+    logger.info(
+        f"Updating index: {len(added)} added, {len(changed)} changed, {len(removed)} removed"
+    )
+    index = load_index_from_storage(get_storage_context(storage_dir))
+
+    files = {path: entry for path, entry in previous.items() if path in hashes}
+    for path in changed + removed:
+        for doc_id in previous[path]["doc_ids"]:
+            index.delete_ref_doc(doc_id, delete_from_docstore=True)
+        logger.info(f"Removed {path} from index")
+
+    to_load = added + changed
+    documents = load_documents(to_load)
+    nodes = run_transformations(
+        documents, Settings.transformations, show_progress=True
+    )
+    insert_nodes(index, nodes, Settings.embed_model)
+    for doc in documents:
+        index.docstore.set_document_hash(doc.id_, doc.hash)
+    files.update(build_manifest_files({path: hashes[path] for path in to_load}, documents))
+
+    skill_files = {
+        path: skills for path, skills in load_skill_files(storage_dir).items()
+        if path in hashes and path not in changed
+    }
+    skill_files.update(extract_skills_by_file(documents, source_file_of))
+
+    index.storage_context.persist(storage_dir)
+    build_lexical_index(index, storage_dir)
+    save_skill_files(storage_dir, skill_files)
+    save_manifest(storage_dir, files)
+    logger.info(f"Finished updating index. Stored in {storage_dir}")
+
+
+def build_skill_index(storage_dir: str):
+    """Gera a tabela de habilidades da BNCC para um índice criado antes dela existir."""
+    logger.info("Extracting BNCC skills")
+    documents = load_documents()
+    save_skill_files(storage_dir, extract_skills_by_file(documents, source_file_of))
+
+
+def generate_datasource(full_rebuild: bool = False):
+    init_settings()
+    storage_dir = os.environ.get("STORAGE_DIR", "storage")
+    hashes = {path: file_hash(path) for path in list_data_files()}
+
+    manifest = None if full_rebuild else load_manifest(storage_dir)
+    if manifest is None or manifest.get("settings") != index_settings():
+        build_full_index(storage_dir, hashes)
+    else:
+        update_index(storage_dir, manifest, hashes)
+
+
 if __name__ == "__main__":
-    generate_datasource()
+    generate_datasource(full_rebuild="--full" in sys.argv)
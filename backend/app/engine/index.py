@@ -1,14 +1,18 @@
+import hashlib
 import logging
 import os
-from datetime import timedelta
+import threading
+import time
 from typing import Optional
 
-from cachetools import TTLCache, cached
 from llama_index.core.callbacks import CallbackManager
 from llama_index.core.indices import load_index_from_storage
 from llama_index.core.storage import StorageContext
 from pydantic import BaseModel, Field
 
+from app.engine.executor import run_blocking
+from app.engine.vector_store import MmapVectorStore
+
 logger = logging.getLogger("uvicorn")
 
 
@@ -18,26 +22,134 @@ class IndexConfig(BaseModel):
     )
 
 
-def get_index(config: IndexConfig = None):
-    if config is None:
-        config = IndexConfig()
-    storage_dir = os.getenv("STORAGE_DIR", "storage")
-    # check if storage already exists
+class _ResidentIndex:
+    """
+    Mantém um único índice carregado por processo.
+    O índice é trocado de forma atômica quando o conteúdo de STORAGE_DIR muda.
+    """
+
+    def __init__(self):
+        self.index = None
+        self.signature: Optional[str] = None
+        self.loaded_at: Optional[float] = None
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+
+
+_resident = _ResidentIndex()
+
+
+def get_storage_dir() -> str:
+    return os.getenv("STORAGE_DIR", "storage")
+
+
+def _reload_check_interval() -> float:
+    return float(os.getenv("INDEX_RELOAD_CHECK_INTERVAL", "5"))
+
+
+def get_storage_signature(storage_dir: str) -> Optional[str]:
+    """
+    Calcula uma assinatura barata do diretório de storage (caminho, tamanho e mtime
+    de cada arquivo). Não lê o conteúdo dos arquivos.
+    """
     if not os.path.exists(storage_dir):
         return None
-    # load the existing index
+    entries = []
+    for root, _, files in os.walk(storage_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            relative = os.path.relpath(path, storage_dir)
+            entries.append(f"{relative}:{stat.st_size}:{stat.st_mtime_ns}")
+    entries.sort()
+    return hashlib.sha256("\n".join(entries).encode("utf-8")).hexdigest()
+
+
+def _load_index(storage_dir: str, callback_manager: Optional[CallbackManager] = None):
     logger.info(f"Loading index from {storage_dir}...")
     storage_context = get_storage_context(storage_dir)
-    index = load_index_from_storage(
-        storage_context, callback_manager=config.callback_manager
-    )
+    index = load_index_from_storage(storage_context, callback_manager=callback_manager)
     logger.info(f"Finished loading index from {storage_dir}")
     return index
 
 
-@cached(
-    TTLCache(maxsize=10, ttl=timedelta(minutes=5).total_seconds()),
-    key=lambda *args, **kwargs: "global_storage_context",
-)
+def reload_index(force: bool = True):
+    """
+    Recarrega o índice residente. Com `force=False` só recarrega se a assinatura
+    do storage mudou desde a última carga.
+    """
+    storage_dir = get_storage_dir()
+    with _resident.lock:
+        signature = get_storage_signature(storage_dir)
+        _resident.checked_at = time.monotonic()
+        if signature is None:
+            _resident.index = None
+            _resident.signature = None
+            _resident.loaded_at = None
+            return None
+        if not force and signature == _resident.signature and _resident.index is not None:
+            return _resident.index
+        index = _load_index(storage_dir)
+        # Troca atômica: requisições em andamento continuam com o índice antigo
+        _resident.index = index
+        _resident.signature = signature
+        _resident.loaded_at = time.time()
+        return index
+
+
+def get_index_status() -> dict:
+    return {
+        "storage_dir": get_storage_dir(),
+        "loaded": _resident.index is not None,
+        "signature": _resident.signature,
+        "loaded_at": _resident.loaded_at,
+    }
+
+
+def get_index(config: IndexConfig = None):
+    if config is None:
+        config = IndexConfig()
+    storage_dir = get_storage_dir()
+    # check if storage already exists
+    if not os.path.exists(storage_dir):
+        return None
+    # A custom callback manager needs its own index instance
+    if config.callback_manager is not None:
+        return _load_index(storage_dir, config.callback_manager)
+
+    index = _resident.index
+    if index is None:
+        return reload_index(force=False)
+
+    if time.monotonic() - _resident.checked_at < _reload_check_interval():
+        return index
+    _resident.checked_at = time.monotonic()
+    if get_storage_signature(storage_dir) == _resident.signature:
+        return index
+    # Storage mudou: apenas uma thread recarrega, as demais seguem com o índice atual
+    if _resident.lock.locked():
+        return index
+    try:
+        return reload_index(force=False)
+    except Exception as e:
+        # Ex: storage sendo regravado pelo generate; tenta de novo na próxima verificação
+        logger.warning(f"Failed to reload index from {storage_dir}, keeping current one: {e}")
+        return index
+
+
+async def aget_index(config: IndexConfig = None):
+    # A primeira carga (ou um reload) lê o storage do disco; não bloqueia o event loop
+    return await run_blocking(get_index, config)
+
+
 def get_storage_context(persist_dir: str) -> StorageContext:
+    # Storage gerado com o MmapVectorStore; senão usa o SimpleVectorStore (JSON)
+    if MmapVectorStore.exists(persist_dir):
+        return StorageContext.from_defaults(
+            persist_dir=persist_dir,
+            vector_store=MmapVectorStore.from_persist_dir(persist_dir),
+        )
     return StorageContext.from_defaults(persist_dir=persist_dir)
@@ -0,0 +1,261 @@
+import gzip
+import json
+import logging
+import math
+import os
+import re
+import threading
+import unicodedata
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.schema import BaseNode, NodeWithScore, QueryBundle
+from llama_index.core.vector_stores.types import MetadataFilters
+from llama_index.core.vector_stores.utils import build_metadata_filter_fn
+from nltk.stem.snowball import SnowballStemmer
+
+from app.engine.vector_store import PARTITION_KEY, partition_filter_values
+
+logger = logging.getLogger("uvicorn")
+
+BM25_FILENAME = "bm25_index.json.gz"
+BM25_VERSION = 1
+
+STOPWORDS = set(
+    """
+    a ao aos aquela aquelas aquele aqueles aquilo as até com como da das de dela delas
+    dele deles depois do dos e ela elas ele eles em entre era eram essa essas esse esses
+    esta estas este estes eu foi foram há isso isto já la lhe lhes mais mas me mesmo meu
+    minha muito na nas nem no nos nossa nosso num numa não o os ou para pela pelas pelo
+    pelos por qual quando que quem se sem ser seu seus sua suas são só também te tem têm
+    um uma umas uns vocês você à às é
+    """.split()
+)
+
+_stemmer = SnowballStemmer("portuguese")
+
+
+def fold_accents(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+@lru_cache(maxsize=100_000)
+def _term(word: str) -> str:
+    # Remove os acentos antes do radical, para que "computação" e "computacao"
+    # (comum em consultas digitadas) gerem o mesmo termo
+    return _stemmer.stem(fold_accents(word))
+
+
+def tokenize(text: str) -> List[str]:
+    """Palavras em minúsculas, sem stopwords, reduzidas ao radical e sem acentos."""
+    words = re.findall(r"\w+", text.lower())
+    return [_term(w) for w in words if len(w) > 1 and w not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Índice invertido BM25 sobre os chunks do índice vetorial. Cada termo aponta
+    para os documentos (posição em `node_ids`) e a frequência do termo em cada um.
+    """
+
+    def __init__(
+        self,
+        node_ids: List[str],
+        categories: List[str],
+        doc_lengths: np.ndarray,
+        postings: Dict[str, tuple],
+        k1: float = 1.2,
+        b: float = 0.75,
+    ):
+        self.node_ids = node_ids
+        self.categories = categories
+        self.doc_lengths = doc_lengths
+        self.postings = postings
+        self.k1 = k1
+        self.b = b
+        self.avg_length = float(doc_lengths.mean()) if len(doc_lengths) else 0.0
+        self._category_rows: Dict[str, np.ndarray] = {}
+        for category in set(categories):
+            self._category_rows[category] = np.flatnonzero(np.asarray(categories) == category)
+
+    @classmethod
+    def build(cls, nodes: Sequence[BaseNode], k1: float = 1.2, b: float = 0.75) -> "BM25Index":
+        node_ids, categories, lengths = [], [], []
+        term_rows: Dict[str, List[int]] = {}
+        term_freqs: Dict[str, List[int]] = {}
+        for row, node in enumerate(nodes):
+            tokens = tokenize(node.get_content())
+            counts: Dict[str, int] = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                term_rows.setdefault(token, []).append(row)
+                term_freqs.setdefault(token, []).append(count)
+            node_ids.append(node.node_id)
+            categories.append(str(node.metadata.get(PARTITION_KEY, "")))
+            lengths.append(len(tokens))
+        postings = {
+            term: (np.asarray(rows, dtype=np.int64), np.asarray(term_freqs[term], dtype=np.float32))
+            for term, rows in term_rows.items()
+        }
+        return cls(node_ids, categories, np.asarray(lengths, dtype=np.float32), postings, k1, b)
+
+    def __len__(self) -> int:
+        return len(self.node_ids)
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(len(self.node_ids), dtype=np.float32)
+        if not len(self.node_ids):
+            return scores
+        norm = self.k1 * (1 - self.b + self.b * self.doc_lengths / (self.avg_length or 1.0))
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            rows, freqs = self.postings[term]
+            df = len(rows)
+            idf = math.log(1 + (len(self.node_ids) - df + 0.5) / (df + 0.5))
+            scores[rows] += idf * freqs * (self.k1 + 1) / (freqs + norm[rows])
+        return scores
+
+    def candidate_rows(self, filters: Optional[MetadataFilters]) -> Optional[np.ndarray]:
+        """Linhas das categorias pedidas; None se não há filtro ou se ele não é só de categoria."""
+        categories = partition_filter_values(filters)
+        if categories is None:
+            return None
+        rows = [self._category_rows[c] for c in categories if c in self._category_rows]
+        return np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+
+    def save(self, path: str):
+        data = {
+            "version": BM25_VERSION,
+            "k1": self.k1,
+            "b": self.b,
+            "node_ids": self.node_ids,
+            "categories": self.categories,
+            "doc_lengths": self.doc_lengths.astype(int).tolist(),
+            "postings": {
+                term: [rows.tolist(), freqs.astype(int).tolist()]
+                for term, (rows, freqs) in self.postings.items()
+            },
+        }
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["BM25Index"]:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != BM25_VERSION:
+            return None
+        postings = {
+            term: (np.asarray(rows, dtype=np.int64), np.asarray(freqs, dtype=np.float32))
+            for term, (rows, freqs) in data["postings"].items()
+        }
+        return cls(
+            data["node_ids"],
+            data["categories"],
+            np.asarray(data["doc_lengths"], dtype=np.float32),
+            postings,
+            data["k1"],
+            data["b"],
+        )
+
+
+def build_lexical_index(index, storage_dir: str):
+    """Gera o BM25 a partir dos chunks guardados no docstore do índice."""
+    nodes = [
+        node for node in index.docstore.docs.values()
+        if node.node_id in index.index_struct.nodes_dict
+    ]
+    lexical_index = BM25Index.build(nodes)
+    lexical_index.save(os.path.join(storage_dir, BM25_FILENAME))
+    logger.info(f"Built BM25 index with {len(lexical_index)} nodes")
+
+
+class BM25Retriever(BaseRetriever):
+    def __init__(
+        self,
+        lexical_index: BM25Index,
+        docstore,
+        similarity_top_k: int = 5,
+        filters: Optional[MetadataFilters] = None,
+    ):
+        super().__init__()
+        self.lexical_index = lexical_index
+        self.docstore = docstore
+        self.similarity_top_k = similarity_top_k
+        self.filters = filters
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        scores = self.lexical_index.scores(query_bundle.query_str)
+        rows = self.lexical_index.candidate_rows(self.filters)
+        if rows is None:
+            rows = np.flatnonzero(scores > 0)
+        else:
+            rows = rows[scores[rows] > 0]
+        rows = rows[np.argsort(-scores[rows], kind="stable")]
+
+        # Filtros que não são só de categoria são avaliados nos metadados de cada nó
+        generic_filter = (
+            self.filters is not None
+            and self.filters.filters
+            and partition_filter_values(self.filters) is None
+        )
+        results = []
+        for row in rows:
+            node = self.docstore.get_node(self.lexical_index.node_ids[row], raise_error=False)
+            if node is None:
+                continue
+            if generic_filter:
+                if not build_metadata_filter_fn(lambda _: node.metadata, self.filters)(None):
+                    continue
+            results.append(NodeWithScore(node=node, score=float(scores[row])))
+            if len(results) == self.similarity_top_k:
+                break
+        return results
+
+
+class HybridRetriever(BaseRetriever):
+    """Combina o retriever denso e o BM25 por Reciprocal Rank Fusion."""
+
+    def __init__(self, retrievers: List[BaseRetriever], similarity_top_k: int = 5, rrf_k: int = 60):
+        super().__init__()
+        self.retrievers = retrievers
+        self.similarity_top_k = similarity_top_k
+        self.rrf_k = rrf_k
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        fused: Dict[str, float] = {}
+        nodes: Dict[str, BaseNode] = {}
+        for retriever in self.retrievers:
+            for rank, result in enumerate(retriever.retrieve(query_bundle)):
+                node_id = result.node.node_id
+                fused[node_id] = fused.get(node_id, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+                nodes.setdefault(node_id, result.node)
+        ranked = sorted(fused, key=lambda node_id: -fused[node_id])[: self.similarity_top_k]
+        return [NodeWithScore(node=nodes[node_id], score=fused[node_id]) for node_id in ranked]
+
+
+_lexical_lock = threading.Lock()
+_lexical_index: Optional[BM25Index] = None
+_lexical_mtime: Optional[int] = None
+
+
+def get_lexical_index() -> Optional[BM25Index]:
+    """BM25 de STORAGE_DIR; recarregado quando o generate regrava o arquivo."""
+    global _lexical_index, _lexical_mtime
+    path = os.path.join(os.getenv("STORAGE_DIR", "storage"), BM25_FILENAME)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    with _lexical_lock:
+        if _lexical_index is None or mtime != _lexical_mtime:
+            _lexical_index = BM25Index.load(path)
+            _lexical_mtime = mtime
+        return _lexical_index
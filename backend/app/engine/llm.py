@@ -0,0 +1,85 @@
+import asyncio
+import inspect
+import json
+import threading
+from typing import Any, AsyncIterator
+
+from llama_index.core.base.llms.types import CompletionResponse
+from llama_index.core.settings import Settings
+
+from app.engine.executor import run_blocking
+
+# Marca o fim do stream síncrono na fila
+_STREAM_END = object()
+
+
+def has_native_async(llm, method_name: str = "acomplete") -> bool:
+    # CustomLLM.acomplete apenas chama complete() e bloquearia o event loop.
+    # O llama-index reembrulha os métodos em cada subclasse, então compara a origem.
+    method = inspect.unwrap(getattr(type(llm), method_name))
+    return method.__qualname__ != f"CustomLLM.{method_name}"
+
+
+async def acomplete(prompt: str, llm=None) -> CompletionResponse:
+    """
+    Executa a completion sem bloquear o event loop. Provedores sem API async
+    rodam no pool de threads dedicado.
+    """
+    llm = llm or Settings.llm
+    if has_native_async(llm):
+        try:
+            return await llm.acomplete(prompt)
+        except NotImplementedError:
+            pass
+    return await run_blocking(llm.complete, prompt)
+
+
+async def _stream_in_thread(llm, prompt: str) -> AsyncIterator[str]:
+    """Consome o stream_complete síncrono no pool de threads, repassando os deltas por uma fila."""
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for response in llm.stream_complete(prompt):
+                # Cliente desconectou: para de consumir o stream do provedor
+                if stop.is_set():
+                    return
+                loop.call_soon_threadsafe(queue.put_nowait, response.delta or "")
+            loop.call_soon_threadsafe(queue.put_nowait, _STREAM_END)
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+
+    asyncio.ensure_future(run_blocking(produce))
+    try:
+        while True:
+            item = await queue.get()
+            if item is _STREAM_END:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+async def astream_complete(prompt: str, llm=None) -> AsyncIterator[str]:
+    """Devolve os trechos de texto (deltas) da completion à medida que o LLM os gera."""
+    llm = llm or Settings.llm
+    if has_native_async(llm, "astream_complete"):
+        async for response in await llm.astream_complete(prompt):
+            yield response.delta or ""
+        return
+    async for delta in _stream_in_thread(llm, prompt):
+        yield delta
+
+
+def parse_json_response(text: str) -> Any:
+    """Converte a resposta do LLM em JSON, removendo cercas de markdown (```json ... ```)."""
+    text = text.strip()
+    if text.startswith("```json"):
+        text = text.replace("```json", "").replace("```", "")
+    elif text.startswith("```"):
+        text = text.replace("```", "")
+    return json.loads(text)
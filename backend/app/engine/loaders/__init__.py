@@ -1,4 +1,5 @@
 import logging
+from typing import List, Optional
 
 import yaml
 from app.engine.loaders.file import FileLoaderConfig, get_file_documents
@@ -12,7 +13,7 @@ def load_configs():
     return configs
 
 
-def get_documents():
+def get_documents(input_files: Optional[List[str]] = None):
     documents = []
     config = load_configs()
     for loader_type, loader_config in config.items():
@@ -21,7 +22,9 @@ def get_documents():
         )
         match loader_type:
             case "file":
-                document = get_file_documents(FileLoaderConfig(**loader_config))
+                document = get_file_documents(
+                    FileLoaderConfig(**loader_config), input_files
+                )
             case _:
                 raise ValueError(f"Invalid loader type: {loader_type}")
         documents.extend(document)
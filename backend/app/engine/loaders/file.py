@@ -1,16 +1,30 @@
 import os
 import logging
-from typing import Dict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+from llama_index.core.schema import Document
 from llama_parse import LlamaParse
 from pydantic import BaseModel
 
 from app.config import DATA_DIR
+from app.engine.loaders.parse_cache import ParseCache, file_hash
 
 logger = logging.getLogger(__name__)
 
 
 class FileLoaderConfig(BaseModel):
     use_llama_parse: bool = False
+    # 0 = leitura serial; > 0 = número de processos para extrair o texto em paralelo
+    num_workers: int = 0
+    # PDFs com mais páginas que isso são divididos em faixas entre os processos
+    pages_per_task: int = 40
+    # Reaproveita o texto já extraído de arquivos que não mudaram
+    use_parse_cache: bool = True
+
+
+LLAMA_PARSE_RESULT_TYPE = "markdown"
+LLAMA_PARSE_LANGUAGE = "en"
 
 
 def llama_parse_parser():
@@ -20,9 +34,9 @@ def llama_parse_parser():
             "Please set it in .env file or in your shell environment then run again!"
         )
     parser = LlamaParse(
-        result_type="markdown",
+        result_type=LLAMA_PARSE_RESULT_TYPE,
         verbose=True,
-        language="en",
+        language=LLAMA_PARSE_LANGUAGE,
         ignore_errors=False,
     )
     return parser
@@ -85,9 +99,156 @@ def get_file_metadata(filename: str):
     return {"category": "geral"}
 
 
-def get_file_documents(config: FileLoaderConfig):
+def list_data_files() -> List[str]:
+    """
+    Lista os arquivos de DATA_DIR (recursivo, ignorando ocultos) como caminhos
+    absolutos, a mesma forma usada pelo SimpleDirectoryReader nos ids dos documentos.
+    """
+    files = []
+    for root, dirs, names in os.walk(os.path.abspath(DATA_DIR)):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for name in names:
+            if not name.startswith("."):
+                files.append(os.path.join(root, name))
+    return sorted(files)
+
+
+def source_file_of(doc_id: str) -> str:
+    # Com filename_as_id o id é o caminho do arquivo, ou "<caminho>_part_<n>" (ex: páginas de PDF)
+    return doc_id.rsplit("_part_", 1)[0] if "_part_" in doc_id else doc_id
+
+
+def parser_fingerprint(config: FileLoaderConfig) -> dict:
+    if config.use_llama_parse:
+        return {
+            "parser": "llama_parse",
+            "result_type": LLAMA_PARSE_RESULT_TYPE,
+            "language": LLAMA_PARSE_LANGUAGE,
+        }
+    return {"parser": "default"}
+
+
+def get_parse_cache() -> ParseCache:
+    return ParseCache(os.getenv("PARSE_CACHE_DIR", "cache/parsed"))
+
+
+# Mesmas chaves que o SimpleDirectoryReader remove do texto usado no embedding e no LLM
+EXCLUDED_FILE_METADATA_KEYS = [
+    "file_name",
+    "file_type",
+    "file_size",
+    "creation_date",
+    "last_modified_date",
+    "last_accessed_date",
+]
+
+
+def _load_file(path: str) -> List[Document]:
     from llama_index.core.readers import SimpleDirectoryReader
 
+    return SimpleDirectoryReader.load_file(
+        Path(path),
+        get_file_metadata,
+        {},
+        filename_as_id=True,
+        raise_on_error=True,
+    )
+
+
+def _load_pdf_pages(path: str, start: int, end: int) -> List[Document]:
+    """
+    Extrai as páginas [start, end) de um PDF, com os mesmos ids e metadados
+    que o PDFReader usado pelo SimpleDirectoryReader.
+    """
+    import pypdf
+
+    pdf = pypdf.PdfReader(path)
+    documents = []
+    for page in range(start, end):
+        metadata = {"page_label": pdf.page_labels[page], "file_name": Path(path).name}
+        metadata.update(get_file_metadata(path))
+        document = Document(text=pdf.pages[page].extract_text(), metadata=metadata)
+        document.id_ = f"{path}_part_{page}"
+        documents.append(document)
+    return documents
+
+
+def _pdf_page_count(path: str) -> int:
+    import pypdf
+
+    return len(pypdf.PdfReader(path).pages)
+
+
+def get_file_documents_parallel(config: FileLoaderConfig, input_files: List[str]):
+    """
+    Distribui arquivos (e faixas de páginas de PDFs grandes) num pool de processos.
+    Os documentos são devolvidos na mesma ordem da leitura serial.
+    """
+    tasks = []
+    for path in input_files:
+        if path.lower().endswith(".pdf"):
+            num_pages = _pdf_page_count(path)
+            if num_pages > config.pages_per_task:
+                for start in range(0, num_pages, config.pages_per_task):
+                    end = min(start + config.pages_per_task, num_pages)
+                    tasks.append((_load_pdf_pages, path, start, end))
+                continue
+        tasks.append((_load_file, path))
+
+    logger.info(
+        f"Loading {len(input_files)} files in {len(tasks)} tasks with {config.num_workers} processes"
+    )
+    with ProcessPoolExecutor(max_workers=config.num_workers) as pool:
+        futures = [pool.submit(*task) for task in tasks]
+        documents = [doc for future in futures for doc in future.result()]
+
+    for doc in documents:
+        doc.excluded_embed_metadata_keys.extend(EXCLUDED_FILE_METADATA_KEYS)
+        doc.excluded_llm_metadata_keys.extend(EXCLUDED_FILE_METADATA_KEYS)
+    return documents
+
+
+def get_file_documents(config: FileLoaderConfig, input_files: Optional[List[str]] = None):
+    if input_files is None:
+        input_files = list_data_files()
+    if len(input_files) == 0:
+        return []
+    if not config.use_parse_cache:
+        return parse_file_documents(config, input_files)
+
+    cache = get_parse_cache()
+    fingerprint = parser_fingerprint(config)
+    hashes = {path: file_hash(path) for path in input_files}
+    documents_by_file = {
+        path: cache.load(path, hashes[path], fingerprint, get_file_metadata)
+        for path in input_files
+    }
+    missing = [path for path, docs in documents_by_file.items() if docs is None]
+    logger.info(
+        f"Parse cache: {len(input_files) - len(missing)} files cached, {len(missing)} to parse"
+    )
+    for doc in (d for docs in documents_by_file.values() if docs for d in docs):
+        doc.excluded_embed_metadata_keys.extend(EXCLUDED_FILE_METADATA_KEYS)
+        doc.excluded_llm_metadata_keys.extend(EXCLUDED_FILE_METADATA_KEYS)
+
+    if missing:
+        parsed = {path: [] for path in missing}
+        for doc in parse_file_documents(config, missing):
+            parsed.setdefault(source_file_of(doc.id_), []).append(doc)
+        for path in missing:
+            cache.save(path, hashes[path], fingerprint, parsed[path], get_file_metadata)
+            documents_by_file[path] = parsed[path]
+
+    return [doc for path in input_files for doc in documents_by_file[path]]
+
+
+def parse_file_documents(config: FileLoaderConfig, input_files: List[str]):
+    from llama_index.core.readers import SimpleDirectoryReader
+
+    # LlamaParse já paraleliza do lado do servidor, então segue o caminho serial
+    if config.num_workers > 0 and not config.use_llama_parse:
+        return get_file_documents_parallel(config, input_files)
+
     try:
         file_extractor = None
         if config.use_llama_parse:
@@ -100,7 +261,7 @@ def get_file_documents(config: FileLoaderConfig):
             file_extractor = llama_parse_extractor()
         
         reader = SimpleDirectoryReader(
-            DATA_DIR,
+            input_files=input_files,
             recursive=True,
             filename_as_id=True,
             raise_on_error=True,
@@ -0,0 +1,96 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+from typing import Callable, List, Optional
+
+from llama_index.core.schema import Document
+
+logger = logging.getLogger(__name__)
+
+# Incrementar se o formato ou a forma de extração mudar
+PARSE_CACHE_VERSION = 1
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """
+    Guarda o texto extraído de cada arquivo (uma entrada por página) em JSON
+    compactado com gzip, identificado pelo hash do arquivo e pela configuração
+    do parser. Os metadados de categoria (get_file_metadata) não são guardados:
+    são recalculados na leitura, então mudar as regras não exige novo parsing.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+
+    def _entry_path(self, content_hash: str, parser_fingerprint: dict) -> str:
+        raw = json.dumps(
+            {"hash": content_hash, "parser": parser_fingerprint, "version": PARSE_CACHE_VERSION},
+            sort_keys=True,
+        )
+        key = hashlib.sha256(raw.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.json.gz")
+
+    def load(
+        self,
+        path: str,
+        content_hash: str,
+        parser_fingerprint: dict,
+        file_metadata: Callable[[str], dict],
+    ) -> Optional[List[Document]]:
+        entry_path = self._entry_path(content_hash, parser_fingerprint)
+        if not os.path.exists(entry_path):
+            return None
+        try:
+            with gzip.open(entry_path, "rt", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring corrupted parse cache entry {entry_path}: {e}")
+            return None
+
+        category_metadata = file_metadata(path)
+        documents = []
+        for page in entry["pages"]:
+            document = Document(
+                text=page["text"],
+                metadata={**page["metadata"], **category_metadata},
+            )
+            # O id depende do caminho atual do arquivo, não de onde ele estava ao ser extraído
+            document.id_ = f"{path}{page['id_suffix']}"
+            documents.append(document)
+        return documents
+
+    def save(
+        self,
+        path: str,
+        content_hash: str,
+        parser_fingerprint: dict,
+        documents: List[Document],
+        file_metadata: Callable[[str], dict],
+    ):
+        category_keys = set(file_metadata(path))
+        pages = [
+            {
+                "id_suffix": doc.id_[len(path):] if doc.id_.startswith(path) else "",
+                "text": doc.text,
+                "metadata": {
+                    k: v for k, v in doc.metadata.items() if k not in category_keys
+                },
+            }
+            for doc in documents
+        ]
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry_path = self._entry_path(content_hash, parser_fingerprint)
+        tmp_path = f"{entry_path}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump({"path": path, "pages": pages}, f, ensure_ascii=False)
+        os.replace(tmp_path, entry_path)
@@ -0,0 +1,104 @@
+import inspect
+import logging
+import os
+from typing import List, Optional
+
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.schema import NodeWithScore
+from llama_index.core.settings import Settings
+from llama_index.core.vector_stores.types import MetadataFilters
+
+from app.engine.executor import run_blocking
+from app.engine.lexical import BM25Retriever, HybridRetriever, get_lexical_index
+
+logger = logging.getLogger("uvicorn")
+
+
+# Embeddings locais: o _aget_query_embedding calcula o vetor na thread do event loop
+SYNC_EMBEDDINGS = {"_SimpleLocalEmbedding", "HuggingFaceEmbedding", "FastEmbedEmbedding"}
+
+
+def _overrides(obj, method_name: str, base_qualname: str) -> bool:
+    method = inspect.unwrap(getattr(type(obj), method_name))
+    return method.__qualname__ != base_qualname
+
+
+def has_native_async(retriever) -> bool:
+    # BaseRetriever._aretrieve apenas chama _retrieve() de forma síncrona
+    if not _overrides(retriever, "_aretrieve", "BaseRetriever._aretrieve"):
+        return False
+    # O _aretrieve do VectorIndexRetriever só é async de verdade se o vector store
+    # tiver aquery próprio (o padrão chama query()) e o embedding não for local
+    vector_store = getattr(retriever, "_vector_store", None)
+    if vector_store is not None and not _overrides(
+        vector_store, "aquery", "BasePydanticVectorStore.aquery"
+    ):
+        return False
+    embed_model = getattr(retriever, "_embed_model", None)
+    if embed_model is not None and any(
+        cls.__name__ in SYNC_EMBEDDINGS for cls in type(embed_model).__mro__
+    ):
+        return False
+    return True
+
+
+async def aretrieve(retriever, query: str) -> List[NodeWithScore]:
+    if has_native_async(retriever):
+        return await retriever.aretrieve(query)
+    return await run_blocking(retriever.retrieve, query)
+
+
+async def aretrieve_context(retriever, query: str) -> str:
+    nodes = await aretrieve(retriever, query)
+    return "\n\n".join([n.get_content() for n in nodes])
+
+
+RETRIEVER_MODES = ("auto", "dense", "lexical", "hybrid")
+
+
+def get_retriever_mode() -> str:
+    """
+    Modo de busca (env RETRIEVER_MODE): dense (embeddings), lexical (BM25) ou hybrid
+    (os dois, fundidos por RRF). "auto" usa lexical com o embedding local de hash,
+    cujos vetores não carregam significado, e dense nos demais provedores.
+    """
+    mode = os.getenv("RETRIEVER_MODE", "auto")
+    if mode not in RETRIEVER_MODES:
+        raise ValueError(f"Invalid retriever mode: {mode}")
+    if mode == "auto":
+        from app.settings import _SimpleLocalEmbedding
+
+        return "lexical" if isinstance(Settings.embed_model, _SimpleLocalEmbedding) else "dense"
+    return mode
+
+
+def get_retriever(
+    index,
+    similarity_top_k: int = 5,
+    filters: Optional[MetadataFilters] = None,
+) -> BaseRetriever:
+    mode = get_retriever_mode()
+    lexical_index = get_lexical_index() if mode != "dense" else None
+    if mode != "dense" and lexical_index is None:
+        logger.warning(f"BM25 index not found, using dense retrieval instead of {mode}")
+        mode = "dense"
+
+    if mode == "dense":
+        return index.as_retriever(similarity_top_k=similarity_top_k, filters=filters)
+    lexical = BM25Retriever(lexical_index, index.docstore, similarity_top_k, filters)
+    if mode == "lexical":
+        return lexical
+    # Cada lista contribui com mais candidatos do que o top-k final para a fusão
+    candidates = similarity_top_k * 2
+    lexical.similarity_top_k = candidates
+    dense = index.as_retriever(similarity_top_k=candidates, filters=filters)
+    return HybridRetriever([dense, lexical], similarity_top_k)
+
+
+async def aget_retriever(
+    index,
+    similarity_top_k: int = 5,
+    filters: Optional[MetadataFilters] = None,
+) -> BaseRetriever:
+    # A primeira chamada após um generate lê o BM25 do disco
+    return await run_blocking(get_retriever, index, similarity_top_k, filters)
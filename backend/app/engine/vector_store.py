@@ -0,0 +1,460 @@
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.indices import VectorStoreIndex
+from llama_index.core.schema import BaseNode, MetadataMode
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    FilterCondition,
+    FilterOperator,
+    MetadataFilters,
+    VectorStoreQuery,
+    VectorStoreQueryMode,
+    VectorStoreQueryResult,
+)
+from llama_index.core.vector_stores.utils import (
+    build_metadata_filter_fn,
+    node_to_metadata_dict,
+)
+
+from app.engine.ann import IVFIndex
+from app.engine.executor import run_blocking
+
+logger = logging.getLogger("uvicorn")
+
+NAMESPACE_SEP = "__"
+DEFAULT_NAMESPACE = "default"
+MATRIX_FNAME = "mmap_vectors.npy"
+TABLE_FNAME = "mmap_vectors.json"
+ANN_FNAME = "mmap_ivf.npz"
+# Linhas processadas por vez quando a matriz está em float16 (conversão para float32)
+FLOAT16_BLOCK_ROWS = 8192
+# Metadado atribuído por get_file_metadata usado para particionar a matriz
+PARTITION_KEY = "category"
+
+
+def partition_filter_values(filters: Optional[MetadataFilters]) -> Optional[List[str]]:
+    """
+    Se os filtros forem apenas sobre `category` (EQ/IN combinados com OR, ou um
+    único filtro), devolve as categorias pedidas; senão None.
+    """
+    if filters is None or not filters.filters:
+        return None
+    if len(filters.filters) > 1 and filters.condition != FilterCondition.OR:
+        return None
+    values = []
+    for metadata_filter in filters.filters:
+        if isinstance(metadata_filter, MetadataFilters) or metadata_filter.key != PARTITION_KEY:
+            return None
+        if metadata_filter.operator == FilterOperator.EQ:
+            values.append(metadata_filter.value)
+        elif metadata_filter.operator == FilterOperator.IN:
+            values.extend(metadata_filter.value)
+        else:
+            return None
+    return list(dict.fromkeys(values))
+
+
+def ann_settings() -> Dict[str, int]:
+    """
+    Parâmetros do índice aproximado (IVF). Abaixo de `ann_min_nodes` vetores a
+    busca é exata; 0 desativa o índice. Mais `ann_nprobe` = mais recall e latência.
+    """
+    return {
+        "ann_min_nodes": int(os.getenv("VECTOR_STORE_ANN_MIN_NODES", "20000")),
+        "ann_nlist": int(os.getenv("VECTOR_STORE_ANN_NLIST", "0")),
+        "ann_nprobe": int(os.getenv("VECTOR_STORE_ANN_NPROBE", "16")),
+    }
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+def _normalize_query(query_embedding: List[float]) -> np.ndarray:
+    return _normalize(np.asarray([query_embedding], dtype=np.float32))[0]
+
+
+class MmapVectorStore(BasePydanticVectorStore):
+    """
+    Vector store com os embeddings numa matriz contígua (float32 ou float16)
+    gravada em `.npy` e carregada via mmap, sem cópia; ids, ref_doc_ids e metadados
+    ficam numa tabela JSON ao lado. Os vetores são guardados normalizados, então a
+    similaridade de cosseno do top-k é um único produto matriz-vetor.
+
+    As linhas são gravadas agrupadas por `category`, então um filtro por categorias
+    calcula o produto apenas nas sub-matrizes dessas partições.
+
+    Em corpora grandes, `persist` também grava um índice IVF (ver `IVFIndex`) e a
+    consulta só pontua as linhas das listas sondadas.
+    """
+
+    stores_text: bool = False
+    dtype: str = "float32"
+    ann_min_nodes: int = 20000
+    # 0 = automático (4 * raiz do número de vetores)
+    ann_nlist: int = 0
+    ann_nprobe: int = 16
+
+    _ids: List[str] = PrivateAttr(default_factory=list)
+    _ref_doc_ids: List[str] = PrivateAttr(default_factory=list)
+    _metadata: List[Dict[str, Any]] = PrivateAttr(default_factory=list)
+    _matrix: Optional[np.ndarray] = PrivateAttr(default=None)
+    _pending: List[np.ndarray] = PrivateAttr(default_factory=list)
+    _partitions: Optional[Dict[str, np.ndarray]] = PrivateAttr(default=None)
+    _ann: Optional[IVFIndex] = PrivateAttr(default=None)
+
+    def __init__(self, dtype: str = "float32", **kwargs: Any) -> None:
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"Invalid vector store dtype: {dtype}")
+        super().__init__(dtype=dtype, **kwargs)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "MmapVectorStore"
+
+    @property
+    def client(self) -> None:
+        return None
+
+    @property
+    def node_count(self) -> int:
+        return len(self._ids)
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """Matriz (n, dim) com os vetores normalizados. Pode ser um memmap somente leitura."""
+        if self._pending:
+            blocks = ([self._matrix] if self._matrix is not None else []) + self._pending
+            self._matrix = np.vstack(blocks)
+            self._pending = []
+        if self._matrix is None:
+            return np.zeros((0, 0), dtype=np.float32)
+        return self._matrix
+
+    def partitions(self) -> Dict[str, np.ndarray]:
+        """Linhas (ordenadas) de cada categoria."""
+        if self._partitions is None:
+            rows_by_category: Dict[str, List[int]] = {}
+            for row, metadata in enumerate(self._metadata):
+                category = str(metadata.get(PARTITION_KEY, ""))
+                rows_by_category.setdefault(category, []).append(row)
+            self._partitions = {
+                category: np.asarray(rows, dtype=np.int64)
+                for category, rows in rows_by_category.items()
+            }
+        return self._partitions
+
+    def get(self, text_id: str) -> List[float]:
+        row = self._ids.index(text_id)
+        return self.matrix[row].astype(np.float32).tolist()
+
+    def add(
+        self,
+        nodes: Sequence[BaseNode],
+        embeddings: Optional[np.ndarray] = None,
+        **add_kwargs: Any,
+    ) -> List[str]:
+        """`embeddings`: matriz (len(nodes), dim) já calculada, no lugar de `node.get_embedding()`."""
+        if not nodes:
+            return []
+        if embeddings is None:
+            embeddings = np.asarray([node.get_embedding() for node in nodes], dtype=np.float32)
+        self._pending.append(_normalize(np.asarray(embeddings, dtype=np.float32)))
+        for node in nodes:
+            metadata = node_to_metadata_dict(node, remove_text=True, flat_metadata=False)
+            metadata.pop("_node_content", None)
+            self._ids.append(node.node_id)
+            self._ref_doc_ids.append(node.ref_doc_id or "None")
+            self._metadata.append(metadata)
+        self._partitions = None
+        self._ann = None
+        return [node.node_id for node in nodes]
+
+    def _keep_rows(self, keep: np.ndarray):
+        self._matrix = np.ascontiguousarray(self.matrix[keep])
+        self._ids = [v for v, k in zip(self._ids, keep) if k]
+        self._ref_doc_ids = [v for v, k in zip(self._ref_doc_ids, keep) if k]
+        self._metadata = [v for v, k in zip(self._metadata, keep) if k]
+        self._partitions = None
+        self._ann = None
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        keep = np.array([r != ref_doc_id for r in self._ref_doc_ids], dtype=bool)
+        if not keep.all():
+            self._keep_rows(keep)
+
+    def delete_nodes(
+        self,
+        node_ids: Optional[List[str]] = None,
+        filters: Optional[MetadataFilters] = None,
+        **delete_kwargs: Any,
+    ) -> None:
+        filter_fn = build_metadata_filter_fn(lambda row: self._metadata[row], filters)
+        node_id_set = set(node_ids) if node_ids is not None else None
+        keep = np.array(
+            [
+                not ((node_id_set is None or node_id in node_id_set) and filter_fn(row))
+                for row, node_id in enumerate(self._ids)
+            ],
+            dtype=bool,
+        )
+        if not keep.all():
+            self._keep_rows(keep)
+
+    def clear(self) -> None:
+        self._ids, self._ref_doc_ids, self._metadata = [], [], []
+        self._matrix, self._pending = None, []
+        self._partitions = None
+        self._ann = None
+
+    def candidate_rows(
+        self,
+        filters: Optional[MetadataFilters] = None,
+        node_ids: Optional[List[str]] = None,
+    ) -> Optional[List[np.ndarray]]:
+        """
+        Grupos de linhas que passam pelos filtros; None significa todas.
+        Filtros só de categoria usam as partições sem avaliar os metadados de cada nó.
+        """
+        if not (filters and filters.filters) and node_ids is None:
+            return None
+
+        categories = partition_filter_values(filters)
+        if categories is not None and node_ids is None:
+            partitions = self.partitions()
+            return [partitions[c] for c in categories if c in partitions]
+
+        filter_fn = build_metadata_filter_fn(lambda row: self._metadata[row], filters)
+        node_id_set = set(node_ids) if node_ids is not None else None
+        rows = [
+            row
+            for row, node_id in enumerate(self._ids)
+            if (node_id_set is None or node_id in node_id_set) and filter_fn(row)
+        ]
+        return [np.asarray(rows, dtype=np.int64)]
+
+    def _block_scores(self, query_vector: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        matrix = self.matrix
+        contiguous = len(rows) > 0 and rows[-1] - rows[0] + 1 == len(rows)
+        if matrix.dtype == np.float32:
+            # Partição contígua: fatia (view) da matriz, sem copiar as linhas
+            block = matrix[rows[0]:rows[-1] + 1] if contiguous else matrix[rows]
+            return block @ query_vector
+        out = np.empty(len(rows), dtype=np.float32)
+        for start in range(0, len(rows), FLOAT16_BLOCK_ROWS):
+            chunk = rows[start:start + FLOAT16_BLOCK_ROWS]
+            out[start:start + len(chunk)] = matrix[chunk].astype(np.float32) @ query_vector
+        return out
+
+    @property
+    def uses_ann(self) -> bool:
+        return self._ann is not None
+
+    def ann_rows(
+        self,
+        query_embedding: List[float],
+        row_groups: Optional[List[np.ndarray]],
+        top_k: int,
+    ) -> Optional[List[np.ndarray]]:
+        """
+        Restringe os candidatos às listas IVF sondadas. Devolve None (busca exata)
+        se não há índice ou se sobram menos candidatos que o top-k pedido.
+        """
+        if self._ann is None:
+            return None
+        probed = self._ann.search(_normalize_query(query_embedding), self.ann_nprobe)
+        if row_groups is None:
+            groups = [probed]
+        else:
+            groups = [np.intersect1d(rows, probed, assume_unique=True) for rows in row_groups]
+        if sum(len(rows) for rows in groups) < top_k:
+            return None
+        return groups
+
+    def scores(
+        self, query_embedding: List[float], row_groups: Optional[List[np.ndarray]] = None
+    ) -> np.ndarray:
+        query_vector = _normalize_query(query_embedding)
+        if row_groups is None:
+            row_groups = [np.arange(self.node_count, dtype=np.int64)]
+        return np.concatenate(
+            [self._block_scores(query_vector, rows) for rows in row_groups]
+        )
+
+    async def aquery(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        # O produto matriz-vetor é bloqueante: roda no pool, fora do event loop
+        return await run_blocking(self.query, query, **kwargs)
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        if query.mode != VectorStoreQueryMode.DEFAULT:
+            raise ValueError(f"Invalid query mode: {query.mode}")
+        if query.query_embedding is None or not self._ids:
+            return VectorStoreQueryResult(similarities=[], ids=[])
+
+        row_groups = self.candidate_rows(query.filters, query.node_ids)
+        if row_groups is not None:
+            row_groups = [rows for rows in row_groups if len(rows)]
+            if not row_groups:
+                return VectorStoreQueryResult(similarities=[], ids=[])
+        ann_groups = self.ann_rows(query.query_embedding, row_groups, query.similarity_top_k)
+        if ann_groups is not None:
+            row_groups = [rows for rows in ann_groups if len(rows)]
+        scores = self.scores(query.query_embedding, row_groups)
+        rows = None if row_groups is None else np.concatenate(row_groups)
+
+        top_k = min(query.similarity_top_k, len(scores))
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top])]
+        top_rows = top if rows is None else rows[top]
+        return VectorStoreQueryResult(
+            similarities=[float(scores[i]) for i in top],
+            ids=[self._ids[row] for row in top_rows],
+        )
+
+    def _sort_by_partition(self):
+        """Reordena as linhas para que cada categoria ocupe um bloco contíguo."""
+        categories = np.array([str(m.get(PARTITION_KEY, "")) for m in self._metadata])
+        order = np.argsort(categories, kind="stable")
+        if np.array_equal(order, np.arange(len(order))):
+            return
+        self._matrix = np.ascontiguousarray(self.matrix[order])
+        self._ids = [self._ids[i] for i in order]
+        self._ref_doc_ids = [self._ref_doc_ids[i] for i in order]
+        self._metadata = [self._metadata[i] for i in order]
+        self._partitions = None
+        self._ann = None
+
+    @staticmethod
+    def _paths(persist_path: str):
+        # persist_path vem do StorageContext: "<dir>/<namespace>__vector_store.json"
+        directory = os.path.dirname(persist_path)
+        namespace = os.path.basename(persist_path).split(NAMESPACE_SEP)[0]
+        prefix = os.path.join(directory, f"{namespace}{NAMESPACE_SEP}")
+        return prefix + MATRIX_FNAME, prefix + TABLE_FNAME, prefix + ANN_FNAME
+
+    def persist(self, persist_path: str, fs: Any = None) -> None:
+        matrix_path, table_path, ann_path = self._paths(persist_path)
+        os.makedirs(os.path.dirname(matrix_path) or ".", exist_ok=True)
+        # Cada categoria vira um bloco contíguo de linhas no arquivo
+        self._sort_by_partition()
+        matrix = self.matrix.astype(self.dtype, copy=False)
+
+        # Grava em arquivos temporários e troca de uma vez (leitores com mmap
+        # continuam vendo o arquivo antigo até recarregar)
+        with open(f"{matrix_path}.tmp", "wb") as f:
+            np.save(f, matrix)
+        table = {
+            "dtype": self.dtype,
+            "dim": int(matrix.shape[1]) if matrix.ndim == 2 else 0,
+            "ids": self._ids,
+            "ref_doc_ids": self._ref_doc_ids,
+            "metadata": self._metadata,
+            "partitions": {
+                category: [int(rows[0]), int(rows[-1]) + 1]
+                for category, rows in self.partitions().items()
+            },
+        }
+        with open(f"{table_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(table, f, ensure_ascii=False)
+        os.replace(f"{matrix_path}.tmp", matrix_path)
+        os.replace(f"{table_path}.tmp", table_path)
+
+        if self.ann_min_nodes > 0 and self.node_count >= self.ann_min_nodes:
+            if self._ann is None:
+                logger.info(f"Building IVF index for {self.node_count} vectors")
+                self._ann = IVFIndex.build(self.matrix, nlist=self.ann_nlist or None)
+            self._ann.save(ann_path)
+        elif os.path.exists(ann_path):
+            os.remove(ann_path)
+
+        # Remove o JSON do SimpleVectorStore de uma versão anterior do storage
+        if os.path.exists(persist_path):
+            os.remove(persist_path)
+
+    @classmethod
+    def exists(cls, persist_dir: str, namespace: str = DEFAULT_NAMESPACE) -> bool:
+        matrix_path, table_path, _ = cls._paths(
+            os.path.join(persist_dir, f"{namespace}{NAMESPACE_SEP}vector_store.json")
+        )
+        return os.path.exists(matrix_path) and os.path.exists(table_path)
+
+    @classmethod
+    def from_persist_dir(
+        cls, persist_dir: str, namespace: str = DEFAULT_NAMESPACE, **kwargs: Any
+    ) -> "MmapVectorStore":
+        matrix_path, table_path, ann_path = cls._paths(
+            os.path.join(persist_dir, f"{namespace}{NAMESPACE_SEP}vector_store.json")
+        )
+        with open(table_path, encoding="utf-8") as f:
+            table = json.load(f)
+        matrix = np.load(matrix_path, mmap_mode="r")
+        if len(table["ids"]) and matrix.shape[0] != len(table["ids"]):
+            raise ValueError(
+                f"Vector matrix {matrix_path} has {matrix.shape[0]} rows, "
+                f"expected {len(table['ids'])}"
+            )
+
+        store = cls(dtype=table["dtype"], **{**ann_settings(), **kwargs})
+        store._ids = table["ids"]
+        store._ref_doc_ids = table["ref_doc_ids"]
+        store._metadata = table["metadata"]
+        store._matrix = matrix if len(table["ids"]) else None
+        if "partitions" in table:
+            store._partitions = {
+                category: np.arange(start, end, dtype=np.int64)
+                for category, (start, end) in table["partitions"].items()
+            }
+        if store.ann_min_nodes > 0 and os.path.exists(ann_path):
+            ann = IVFIndex.load(ann_path)
+            if len(ann.rows) == len(store._ids):
+                store._ann = ann
+        logger.info(f"Loaded {len(store._ids)} vectors ({table['dtype']}) from {matrix_path}")
+        return store
+
+
+def insert_nodes(index: VectorStoreIndex, nodes: Sequence[BaseNode], embed_model: Any):
+    """
+    Insere os nós no índice. Com o MmapVectorStore e um embedding que gera a matriz
+    do lote de uma vez (`embed_matrix`), os vetores vão em float32 direto para o
+    store, sem passar por listas de floats; senão usa o caminho do llama-index.
+    """
+    vector_store = index.vector_store
+    if not isinstance(vector_store, MmapVectorStore) or not hasattr(embed_model, "embed_matrix"):
+        index.insert_nodes(nodes)
+        return
+    texts = [node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes]
+    ids = vector_store.add(nodes, embeddings=embed_model.embed_matrix(texts))
+    # Como no VectorStoreIndex: o store não guarda o texto, então os nós vão para o docstore
+    for node, node_id in zip(nodes, ids):
+        index.index_struct.add_node(node, text_id=node_id)
+    index.docstore.add_documents(nodes, allow_update=True)
+    index.storage_context.index_store.add_index_struct(index.index_struct)
+
+
+def remove_vector_store_files(persist_dir: str, namespace: str = DEFAULT_NAMESPACE):
+    """Apaga o vector store gravado antes (arquivos do mmap ou JSON do SimpleVectorStore)."""
+    persist_path = os.path.join(persist_dir, f"{namespace}{NAMESPACE_SEP}vector_store.json")
+    for path in (persist_path, *MmapVectorStore._paths(persist_path)):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def create_vector_store() -> Optional[BasePydanticVectorStore]:
+    """
+    Vector store usado ao criar um novo índice. None mantém o SimpleVectorStore (JSON).
+    """
+    backend = os.getenv("VECTOR_STORE_BACKEND", "mmap")
+    if backend == "simple":
+        return None
+    if backend != "mmap":
+        raise ValueError(f"Invalid vector store backend: {backend}")
+    return MmapVectorStore(
+        dtype=os.getenv("VECTOR_STORE_DTYPE", "float32"), **ann_settings()
+    )
@@ -1,7 +1,8 @@
 import os
 from typing import Dict
 import hashlib
-import random
+
+import numpy as np
 
 from llama_index.core.settings import Settings
 from llama_index.core.base.embeddings.base import BaseEmbedding
@@ -169,18 +170,51 @@ def init_mistral():
     Settings.embed_model = MistralAIEmbedding(model_name=os.getenv("EMBEDDING_MODEL"))
 
 
+_SPLITMIX_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+_SPLITMIX_MUL1 = np.uint64(0xBF58476D1CE4E5B9)
+_SPLITMIX_MUL2 = np.uint64(0x94D049BB133111EB)
+
+
+def _splitmix64(x: np.ndarray) -> np.ndarray:
+    # Overflow em uint64 é intencional (aritmética módulo 2**64)
+    with np.errstate(over="ignore"):
+        z = x + _SPLITMIX_GAMMA
+        z = (z ^ (z >> np.uint64(30))) * _SPLITMIX_MUL1
+        z = (z ^ (z >> np.uint64(27))) * _SPLITMIX_MUL2
+        return z ^ (z >> np.uint64(31))
+
+
 class _SimpleLocalEmbedding(BaseEmbedding):
     dim: int = Field(default=768)
     embed_batch_size: int = Field(default=8)
 
+    @staticmethod
+    def _seed(text: str) -> int:
+        return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+
+    def embed_matrix(self, texts: list[str]) -> np.ndarray:
+        """
+        Gera a matriz (len(texts), dim) em float32 num único passo vetorizado.
+        Cada linha depende apenas do próprio texto (determinística e independente do lote).
+        """
+        seeds = np.fromiter(
+            (self._seed(t or "") for t in texts), dtype=np.uint64, count=len(texts)
+        )
+        with np.errstate(over="ignore"):
+            counters = seeds[:, None] + np.arange(self.dim, dtype=np.uint64)[None, :] * _SPLITMIX_GAMMA
+        bits = _splitmix64(counters) >> np.uint64(11)
+        # 53 bits -> [0, 1) -> [-1, 1); em float32 os valores mais próximos de 1 arredondam para 1.0
+        return (bits.astype(np.float64) * (2.0 / 2**53) - 1.0).astype(np.float32)
+
     def _embed(self, text: str) -> list[float]:
-        seed = int(hashlib.sha256(text.encode("utf-8")).hexdigest(), 16) % (2**32)
-        rng = random.Random(seed)
-        return [rng.uniform(-1.0, 1.0) for _ in range(self.dim)]
+        return self.embed_matrix([text])[0].tolist()
 
     def _get_text_embedding(self, text: str) -> list[float]:
         return self._embed(text or "")
 
+    def _get_text_embeddings(self, texts: list[str]) -> list[list[float]]:
+        return self.embed_matrix(texts).tolist()
+
     def _get_query_embedding(self, query: str) -> list[float]:
         return self._embed(query or "")
 
@@ -191,4 +225,4 @@ class _SimpleLocalEmbedding(BaseEmbedding):
         return self._embed(text or "")
 
     def get_text_embedding_batch(self, texts: list[str], show_progress: bool = False, **kwargs) -> list[list[float]]:
-        return [self._embed(t or "") for t in texts]
+        return self.embed_matrix(texts).tolist()
@@ -9,16 +9,10 @@ import logging
 import os
 
 import uvicorn
-from app.api.routers.activity import activity_router
-from app.api.routers.unit import unit_router
-from app.api.routers.slides import slides_router
-from app.settings import init_settings
 from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse
-from fastapi.staticfiles import StaticFiles
 
-app = FastAPI()
+environment = os.getenv("ENVIRONMENT", "dev")  # Default to 'development' if not set
+logger = logging.getLogger("uvicorn")
 
 origins = [
     "https://cultura-digital-puce.vercel.app",  # frontend na nuvem
@@ -26,47 +20,85 @@ origins = [
 ]
 
 
-init_settings()
-
-environment = os.getenv("ENVIRONMENT", "dev")  # Default to 'development' if not set
-logger = logging.getLogger("uvicorn")
-
-# CORS configuration
-app.add_middleware(
-    CORSMiddleware,
-    allow_origin,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-
-def mount_static_files(directory, path):
-    if os.path.exists(directory):
-        logger.info(f"Mounting static files '{directory}' at '{path}'")
-        app.mount(
-            path,
-            StaticFiles(directory=directory, check_dir=False),
-            name=f"{directory}-static",
-        )
-
-
-# Mount the data files to serve the file viewer
-mount_static_files(DATA_DIR, "/api/files/data")
-# Mount the output files from tools
-mount_static_files("output", "/api/files/output")
-
-
-app.include_router(activity_router, prefix="/api/activity")
-app.include_router(unit_router, prefix="/api/units")
-app.include_router(slides_router, prefix="/api/slides")
+def create_app() -> FastAPI:
+    """
+    Monta a aplicação. Os imports ficam aqui dentro porque os workers do pool de
+    renderização (spawn) reimportam este arquivo e não devem carregar o llama-index.
+    """
+    from app.api.routers.activity import activity_router
+    from app.api.routers.admin import admin_router
+    from app.api.routers.artifacts import artifacts_router
+    from app.api.routers.course import course_router
+    from app.api.routers.jobs import jobs_router, start_job_queue, stop_job_queue
+    from app.api.routers.unit import unit_router
+    from app.api.routers.slides import slides_router
+    from app.api.services.artifacts import start_output_sweeper, stop_output_sweeper
+    from app.api.services.presenton import close_presenton_client
+    from app.api.services.renderer import shutdown_render_pool, warm_render_pool
+    from app.settings import init_settings
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.staticfiles import StaticFiles
+
+    app = FastAPI()
+
+    init_settings()
+
+    # CORS configuration
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    def mount_static_files(directory, path):
+        if os.path.exists(directory):
+            logger.info(f"Mounting static files '{directory}' at '{path}'")
+            app.mount(
+                path,
+                StaticFiles(directory=directory, check_dir=False),
+                name=f"{directory}-static",
+            )
+
+    # Mount the data files to serve the file viewer
+    mount_static_files(DATA_DIR, "/api/files/data")
+    # Mount the output files from tools
+    mount_static_files("output", "/api/files/output")
+
+    app.include_router(activity_router, prefix="/api/activity")
+    app.include_router(unit_router, prefix="/api/units")
+    app.include_router(slides_router, prefix="/api/slides")
+    app.include_router(admin_router, prefix="/api/admin")
+    app.include_router(artifacts_router, prefix="/api/artifacts")
+    app.include_router(jobs_router, prefix="/api/jobs")
+    app.include_router(course_router, prefix="/api/course")
+
+    # Workers da fila de jobs (e retomada dos jobs pendentes)
+    app.add_event_handler("startup", start_job_queue)
+    app.add_event_handler("shutdown", stop_job_queue)
+    # Workers de renderização de PDF/DOCX já com fpdf/docx importados
+    app.add_event_handler("startup", warm_render_pool)
+    app.add_event_handler("shutdown", shutdown_render_pool)
+    # Limpeza periódica dos documentos gerados (tamanho, quantidade e idade)
+    app.add_event_handler("startup", start_output_sweeper)
+    app.add_event_handler("shutdown", stop_output_sweeper)
+    # Conexões keep-alive com o Presenton
+    app.add_event_handler("shutdown", close_presenton_client)
+
+    if os.path.exists("static"):
+        app.mount("/", StaticFiles(directory="static", html=True), name="static")
+    return app
 
-if os.path.exists("static"):
-    app.mount("/", StaticFiles(directory="static", html=True), name="static")
 
 if __name__ == "__main__":
+    # Só sobe o uvicorn, que importa este arquivo de novo como "main" e monta a aplicação
     app_host = os.getenv("APP_HOST", "0.0.0.0")
     app_port = int(os.getenv("APP_PORT", "8000"))
     reload = True if environment == "dev" else False
 
     uvicorn.run(app="main:app", host=app_host, port=app_port, reload=reload)
+elif __name__ != "__mp_main__":
+    # Em processos filhos criados com spawn (pool de renderização) o arquivo é
+    # reimportado como __mp_main__: lá a aplicação não é montada
+    app = create_app()
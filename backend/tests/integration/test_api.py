@@ -36,3 +36,17 @@ async def test_slides_generate_validation():
     async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
         response = await ac.post("/api/slides/generate", json={})
     assert response.status_code == 422
+
+@pytest.mark.asyncio
+async def test_lesson_plan_pdf_download_direto(monkeypatch):
+    """Verifica se o PDF do plano volta no corpo da resposta, como anexo, sem passar pelo disco"""
+    monkeypatch.setenv("RENDER_POOL_SIZE", "0")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        response = await ac.post(
+            "/api/units/lesson-plan/pdf?download=true",
+            json={"data": {"titulo": "Frações no dia a dia"}},
+        )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/pdf"
+    assert 'filename="plano_fracoes_no_dia_a_dia.pdf"' in response.headers["content-disposition"]
+    assert response.content.startswith(b"%PDF")
@@ -0,0 +1,10 @@
+import json
+
+
+def ler_eventos(corpo: str):
+    """Converte o corpo de uma resposta text/event-stream em [(evento, dados)]."""
+    eventos = []
+    for bloco in corpo.strip().split("\n\n"):
+        linhas = dict(linha.split(": ", 1) for linha in bloco.split("\n"))
+        eventos.append((linhas["event"], json.loads(linhas["data"])))
+    return eventos
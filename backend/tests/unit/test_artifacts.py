@@ -0,0 +1,104 @@
+import os
+import time
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.api.routers.artifacts import artifacts_router
+from app.api.services import artifacts
+from app.api.services.artifacts import ArtifactStore, artifact_key
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """Store apontando para um diretório temporário, renderizando no pool de threads."""
+    monkeypatch.setenv("RENDER_POOL_SIZE", "0")
+    store = ArtifactStore({
+        "activity": ("activities", str(tmp_path / "atividades"), "atividade"),
+        "lesson-plan": ("plans", str(tmp_path / "planos"), "plano"),
+    })
+    monkeypatch.setattr(artifacts, "_artifact_store", store)
+    return store
+
+
+def test_chave_depende_do_conteudo_e_formato():
+    """Testa se a chave ignora a ordem das chaves do JSON, mas muda com o formato."""
+    a = artifact_key("activity", "pdf", {"title": "X", "questions": []})
+    b = artifact_key("activity", "pdf", {"questions": [], "title": "X"})
+    assert a == b
+    assert a != artifact_key("activity", "docx", {"title": "X", "questions": []})
+
+
+@pytest.mark.asyncio
+async def test_exportacao_repetida_vem_do_store(store, monkeypatch):
+    """Testa se a segunda exportação do mesmo plano não renderiza de novo."""
+    renders = []
+    original = artifacts.render_bytes
+
+    async def contar(*args):
+        renders.append(args)
+        return await original(*args)
+
+    monkeypatch.setattr(artifacts, "render_bytes", contar)
+    data = {"titulo": "Frações"}
+    primeiro = await store.get_or_render("lesson-plan", "pdf", data)
+    segundo = await store.get_or_render("lesson-plan", "pdf", dict(data))
+
+    assert len(renders) == 1
+    assert not primeiro.hit and segundo.hit
+    assert primeiro.filename == segundo.filename
+    assert primeiro.etag == segundo.etag
+    assert primeiro.url == f"/api/artifacts/plans/{primeiro.filename}"
+
+
+@pytest.mark.asyncio
+async def test_download_com_etag_e_cache_imutavel(store):
+    """Testa os headers de cache do download e o 304 com If-None-Match."""
+    app = FastAPI()
+    app.include_router(artifacts_router, prefix="/api/artifacts")
+
+    artifact = await store.get_or_render("activity", "docx", {"title": "Teste"})
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        response = await ac.get(artifact.url)
+        revalidacao = await ac.get(artifact.url, headers={"If-None-Match": artifact.etag})
+        inexistente = await ac.get("/api/artifacts/activities/..%2Fsegredo.pdf")
+
+    assert response.status_code == 200
+    assert response.headers["etag"] == artifact.etag
+    assert "immutable" in response.headers["cache-control"]
+    assert revalidacao.status_code == 304
+    assert inexistente.status_code == 404
+
+
+def gravar(store, nome, tamanho, acesso):
+    """Grava um arquivo de plano com o último acesso (atime) em `acesso`."""
+    artifact = store.save("lesson-plan", f"plano_{nome:0>32}.pdf", b"x" * tamanho)
+    os.utime(artifact.path, (acesso, acesso))
+    return artifact
+
+
+def test_sweep_remove_expirados_e_menos_acessados(tmp_path):
+    """Testa a remoção por idade e, acima dos limites, pelo download mais antigo."""
+    store = ArtifactStore(
+        {"lesson-plan": ("plans", str(tmp_path / "planos"), "plano")},
+        max_bytes=250,
+        max_files=10,
+        ttl=3600,
+    )
+    agora = time.time()
+    expirado = gravar(store, "1", 100, agora - 7200)
+    antigo = gravar(store, "2", 100, agora - 600)
+    recente = gravar(store, "3", 100, agora - 300)
+    baixado = gravar(store, "4", 100, agora - 900)
+    store.touch(baixado, download=True)
+
+    assert store.sweep() == 2
+    assert not os.path.exists(expirado.path)
+    assert not os.path.exists(antigo.path)
+    assert os.path.exists(recente.path) and os.path.exists(baixado.path)
+
+    stats = store.stats()
+    assert stats["files"] == 2 and stats["bytes"] == 200
+    assert stats["evictions"] == 2 and stats["downloads"] == 1
+    assert stats["occupancy"]["bytes"] == 0.8
@@ -0,0 +1,74 @@
+import threading
+
+import pytest
+from llama_index.core import StorageContext, VectorStoreIndex
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.embeddings import MockEmbedding
+from llama_index.core.llms.mock import MockLLM
+from llama_index.core.schema import NodeWithScore, TextNode
+
+from app.engine import llm as llm_module
+from app.engine.retrieval import aretrieve_context, has_native_async
+from app.engine.vector_store import MmapVectorStore
+from app.settings import _SimpleLocalEmbedding
+
+
+class RetrieverSincrono(BaseRetriever):
+    def __init__(self):
+        super().__init__()
+        self.thread_name = None
+
+    def _retrieve(self, query_bundle):
+        self.thread_name = threading.current_thread().name
+        return [NodeWithScore(node=TextNode(text=f"contexto: {query_bundle.query_str}"), score=1.0)]
+
+
+@pytest.mark.asyncio
+async def test_acomplete_usa_pool_para_llm_sincrono():
+    """Testa se um LLM sem API async é executado fora do event loop."""
+    mock_llm = MockLLM()
+    assert llm_module.has_native_async(mock_llm) is False
+    response = await llm_module.acomplete("Plano de aula", llm=mock_llm)
+    assert response.text == "Plano de aula"
+
+
+@pytest.mark.asyncio
+async def test_aretrieve_context_usa_pool_para_retriever_sincrono():
+    """Testa se um retriever sem _aretrieve próprio roda no pool de threads."""
+    retriever = RetrieverSincrono()
+    context = await aretrieve_context(retriever, "frações")
+    assert context == "contexto: frações"
+    assert retriever.thread_name.startswith("blocking-call")
+
+
+def indice_denso(vector_store, embed_model):
+    contexto = StorageContext.from_defaults(vector_store=vector_store)
+    nos = [TextNode(id_=f"no-{i}", text=f"trecho {i}") for i in range(4)]
+    return VectorStoreIndex(nos, storage_context=contexto, embed_model=embed_model)
+
+
+@pytest.mark.asyncio
+async def test_busca_densa_no_mmap_roda_fora_do_event_loop(monkeypatch):
+    """Testa se a consulta ao MmapVectorStore roda no pool de threads, não no event loop."""
+    threads = []
+    query_original = MmapVectorStore.query
+
+    def query_registrando(self, query, **kwargs):
+        threads.append(threading.current_thread().name)
+        return query_original(self, query, **kwargs)
+
+    monkeypatch.setattr(MmapVectorStore, "query", query_registrando)
+    indice = indice_denso(MmapVectorStore(), MockEmbedding(embed_dim=8))
+    retriever = indice.as_retriever(similarity_top_k=2)
+
+    assert has_native_async(retriever) is True
+    assert len(await aretrieve_context(retriever, "trecho")) > 0
+    assert threads and threads[0].startswith("blocking-call")
+
+
+def test_retriever_com_fallback_sincrono_nao_conta_como_async():
+    """Testa se SimpleVectorStore ou embedding local mandam o retriever inteiro para o pool."""
+    simples = indice_denso(None, MockEmbedding(embed_dim=8)).as_retriever()
+    local = indice_denso(MmapVectorStore(), _SimpleLocalEmbedding(dim=8)).as_retriever()
+    assert has_native_async(simples) is False
+    assert has_native_async(local) is False
@@ -0,0 +1,117 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.api.routers import unit
+from app.engine import bncc
+
+TEXTO_BNCC = (
+    "Sistema de numeração decimal\n"
+    "(EF05MA01) Ler, escrever e ordenar números naturais até a ordem das centenas de milhar com \n"
+    "compreensão das principais características do sistema de numeração decimal. \n"
+    "Números racionais expressos na forma decimal\n"
+    "(EF05MA02) Ler, escrever e ordenar números racionais na forma decimal com \n"
+    "compreensão das principais características do sistema de numeração decimal.\n"
+    "Contextos e práticas (EF15AR01) Identificar e apreciar formas distintas das artes visuais. \n"
+    "(EF69LP01) Diferenciar liberdade de expressão de discursos de ódio.\n"
+)
+
+# Trecho real do PDF: o "(" do EF09GE01 se perde na extração do texto
+TEXTO_GEOGRAFIA = (
+    "A hegemonia europeia na economia, na política \ne na cultura\n"
+    "EF09GE01) Analisar criticamente de que forma a hegemonia europeia foi exercida. \n"
+    "Corporações e organismos internacionais (EF09GE02) Analisar a atuação das corporações.\n"
+)
+
+
+def test_extrai_habilidades_com_etapa_ano_e_componente():
+    """Testa se código, descrição, anos e componente são extraídos do texto da BNCC."""
+    habilidades = {h["code"]: h for h in bncc.extract_skills(TEXTO_BNCC)}
+    assert set(habilidades) == {"EF05MA01", "EF05MA02", "EF15AR01", "EF69LP01"}
+    assert habilidades["EF05MA01"]["description"].endswith("sistema de numeração decimal.")
+    assert "Números racionais" not in habilidades["EF05MA01"]["description"]
+    assert habilidades["EF05MA01"]["component"] == "Matemática"
+    assert habilidades["EF15AR01"]["years"] == [1, 2, 3, 4, 5]
+    assert habilidades["EF69LP01"]["years"] == [6, 7, 8, 9]
+
+
+def test_busca_por_serie_e_disciplina():
+    """Testa a busca direta por série/disciplina, aceitando variações de escrita."""
+    indice = bncc.SkillIndex({"bncc.pdf": bncc.extract_skills(TEXTO_BNCC)})
+    codigos = [h["code"] for h in indice.lookup("5º Ano", "matemática")]
+    assert codigos == ["EF05MA01", "EF05MA02"]
+    assert [h["code"] for h in indice.lookup("Terceiro ano", "Artes")] == ["EF15AR01"]
+    assert indice.lookup("1ª série do Ensino Médio", "Matemática") == []
+    assert indice.lookup("5º ano", "Computação") == []
+    assert indice.get("ef05ma02")["years"] == [5]
+
+
+def test_extrai_habilidade_sem_abre_parenteses():
+    """Testa se a habilidade com o "(" perdido no PDF também é extraída."""
+    codigos = [h["code"] for h in bncc.extract_skills(TEXTO_GEOGRAFIA)]
+    assert codigos == ["EF09GE01", "EF09GE02"]
+
+
+def test_detecta_lacunas_na_numeracao():
+    """Testa se a falta de uma habilidade no meio da numeração é detectada."""
+    habilidades = bncc.extract_skills(TEXTO_BNCC + TEXTO_GEOGRAFIA)
+    assert bncc.missing_skills(habilidades) == []
+    sem_primeira = [h for h in habilidades if h["code"] != "EF09GE01"]
+    assert bncc.missing_skills(sem_primeira) == ["EF09GE01"]
+
+
+def instalar_busca_falsa(monkeypatch, prompts, filtros):
+    async def acomplete_falso(prompt):
+        prompts.append(prompt)
+        return SimpleNamespace(text=json.dumps({"titulo": "Números"}))
+
+    async def aget_index_falso():
+        return object()
+
+    async def aget_retriever_falso(index, similarity_top_k, filters):
+        filtros.append([f.value for f in filters.filters])
+        return object()
+
+    async def aretrieve_context_falso(retriever, query):
+        return "Resolução CNE/CEB nº 1/2022: eixo Pensamento Computacional."
+
+    monkeypatch.setattr(unit, "acomplete", acomplete_falso)
+    monkeypatch.setattr(unit, "aget_index", aget_index_falso)
+    monkeypatch.setattr(unit, "aget_retriever", aget_retriever_falso)
+    monkeypatch.setattr(unit, "aretrieve_context", aretrieve_context_falso)
+
+
+@pytest.mark.asyncio
+async def test_plano_de_aula_usa_habilidades_e_normas(tmp_path, monkeypatch):
+    """Testa se o plano de aula usa a tabela de habilidades e busca só as normas de Computação."""
+    bncc.save_skill_files(str(tmp_path), {"bncc.pdf": bncc.extract_skills(TEXTO_BNCC)})
+    monkeypatch.setenv("STORAGE_DIR", str(tmp_path))
+    prompts, filtros = [], []
+    instalar_busca_falsa(monkeypatch, prompts, filtros)
+
+    request = unit.LessonPlanRequest(
+        disciplina="Matemática", serieAno="5º ano", unidade="Números racionais", descricao=""
+    )
+    assert await unit.generate_lesson_plan_content(request) == {"titulo": "Números"}
+    assert "EF05MA02 - Ler, escrever e ordenar números racionais" in prompts[0]
+    assert "EF69LP01" not in prompts[0]
+    assert "eixo Pensamento Computacional" in prompts[0]
+    assert filtros == [["apoio", "legal", "pedagogica"]]
+
+
+@pytest.mark.asyncio
+async def test_plano_de_aula_busca_bncc_com_tabela_incompleta(tmp_path, monkeypatch):
+    """Testa se, com habilidades faltando na tabela, a busca vetorial inclui a BNCC."""
+    habilidades = [h for h in bncc.extract_skills(TEXTO_BNCC) if h["code"] != "EF05MA01"]
+    bncc.save_skill_files(str(tmp_path), {"bncc.pdf": habilidades})
+    monkeypatch.setenv("STORAGE_DIR", str(tmp_path))
+    prompts, filtros = [], []
+    instalar_busca_falsa(monkeypatch, prompts, filtros)
+
+    request = unit.LessonPlanRequest(
+        disciplina="Matemática", serieAno="5º ano", unidade="Números racionais", descricao=""
+    )
+    await unit.generate_lesson_plan_content(request)
+    assert "EF05MA02" in prompts[0]
+    assert filtros == [["normativa", "apoio", "legal", "pedagogica"]]
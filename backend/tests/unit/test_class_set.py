@@ -0,0 +1,95 @@
+import random
+from datetime import datetime, timezone
+
+import pytest
+from fpdf import FPDF
+
+from app.api.services.activity_generator import ActivityGenerator, _write_text
+from app.api.services.class_set import build_class_set, correct_index, shuffle_activity
+
+ATIVIDADE = {
+    "title": "Frações no dia a dia",
+    "objective": "Reconhecer frações em situações do cotidiano.",
+    "content": "Uma pizza foi dividida em 8 pedaços iguais.",
+    "questions": [
+        {
+            "enunciado": f"Questão {n}",
+            "alternativas": [f"A) {n}-a", f"B) {n}-b", f"C) {n}-c", f"D) {n}-d"],
+            "correta": "B",
+        }
+        for n in range(1, 6)
+    ],
+}
+
+
+def test_embaralha_questoes_e_mantem_resposta_correta():
+    """Testa se a alternativa marcada no gabarito continua sendo a mesma resposta."""
+    variante, gabarito = shuffle_activity(ATIVIDADE, random.Random(3))
+
+    assert sorted(q["enunciado"] for q in variante["questions"]) == [f"Questão {n}" for n in range(1, 6)]
+    for questao, resposta in zip(variante["questions"], gabarito):
+        n = questao["enunciado"].split()[-1]
+        assert [alt[:3] for alt in questao["alternativas"]] == ["A) ", "B) ", "C) ", "D) "]
+        correta = next(alt for alt in questao["alternativas"] if alt.startswith(f"{resposta})"))
+        assert correta == f"{resposta}) {n}-b"
+    assert ATIVIDADE["questions"][0]["alternativas"][0] == "A) 1-a"
+
+
+@pytest.mark.parametrize(
+    "correta, posicao",
+    [
+        ("A", 0),
+        ("c)", 2),
+        ("C) 1-c", 2),
+        ("(b)", 1),
+        ("Alternativa C", 2),
+        ("Letra B", 1),
+        ("letra d", 3),
+        ("A resposta é C", 2),
+        ("E", None),
+        ("", None),
+    ],
+)
+def test_posicao_da_alternativa_correta(correta, posicao):
+    """Testa as formas do campo `correta` devolvidas pelo LLM."""
+    alternativas = ["A) a", "B) b", "C) c", "D) d"]
+    assert correct_index({"correta": correta}, alternativas) == posicao
+
+
+def test_versoes_deterministicas_pela_semente():
+    """Testa se a mesma semente gera as mesmas versões (necessário para o cache por conteúdo)."""
+    assert build_class_set(ATIVIDADE, 5, seed=7) == build_class_set(ATIVIDADE, 5, seed=7)
+    versoes, gabaritos = build_class_set(ATIVIDADE, 5, seed=7)
+    assert len(versoes) == len(gabaritos) == 5
+    assert len({tuple(g) for g in gabaritos}) > 1
+
+
+def test_class_set_em_um_unico_documento():
+    """Testa se todas as versões e o gabarito saem em um único PDF e DOCX."""
+    versoes, gabaritos = build_class_set(ATIVIDADE, 40)
+
+    pdf = ActivityGenerator.render_class_set_pdf(versoes, gabaritos)
+    docx = ActivityGenerator.render_class_set_docx(versoes, gabaritos)
+
+    assert pdf.startswith(b"%PDF") and pdf.count(b"/Type /Page\n") >= 41
+    assert docx.startswith(b"PK")
+
+
+def test_layout_reaproveitado_mantem_texto_justificado():
+    """Testa se o texto com quebra de linha reaproveitada sai igual ao do multi_cell, justificado."""
+    texto = "Uma pizza foi dividida em oito pedaços iguais entre os amigos da turma. " * 6
+
+    def desenha(layout):
+        pdf = FPDF()
+        pdf.set_compression(False)
+        pdf.set_creation_date(datetime(2024, 1, 1, tzinfo=timezone.utc))
+        pdf.add_page()
+        pdf.set_font("Helvetica", size=12)
+        for _ in range(2):
+            _write_text(pdf, layout, 0, 10, texto)
+            pdf.ln(5)
+        return bytes(pdf.output())
+
+    sem_layout = desenha(None)
+    assert b" Tw" in sem_layout
+    assert desenha({}) == sem_layout
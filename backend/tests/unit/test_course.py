@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from app.api.routers import course
+from app.api.services import pipeline
+from app.api.services.pipeline import SUCCEEDED, PipelineStore
+
+SUGESTOES = {
+    "sugestoes": [{"nome": f"Unidade {i}", "descricao": f"Descrição {i}"} for i in range(2)]
+}
+
+
+@pytest.fixture
+def etapas(tmp_path, monkeypatch):
+    """Troca as gerações por funções falsas que registram a ordem das chamadas."""
+    monkeypatch.setattr(
+        pipeline, "_pipeline_store", PipelineStore(str(tmp_path / "pipeline.sqlite3"))
+    )
+    monkeypatch.setattr(pipeline, "_pipeline_limit", asyncio.Semaphore(8))
+    chamadas = []
+
+    def falsa(nome, atraso, resultado=None):
+        async def run(payload):
+            chamadas.append(("inicio", nome))
+            await asyncio.sleep(atraso)
+            chamadas.append(("fim", nome))
+            return resultado or {"etapa": nome}
+        return run
+
+    monkeypatch.setattr(course, "suggest_job", falsa("suggest", 0, SUGESTOES))
+    monkeypatch.setattr(course, "lesson_plan_job", falsa("lesson-plan", 0.05))
+    monkeypatch.setattr(course, "activity_job", falsa("activity", 0))
+    monkeypatch.setattr(course, "slides_job", falsa("slides", 0))
+    return chamadas
+
+
+@pytest.mark.asyncio
+async def test_atividade_e_slides_nao_esperam_o_plano(etapas):
+    """Testa se atividade e slides rodam junto com o plano e se o lock é descartado no fim."""
+    payload = {"disciplina": "Matemática", "serieAno": "5º ano"}
+    resultado = await course.course_job(payload)
+
+    assert len(resultado["results"]) == 7
+    assert etapas.index(("fim", "activity")) < etapas.index(("fim", "lesson-plan"))
+    assert etapas.index(("fim", "slides")) < etapas.index(("fim", "lesson-plan"))
+    assert course._pipeline_locks == {}
+
+
+@pytest.mark.asyncio
+async def test_restart_espera_a_execucao_em_andamento(etapas):
+    """Testa se o restart só apaga o progresso depois que a execução em andamento termina."""
+    payload = {"disciplina": "Matemática", "serieAno": "5º ano"}
+    pipeline_id = course.pipeline_id_for(course.CourseRequest(**payload))
+
+    primeira = asyncio.ensure_future(course.course_job(payload))
+    await asyncio.sleep(0.01)
+    segunda = asyncio.ensure_future(course.course_job({**payload, "restart": True}))
+    await asyncio.gather(primeira, segunda)
+
+    # Cada execução gerou tudo: a segunda não encontrou o progresso da primeira
+    assert etapas.count(("fim", "lesson-plan")) == 4
+    nodes = pipeline.get_pipeline_store().nodes(pipeline_id)
+    assert all(node["status"] == SUCCEEDED for node in nodes.values())
+    assert course._pipeline_locks == {}
@@ -0,0 +1,65 @@
+from fpdf import FPDF
+
+from app.engine.loaders import file as file_loader
+from app.engine.loaders.file import FileLoaderConfig, get_file_documents
+
+
+def criar_pdf(caminho, paginas):
+    pdf = FPDF()
+    pdf.set_font("Helvetica", size=12)
+    for i in range(paginas):
+        pdf.add_page()
+        pdf.cell(0, 10, f"Pagina {i} da BNCC")
+    pdf.output(str(caminho))
+
+
+def test_leitura_paralela_igual_a_serial(tmp_path, monkeypatch):
+    """Testa se a leitura em processos mantém ids, metadados, textos e ordem da leitura serial."""
+    criar_pdf(tmp_path / "BNCC_Base.pdf", paginas=5)
+    criar_pdf(tmp_path / "Lei_14533.pdf", paginas=1)
+    (tmp_path / "cieb.txt").write_text("Currículo de referência")
+    monkeypatch.setattr(file_loader, "DATA_DIR", str(tmp_path))
+
+    serial = get_file_documents(FileLoaderConfig(num_workers=0, use_parse_cache=False))
+    paralelo = get_file_documents(FileLoaderConfig(num_workers=2, pages_per_task=2, use_parse_cache=False))
+
+    assert [d.id_ for d in paralelo] == [d.id_ for d in serial]
+    assert [d.text for d in paralelo] == [d.text for d in serial]
+    assert [d.metadata for d in paralelo] == [d.metadata for d in serial]
+    assert paralelo[0].metadata["category"] == "normativa"
+    assert paralelo[0].excluded_embed_metadata_keys == serial[0].excluded_embed_metadata_keys
+
+
+def test_lista_de_arquivos_corresponde_aos_ids(tmp_path, monkeypatch):
+    """Testa se os caminhos listados coincidem com os ids gerados pelo leitor (usados no manifest)."""
+    (tmp_path / "data").mkdir()
+    (tmp_path / "data" / "cieb.txt").write_text("Currículo de referência")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(file_loader, "DATA_DIR", "data")
+
+    documentos = get_file_documents(FileLoaderConfig(num_workers=0, use_parse_cache=False))
+    assert [d.id_ for d in documentos] == file_loader.list_data_files()
+
+
+def test_cache_de_parsing_evita_nova_extracao(tmp_path, monkeypatch):
+    """Testa se arquivos inalterados são lidos do cache e se as regras de metadados são reaplicadas."""
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    criar_pdf(data_dir / "BNCC_Base.pdf", paginas=3)
+    monkeypatch.setattr(file_loader, "DATA_DIR", str(data_dir))
+    monkeypatch.setenv("PARSE_CACHE_DIR", str(tmp_path / "parsed"))
+    config = FileLoaderConfig(num_workers=0)
+
+    primeira = get_file_documents(config)
+
+    def falhar(*args, **kwargs):
+        raise AssertionError("não deveria extrair o texto novamente")
+
+    monkeypatch.setattr(file_loader, "parse_file_documents", falhar)
+    monkeypatch.setattr(file_loader, "get_file_metadata", lambda path: {"category": "nova_regra"})
+    segunda = get_file_documents(config)
+
+    assert [d.id_ for d in segunda] == [d.id_ for d in primeira]
+    assert [d.text for d in segunda] == [d.text for d in primeira]
+    assert segunda[0].metadata["category"] == "nova_regra"
+    assert segunda[0].metadata["page_label"] == primeira[0].metadata["page_label"]
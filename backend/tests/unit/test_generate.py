@@ -0,0 +1,97 @@
+import pytest
+from llama_index.core.embeddings import MockEmbedding
+from llama_index.core.settings import Settings
+
+from app.engine import generate
+from app.engine.loaders import file as file_loader
+
+
+class EmbeddingContador(MockEmbedding):
+    textos: list = []
+
+    def _get_text_embeddings(self, texts):
+        EmbeddingContador.textos.extend(texts)
+        return super()._get_text_embeddings(texts)
+
+
+@pytest.fixture
+def ambiente(tmp_path, monkeypatch):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "bncc.txt").write_text("Habilidade EF05MA01 sobre frações.")
+    (data_dir / "lei.txt").write_text("Política Nacional de Educação Digital.")
+    storage_dir = tmp_path / "storage"
+
+    monkeypatch.setattr(file_loader, "DATA_DIR", str(data_dir))
+    monkeypatch.setenv("STORAGE_DIR", str(storage_dir))
+    monkeypatch.setenv("PARSE_CACHE_DIR", str(tmp_path / "parsed"))
+    monkeypatch.setattr(generate, "init_settings", lambda: setattr(Settings, "embed_model", EmbeddingContador(embed_dim=8)))
+    EmbeddingContador.textos = []
+    original = Settings._embed_model
+    yield data_dir, storage_dir
+    Settings._embed_model = original
+
+
+def test_reindexacao_incremental_processa_apenas_mudancas(ambiente):
+    """Testa se apenas arquivos novos ou alterados são embutidos novamente e removidos saem do índice."""
+    data_dir, storage_dir = ambiente
+    generate.generate_datasource()
+    assert len(EmbeddingContador.textos) == 2
+
+    EmbeddingContador.textos = []
+    (data_dir / "bncc.txt").write_text("Habilidade EF05MA02 sobre decimais.")
+    (data_dir / "parecer.txt").write_text("Fundamentação pedagógica da Computação.")
+    (data_dir / "lei.txt").unlink()
+    generate.generate_datasource()
+
+    assert len(EmbeddingContador.textos) == 2
+    assert not any("Política Nacional" in texto for texto in EmbeddingContador.textos)
+    manifest = generate.load_manifest(str(storage_dir))
+    assert sorted(manifest["files"]) == sorted([str(data_dir / "bncc.txt"), str(data_dir / "parecer.txt")])
+
+    index = generate.load_index_from_storage(generate.get_storage_context(str(storage_dir)))
+    textos = sorted(node.get_content() for node in index.docstore.docs.values())
+    assert textos == ["Fundamentação pedagógica da Computação.", "Habilidade EF05MA02 sobre decimais."]
+    assert index.vector_store.node_count == 2
+
+
+def test_sem_mudancas_nao_reindexa(ambiente):
+    """Testa se uma nova execução sem alterações em data/ não embute nada."""
+    generate.generate_datasource()
+    EmbeddingContador.textos = []
+    generate.generate_datasource()
+    assert EmbeddingContador.textos == []
+
+
+def test_troca_de_backend_reconstroi_o_indice(ambiente, monkeypatch):
+    """Testa se mudar o vector store reconstrói tudo e apaga os arquivos do store anterior."""
+    from llama_index.core.vector_stores import SimpleVectorStore
+
+    _, storage_dir = ambiente
+    generate.generate_datasource()
+    assert (storage_dir / "default__mmap_vectors.npy").exists()
+
+    EmbeddingContador.textos = []
+    monkeypatch.setenv("VECTOR_STORE_BACKEND", "simple")
+    generate.generate_datasource()
+
+    assert len(EmbeddingContador.textos) == 2
+    assert not (storage_dir / "default__mmap_vectors.npy").exists()
+    assert not (storage_dir / "default__mmap_vectors.json").exists()
+    index = generate.load_index_from_storage(generate.get_storage_context(str(storage_dir)))
+    assert isinstance(index.vector_store, SimpleVectorStore)
+
+
+@pytest.mark.parametrize("modo", ["lexical", "hybrid"])
+def test_generate_grava_bm25_usado_pelo_retriever(ambiente, monkeypatch, modo):
+    """Testa se o generate grava o BM25 e se os modos lexical/hybrid o usam na busca."""
+    from app.engine.retrieval import get_retriever
+
+    _, storage_dir = ambiente
+    generate.generate_datasource()
+    assert (storage_dir / "bm25_index.json.gz").exists()
+
+    monkeypatch.setenv("RETRIEVER_MODE", modo)
+    index = generate.load_index_from_storage(generate.get_storage_context(str(storage_dir)))
+    resultados = get_retriever(index, similarity_top_k=1).retrieve("politicas de educacao digital")
+    assert resultados[0].node.get_content() == "Política Nacional de Educação Digital."
@@ -0,0 +1,71 @@
+import pytest
+
+from app.api.services import generation_cache
+from app.api.services.generation_cache import CachePolicy, GenerationCache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = GenerationCache(path=str(tmp_path / "generation.sqlite3"))
+    monkeypatch.setattr(generation_cache, "_generation_cache", cache)
+    return cache
+
+
+def test_chave_normaliza_campos_da_requisicao():
+    """Testa se variações de caixa e espaços geram a mesma chave de cache."""
+    a = GenerationCache.make_key("units.suggest", {"disciplina": "Matemática", "serieAno": "5º ano"}, "1")
+    b = GenerationCache.make_key("units.suggest", {"disciplina": " matemática ", "serieAno": "5º  Ano"}, "1")
+    c = GenerationCache.make_key("units.suggest", {"disciplina": "Matemática", "serieAno": "5º ano"}, "2")
+    assert a == b
+    assert a != c
+
+
+def test_cache_em_disco_sobrevive_a_reinicio(tmp_path):
+    """Testa se o resultado gravado é lido por uma nova instância (após reinício)."""
+    path = str(tmp_path / "generation.sqlite3")
+    GenerationCache(path=path).set("chave", {"sugestoes": []})
+    assert GenerationCache(path=path).get("chave") == {"sugestoes": []}
+
+
+def test_linhas_expiradas_sao_apagadas_do_disco(tmp_path):
+    """Testa se as gerações expiradas são apagadas do SQLite a cada N gravações."""
+    cache = GenerationCache(path=str(tmp_path / "generation.sqlite3"), ttl=-1, purge_every=3)
+
+    def contar():
+        return cache._db().execute("SELECT COUNT(*) FROM generations").fetchone()[0]
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert contar() == 2
+
+    cache.ttl = 3600
+    cache.set("c", 3)
+    assert contar() == 1
+    assert cache.get("c") == 3
+
+
+def test_politica_cache_control():
+    """Testa a interpretação do header Cache-Control."""
+    assert CachePolicy.from_header(None) == CachePolicy(read=True, write=True)
+    assert CachePolicy.from_header("no-cache") == CachePolicy(read=False, write=True)
+    assert CachePolicy.from_header("no-store") == CachePolicy(read=False, write=False)
+
+
+@pytest.mark.asyncio
+async def test_cached_generation_evita_nova_geracao(cache):
+    """Testa se a segunda chamada idêntica é servida pelo cache."""
+    chamadas = []
+
+    async def gerar():
+        chamadas.append(1)
+        return {"titulo": "Frações"}
+
+    campos = {"disciplina": "Matemática", "serieAno": "5º ano"}
+    primeiro, hit1 = await generation_cache.cached_generation("units.lesson_plan", campos, "1", gerar)
+    segundo, hit2 = await generation_cache.cached_generation("units.lesson_plan", campos, "1", gerar)
+    terceiro, hit3 = await generation_cache.cached_generation(
+        "units.lesson_plan", campos, "1", gerar, CachePolicy.from_header("no-cache")
+    )
+    assert (hit1, hit2, hit3) == (False, True, False)
+    assert primeiro == segundo == terceiro
+    assert len(chamadas) == 2
@@ -23,3 +23,11 @@ def test_generate_pdf_empty_data():
     
     assert os.path.exists(filepath)
     os.remove(filepath)
+
+def test_render_pdf_em_memoria():
+    """Testa se o PDF é gerado em memória sem criar arquivos em disco."""
+    antes = set(os.listdir(OUTPUT_DIR))
+    content = LessonPlanGenerator.render_pdf(MOCK_LESSON_PLAN)
+
+    assert content.startswith(b"%PDF")
+    assert set(os.listdir(OUTPUT_DIR)) == antes
@@ -0,0 +1,39 @@
+import json
+
+from app.api.services.incremental_json import IncrementalJSONParser
+
+ATIVIDADE = {
+    "title": "Frações {parte 1}",
+    "bncc_skills": ["EF05MA03 - \"Identificar\" frações", "EF05MA04"],
+    "content": "",
+    "questions": [
+        {"enunciado": "Quanto é 1/2 + 1/4? [responda]", "alternativas": ["A) 3/4", "B) 1"], "correta": "A"},
+        {"enunciado": "Qual fração é maior?", "alternativas": ["A) 1/3", "B) 1/2"], "correta": "B"},
+    ],
+    "pontos": [1, 2.5, None],
+}
+
+
+def test_emite_itens_das_listas_na_ordem():
+    """Testa se cada item de lista de primeiro nível é emitido uma vez, com campo e posição."""
+    texto = "```json\n" + json.dumps(ATIVIDADE, ensure_ascii=False, indent=2) + "\n```"
+    parser = IncrementalJSONParser()
+    itens = [item for caractere in texto for item in parser.feed(caractere)]
+
+    esperado = [
+        (campo, i, valor)
+        for campo in ("bncc_skills", "questions", "pontos")
+        for i, valor in enumerate(ATIVIDADE[campo])
+    ]
+    assert [tuple(item) for item in itens] == esperado
+
+
+def test_questao_emitida_antes_do_fim_do_documento():
+    """Testa se a questão 1 sai assim que sua chave de fechamento chega, antes da questão 2."""
+    texto = json.dumps(ATIVIDADE, ensure_ascii=False)
+    fim_questao_1 = texto.index('"correta": "A"}') + len('"correta": "A"}')
+    parser = IncrementalJSONParser()
+
+    parser.feed(texto[:fim_questao_1 - 1])
+    itens = parser.feed(texto[fim_questao_1 - 1:fim_questao_1])
+    assert itens == [("questions", 0, ATIVIDADE["questions"][0])]
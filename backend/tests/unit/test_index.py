@@ -0,0 +1,61 @@
+import pytest
+from llama_index.core import Document, VectorStoreIndex
+from llama_index.core.embeddings import MockEmbedding
+from llama_index.core.settings import Settings
+
+from app.engine import index as index_module
+
+
+@pytest.fixture(autouse=True)
+def embed_model_original():
+    """Restaura o embed_model global do llama-index, trocado por criar_storage."""
+    original = Settings._embed_model
+    yield
+    Settings._embed_model = original
+
+
+def criar_storage(storage_dir, textos):
+    Settings.embed_model = MockEmbedding(embed_dim=8)
+    documentos = [Document(text=texto) for texto in textos]
+    VectorStoreIndex.from_documents(documentos).storage_context.persist(str(storage_dir))
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    storage_dir = tmp_path / "storage"
+    criar_storage(storage_dir, ["Habilidade EF05MA01"])
+    monkeypatch.setenv("STORAGE_DIR", str(storage_dir))
+    monkeypatch.setenv("INDEX_RELOAD_CHECK_INTERVAL", "0")
+    monkeypatch.setattr(index_module, "_resident", index_module._ResidentIndex())
+    return storage_dir
+
+
+def test_get_index_reutiliza_indice_residente(storage):
+    """Testa se chamadas seguidas devolvem o mesmo índice sem recarregar o storage."""
+    primeiro = index_module.get_index()
+    segundo = index_module.get_index()
+    assert primeiro is not None
+    assert primeiro is segundo
+
+
+def test_get_index_recarrega_quando_storage_muda(storage):
+    """Testa se o índice é trocado quando o conteúdo de STORAGE_DIR muda."""
+    primeiro = index_module.get_index()
+    criar_storage(storage, ["Habilidade EF05MA01", "Habilidade EF05MA02"])
+    segundo = index_module.get_index()
+    assert segundo is not primeiro
+    assert len(segundo.docstore.docs) == 2
+
+
+def test_reload_index_forcado(storage):
+    """Testa se o reload forçado sempre cria uma nova instância do índice."""
+    primeiro = index_module.get_index()
+    segundo = index_module.reload_index()
+    assert segundo is not primeiro
+    assert index_module.get_index_status()["loaded"] is True
+
+
+def test_get_index_sem_storage(tmp_path, monkeypatch):
+    """Testa se get_index devolve None quando não existe storage."""
+    monkeypatch.setenv("STORAGE_DIR", str(tmp_path / "inexistente"))
+    assert index_module.get_index() is None
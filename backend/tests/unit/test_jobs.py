@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from app.api.services.jobs import FAILED, SUCCEEDED, JobQueue, JobStore
+
+
+@pytest.mark.asyncio
+async def test_workers_limitam_concorrencia_e_guardam_resultado(tmp_path):
+    """Testa se no máximo `workers` jobs rodam juntos e se o resultado fica no store."""
+    fila = JobQueue(JobStore(str(tmp_path / "jobs.sqlite3")), workers=2)
+    rodando, pico = 0, 0
+
+    async def gerar(payload):
+        nonlocal rodando, pico
+        rodando += 1
+        pico = max(pico, rodando)
+        await asyncio.sleep(0.05)
+        rodando -= 1
+        if payload["n"] == 3:
+            raise ValueError("falha na geração")
+        return {"dobro": payload["n"] * 2}
+
+    fila.register("teste", gerar)
+    jobs = [await fila.submit("teste", {"n": n}) for n in range(5)]
+    finais = [await fila.wait(job["id"], timeout=5) for job in jobs]
+    await fila.stop()
+
+    assert pico == 2
+    assert [job["status"] for job in finais] == [SUCCEEDED] * 3 + [FAILED, SUCCEEDED]
+    assert finais[1]["result"] == {"dobro": 2}
+    assert finais[3]["error"] == "falha na geração"
+
+
+@pytest.mark.asyncio
+async def test_jobs_pendentes_retomados_apos_reinicio(tmp_path):
+    """Testa se jobs que não terminaram antes do reinício voltam para a fila."""
+    path = str(tmp_path / "jobs.sqlite3")
+    job = JobStore(path).create("teste", {"n": 1})
+
+    async def gerar(payload):
+        return {"ok": payload["n"]}
+
+    fila = JobQueue(JobStore(path), workers=1)
+    fila.register("teste", gerar)
+    await fila.start()
+    final = await fila.wait(job["id"], timeout=5)
+    await fila.stop()
+    assert final["status"] == SUCCEEDED
+    assert final["result"] == {"ok": 1}
+
+
+@pytest.mark.asyncio
+async def test_jobs_terminados_antigos_sao_apagados(tmp_path):
+    """Testa se jobs terminados há mais que a retenção saem do SQLite e os pendentes ficam."""
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    antigo, recente, pendente = (store.create("teste", {"n": n}) for n in range(3))
+    store.update(antigo["id"], SUCCEEDED, {"ok": 0})
+    store.update(recente["id"], FAILED, None, "erro")
+    with store.lock:
+        store._db().execute("UPDATE jobs SET updated_at = 0 WHERE id IN (?, ?)", (antigo["id"], pendente["id"]))
+        store._db().commit()
+
+    async def gerar(payload):
+        return {"ok": payload["n"]}
+
+    fila = JobQueue(store, workers=1, retention=60, prune_every=1)
+    fila.register("teste", gerar)
+    await fila.start()
+    final = await fila.wait(pendente["id"], timeout=5)
+    await fila.stop()
+
+    assert store.get(antigo["id"]) is None
+    assert store.get(recente["id"])["status"] == FAILED
+    assert final["status"] == SUCCEEDED
+    assert store.get(pendente["id"]) is not None
@@ -0,0 +1,63 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.api.routers import unit
+from app.api.services import generation_cache
+from app.api.services.generation_cache import GenerationCache
+from tests.mocks.sse import ler_eventos
+
+UNIDADES = [
+    {"nome": f"Unidade {i}", "descricao": f"Descrição {i}"} for i in range(4)
+]
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        generation_cache, "_generation_cache", GenerationCache(path=str(tmp_path / "g.sqlite3"))
+    )
+    app = FastAPI()
+    app.include_router(unit.unit_router, prefix="/api/units")
+    return app
+
+
+@pytest.mark.asyncio
+async def test_planos_gerados_em_paralelo_com_recuperacao_compartilhada(app, monkeypatch):
+    """Testa se os 4 planos saem em paralelo, com uma única recuperação, na ordem em que terminam."""
+    recuperacoes = []
+
+    async def recuperar(disciplina, serie_ano, unidade=None):
+        recuperacoes.append(unidade)
+        return [], "contexto"
+
+    async def acomplete_falso(prompt):
+        # A Unidade 0 é a mais lenta
+        atraso = 0.3 if '"Unidade 0"' in prompt else 0.1
+        await asyncio.sleep(atraso)
+        titulo = prompt.split('Unidade: "')[1].split('"')[0]
+        return SimpleNamespace(text=json.dumps({"titulo": titulo}))
+
+    monkeypatch.setattr(unit, "retrieve_lesson_plan_context", recuperar)
+    monkeypatch.setattr(unit, "acomplete", acomplete_falso)
+
+    corpo = {"disciplina": "Computação", "serieAno": "5º ano", "unidades": UNIDADES}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://teste") as client:
+        inicio = time.monotonic()
+        resposta = await client.post("/api/units/lesson-plans/batch", json=corpo)
+        duracao = time.monotonic() - inicio
+
+    eventos = ler_eventos(resposta.text)
+    planos = [dados for evento, dados in eventos if evento == "plan"]
+    assert eventos[0] == ("units", UNIDADES)
+    assert eventos[-1] == ("done", {"total": 4, "failed": 0})
+    assert sorted(p["index"] for p in planos) == [0, 1, 2, 3]
+    assert planos[-1] == {"index": 0, "unidade": "Unidade 0", "conteudo": {"titulo": "Unidade 0"}}
+    assert recuperacoes == [None]
+    assert duracao < 0.6
@@ -0,0 +1,48 @@
+from llama_index.core.schema import TextNode
+from llama_index.core.storage.docstore import SimpleDocumentStore
+from llama_index.core.vector_stores import MetadataFilter, MetadataFilters
+
+from app.engine.lexical import BM25Index, BM25Retriever, tokenize
+
+TRECHOS = [
+    ("bncc", "normativa", "Habilidades de computação e pensamento computacional no 5º ano."),
+    ("cieb", "apoio", "Atividades desplugadas de computação para crianças."),
+    ("lei", "legal", "Política Nacional de Educação Digital e inclusão digital."),
+]
+
+
+def criar_retriever(tmp_path, filters=None):
+    nos = [
+        TextNode(id_=id_, text=texto, metadata={"category": categoria})
+        for id_, categoria, texto in TRECHOS
+    ]
+    docstore = SimpleDocumentStore()
+    docstore.add_documents(nos)
+    caminho = str(tmp_path / "bm25_index.json.gz")
+    BM25Index.build(nos).save(caminho)
+    return BM25Retriever(BM25Index.load(caminho), docstore, similarity_top_k=2, filters=filters)
+
+
+def test_tokenizacao_remove_acentos_stopwords_e_reduz_ao_radical():
+    """Testa se variações de acento e flexão geram o mesmo termo."""
+    assert tokenize("Computação") == tokenize("computacao")
+    assert tokenize("habilidades") == tokenize("habilidade")
+    assert tokenize("a computação da escola") == tokenize("computação escola")
+
+
+def test_bm25_ordena_por_relevancia(tmp_path):
+    """Testa se a busca lexical encontra o trecho certo mesmo sem acentos na consulta."""
+    retriever = criar_retriever(tmp_path)
+    ids = [r.node.node_id for r in retriever.retrieve("politica de educacao digital")]
+    assert ids == ["lei"]
+    ids = [r.node.node_id for r in retriever.retrieve("computação")]
+    assert sorted(ids) == ["bncc", "cieb"]
+
+
+def test_bm25_respeita_filtro_de_categoria(tmp_path):
+    """Testa se os filtros de categoria usados pelos routers são aplicados na busca lexical."""
+    filtros = MetadataFilters(
+        filters=[MetadataFilter(key="category", value="apoio")], condition="or"
+    )
+    retriever = criar_retriever(tmp_path, filters=filtros)
+    assert [r.node.node_id for r in retriever.retrieve("computação")] == ["cieb"]
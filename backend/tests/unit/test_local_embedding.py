@@ -0,0 +1,22 @@
+import numpy as np
+
+from app.settings import _SimpleLocalEmbedding
+
+
+def test_embedding_deterministico_por_texto():
+    """Testa se o mesmo texto gera o mesmo vetor, independentemente do lote."""
+    embedding = _SimpleLocalEmbedding(dim=16)
+    sozinho = embedding.get_text_embedding("Habilidade EF05MA01")
+    lote = embedding.get_text_embedding_batch(["outro texto", "Habilidade EF05MA01"])
+    assert lote[1] == sozinho
+    assert lote[0] != sozinho
+
+
+def test_matriz_float32_no_intervalo():
+    """Testa se a matriz do lote é float32, com a dimensão configurada e valores em [-1, 1]."""
+    embedding = _SimpleLocalEmbedding(dim=768)
+    matriz = embedding.embed_matrix(["a", "b", "", "c"])
+    assert matriz.dtype == np.float32
+    assert matriz.shape == (4, 768)
+    assert matriz.min() >= -1.0 and matriz.max() <= 1.0 + 1e-6
+    assert abs(float(matriz.mean())) < 0.05
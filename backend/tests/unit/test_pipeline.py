@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from app.api.services.pipeline import (
+    FAILED,
+    SUCCEEDED,
+    PipelineNode,
+    PipelineStore,
+    run_dag,
+    stage_progress,
+)
+
+
+def montar_dag(chamadas, falhar=()):
+    """Sugestão -> plano por unidade -> atividade e slides por unidade."""
+    rodando = {"agora": 0, "pico": 0}
+
+    def etapa(node_id):
+        async def run(deps):
+            chamadas.append(node_id)
+            rodando["agora"] += 1
+            rodando["pico"] = max(rodando["pico"], rodando["agora"])
+            await asyncio.sleep(0.02)
+            rodando["agora"] -= 1
+            if node_id in falhar:
+                raise ValueError(f"falha em {node_id}")
+            return {"id": node_id, "deps": sorted(deps)}
+        return run
+
+    nodes = [PipelineNode("suggest", "suggest", etapa("suggest"))]
+    for i in range(3):
+        nodes.append(PipelineNode(f"plan:{i}", "plan", etapa(f"plan:{i}"), ["suggest"]))
+        nodes.append(PipelineNode(f"activity:{i}", "activity", etapa(f"activity:{i}"), [f"plan:{i}"]))
+        nodes.append(PipelineNode(f"slides:{i}", "slides", etapa(f"slides:{i}"), [f"plan:{i}"]))
+    return nodes, rodando
+
+
+@pytest.mark.asyncio
+async def test_dag_respeita_dependencias_e_limite_global(tmp_path):
+    """Testa se etapas independentes rodam em paralelo sem passar do limite."""
+    store = PipelineStore(str(tmp_path / "pipeline.sqlite3"))
+    chamadas = []
+    nodes, rodando = montar_dag(chamadas)
+
+    resultados = await run_dag("p1", nodes, store, asyncio.Semaphore(2))
+
+    assert len(resultados) == 10
+    assert chamadas[0] == "suggest"
+    assert chamadas.index("plan:0") < chamadas.index("activity:0")
+    assert resultados["slides:1"]["deps"] == ["plan:1"]
+    assert rodando["pico"] == 2
+    progresso = stage_progress(store.nodes("p1"), ["suggest", "plan", "activity", "slides"])
+    assert progresso["activity"][SUCCEEDED] == 3
+
+
+@pytest.mark.asyncio
+async def test_retoma_pipeline_sem_refazer_etapas_concluidas(tmp_path):
+    """Testa se a falha de uma etapa marca as dependentes e se a retomada refaz só o que faltou."""
+    store = PipelineStore(str(tmp_path / "pipeline.sqlite3"))
+    chamadas = []
+    nodes, _ = montar_dag(chamadas, falhar={"plan:1"})
+
+    resultados = await run_dag("p1", nodes, store, asyncio.Semaphore(4))
+
+    salvos = store.nodes("p1")
+    assert "plan:1" not in resultados and "activity:1" not in resultados
+    assert salvos["plan:1"]["error"] == "falha em plan:1"
+    assert salvos["activity:1"]["status"] == FAILED
+    assert salvos["activity:1"]["error"] == "Dependency plan:1 failed"
+    assert "activity:1" not in chamadas
+    assert salvos["slides:2"]["status"] == SUCCEEDED
+
+    chamadas.clear()
+    nodes, _ = montar_dag(chamadas)
+    resultados = await run_dag("p1", nodes, store, asyncio.Semaphore(4))
+
+    assert sorted(chamadas) == ["activity:1", "plan:1", "slides:1"]
+    assert len(resultados) == 10
+    assert resultados["activity:0"] == {"id": "activity:0", "deps": ["plan:0"]}
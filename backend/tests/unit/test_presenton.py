@@ -0,0 +1,130 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+from app.api.services.presenton import (
+    GENERATE_PATH,
+    CircuitBreaker,
+    CircuitOpenError,
+    PresentonClient,
+    PresentonError,
+)
+
+
+def presenton_local(respostas):
+    """Servidor local no lugar do Presenton: devolve os status de `respostas` em ordem."""
+    app = FastAPI()
+    app.state.chamadas = []
+
+    @app.post(GENERATE_PATH)
+    async def generate(payload: dict):
+        app.state.chamadas.append(payload)
+        status = respostas.pop(0) if respostas else 200
+        if status != 200:
+            return JSONResponse({"detail": "erro"}, status_code=status)
+        return {"path": "/static/deck.pptx", "presentation_id": "abc"}
+
+    return app
+
+
+def cliente(app, **kwargs):
+    return PresentonClient(
+        "http://presenton.local/",
+        "chave",
+        backoff_base=0,
+        transport=httpx.ASGITransport(app=app),
+        **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+async def test_retry_em_5xx_e_cliente_compartilhado():
+    """Testa se erros 5xx são repetidos e se o mesmo cliente HTTP é reaproveitado."""
+    app = presenton_local([502, 503])
+    presenton = cliente(app, retries=2)
+
+    resultado = await presenton.generate({"export_as": "pptx"})
+    http = presenton.client()
+    await presenton.generate({"export_as": "pdf"})
+
+    assert resultado["presentation_id"] == "abc"
+    assert presenton.client() is http
+    assert len(app.state.chamadas) == 4
+    assert presenton.make_url(resultado["path"]) == "http://presenton.local/static/deck.pptx"
+    await presenton.close()
+
+
+@pytest.mark.asyncio
+async def test_erro_4xx_nao_repete():
+    """Testa se erros do cliente falham na hora, sem retry e sem abrir o circuito."""
+    app = presenton_local([422])
+    presenton = cliente(app, retries=3, breaker=CircuitBreaker(failure_threshold=1))
+
+    with pytest.raises(PresentonError) as erro:
+        await presenton.generate({})
+    assert erro.value.status_code == 422
+    assert len(app.state.chamadas) == 1
+    assert presenton.breaker.state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_retry_em_timeout():
+    """Testa se timeouts também são repetidos."""
+    tentativas = []
+
+    def handler(request):
+        tentativas.append(request)
+        if len(tentativas) == 1:
+            raise httpx.ReadTimeout("timeout", request=request)
+        return httpx.Response(200, json={"path": "deck.pdf"})
+
+    presenton = PresentonClient(
+        "http://presenton.local", "chave", backoff_base=0, transport=httpx.MockTransport(handler)
+    )
+    assert (await presenton.generate({}))["path"] == "deck.pdf"
+    assert len(tentativas) == 2
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_falha_rapido_e_se_recupera():
+    """Testa se o circuito abre após falhas seguidas e fecha quando o Presenton volta."""
+    app = presenton_local([500] * 4)
+    presenton = cliente(app, retries=1, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=0.05))
+
+    for _ in range(2):
+        with pytest.raises(PresentonError):
+            await presenton.generate({})
+    assert presenton.breaker.state == "open"
+
+    with pytest.raises(CircuitOpenError):
+        await presenton.generate({})
+    assert len(app.state.chamadas) == 4
+
+    await asyncio.sleep(0.06)
+    assert presenton.breaker.state == "half-open"
+    await presenton.generate({})
+    assert presenton.breaker.state == "closed"
+
+
+def test_cliente_de_loop_anterior_e_fechado():
+    """Testa se o cliente HTTP criado em outro event loop é fechado ao ser trocado."""
+    presenton = cliente(presenton_local([]))
+
+    async def gera():
+        await presenton.generate({"export_as": "pptx"})
+        return presenton.client()
+
+    antigo = asyncio.run(gera())
+
+    async def gera_e_fecha():
+        novo = await gera()
+        await presenton.close()
+        return novo
+
+    novo = asyncio.run(gera_e_fecha())
+
+    assert novo is not antigo
+    assert antigo.is_closed and novo.is_closed
@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+from app.api.services import renderer
+from tests.mocks.lesson_plan_mock import MOCK_LESSON_PLAN
+
+
+@pytest.mark.asyncio
+async def test_render_em_processos_paralelos(monkeypatch):
+    """Testa se vários PDFs são renderizados ao mesmo tempo no pool de processos."""
+    monkeypatch.setenv("RENDER_POOL_SIZE", "2")
+    renderer.shutdown_render_pool()
+    try:
+        await renderer.warm_render_pool()
+        documentos = await asyncio.gather(
+            *[renderer.render_bytes("lesson-plan", "pdf", MOCK_LESSON_PLAN) for _ in range(4)]
+        )
+    finally:
+        renderer.shutdown_render_pool()
+
+    assert len(documentos) == 4
+    assert all(content.startswith(b"%PDF") for content in documentos)
+
+
+@pytest.mark.asyncio
+async def test_render_sem_pool_de_processos(monkeypatch):
+    """Testa o modo RENDER_POOL_SIZE=0 e a rejeição de tipos desconhecidos."""
+    monkeypatch.setenv("RENDER_POOL_SIZE", "0")
+    renderer.shutdown_render_pool()
+    content = await renderer.render_bytes("activity", "DOCX", {"title": "Teste"})
+    assert renderer.get_render_pool() is None
+    assert content.startswith(b"PK")
+
+    with pytest.raises(ValueError):
+        await renderer.render_bytes("certificado", "pdf", {})
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from app.api.services.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_chamadas_identicas_compartilham_geracao():
+    """Testa se requisições simultâneas com a mesma chave executam uma única geração."""
+    flights = SingleFlight()
+    chamadas = []
+
+    async def gerar():
+        chamadas.append(1)
+        await asyncio.sleep(0.05)
+        return {"titulo": "Frações"}
+
+    resultados = await asyncio.gather(*[flights.run("plano", gerar) for _ in range(10)])
+    assert len(chamadas) == 1
+    assert all(r == {"titulo": "Frações"} for r in resultados)
+    assert flights.in_flight() == 0
+
+
+@pytest.mark.asyncio
+async def test_erro_e_propagado_e_nao_fica_em_cache():
+    """Testa se uma falha chega a todos os participantes e a próxima chamada tenta de novo."""
+    flights = SingleFlight()
+    tentativas = []
+
+    async def falhar():
+        tentativas.append(1)
+        await asyncio.sleep(0.01)
+        raise ValueError("LLM indisponível")
+
+    resultados = await asyncio.gather(
+        flights.run("atividade", falhar), flights.run("atividade", falhar), return_exceptions=True
+    )
+    assert all(isinstance(r, ValueError) for r in resultados)
+    with pytest.raises(ValueError):
+        await flights.run("atividade", falhar)
+    assert len(tentativas) == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelamento_de_um_cliente_nao_cancela_os_demais():
+    """Testa se a desconexão de quem iniciou a geração não afeta quem está aguardando."""
+    flights = SingleFlight()
+
+    async def gerar():
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    primeiro = asyncio.create_task(flights.run("slides", gerar))
+    segundo = asyncio.create_task(flights.run("slides", gerar))
+    await asyncio.sleep(0.01)
+    primeiro.cancel()
+    assert await segundo == "ok"
@@ -0,0 +1,89 @@
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.api.routers import slides
+from app.api.services import generation_cache
+from app.api.services.generation_cache import GenerationCache
+from app.api.services.presenton import PresentonClient
+
+
+@pytest.fixture
+def presenton(tmp_path, monkeypatch):
+    """Presenton falso que registra cada exportação, e cache de geração temporário."""
+    monkeypatch.setattr(
+        generation_cache, "_generation_cache", GenerationCache(path=str(tmp_path / "g.sqlite3"))
+    )
+    chamadas = []
+
+    def handler(request):
+        payload = json.loads(request.content)
+        chamadas.append(payload["export_as"])
+        # Cada exportação cria uma apresentação nova no Presenton
+        presentation_id = f"p{len(chamadas)}"
+        return httpx.Response(200, json={
+            "path": f"/static/deck.{payload['export_as']}",
+            "edit_path": f"/edit/{presentation_id}",
+            "presentation_id": presentation_id,
+        })
+
+    client = PresentonClient("http://presenton.local", "chave", transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(slides, "get_presenton_client", lambda: client)
+    roteiros = []
+
+    async def gerar_roteiro(request, tone_instruction):
+        roteiros.append(request.topic)
+        return f"Roteiro sobre {request.topic}"
+
+    monkeypatch.setattr(slides, "generate_slide_content", gerar_roteiro)
+    return chamadas, roteiros
+
+
+@pytest.mark.asyncio
+async def test_deck_repetido_vem_do_cache_e_pdf_sob_demanda(presenton):
+    """Testa se só o pptx pedido é exportado, a repetição não chama o Presenton e o pdf sai depois, sob demanda."""
+    chamadas, roteiros = presenton
+    app = FastAPI()
+    app.include_router(slides.slides_router, prefix="/api/slides")
+    pedido = {"topic": "Frações", "serieAno": "6º ano", "formats": ["pptx"]}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as ac:
+        primeira = await ac.post("/api/slides/generate", json=pedido)
+        repetida = await ac.post("/api/slides/generate", json=pedido)
+        com_pdf = await ac.post("/api/slides/generate", json={**pedido, "formats": ["pdf"]})
+        padrao = await ac.post("/api/slides/generate", json={"topic": "Frações", "serieAno": "6º ano"})
+        invalido = await ac.post("/api/slides/generate", json={**pedido, "formats": []})
+
+    assert chamadas == ["pptx", "pdf"]
+    assert roteiros == ["Frações"]
+    assert primeira.headers["X-Cache"] == "MISS"
+    assert primeira.json()["pdf_url"] is None
+    assert primeira.json()["pptx_url"] == "http://presenton.local/static/deck.pptx"
+    assert repetida.headers["X-Cache"] == "HIT"
+    assert repetida.json() == primeira.json()
+
+    deck = com_pdf.json()
+    assert deck["pdf_url"] == "http://presenton.local/static/deck.pdf"
+    assert deck["pptx_url"] == primeira.json()["pptx_url"]
+    # O id principal continua sendo o do pptx; o pdf é outra apresentação
+    assert deck["presentation_id"] == "p1"
+    assert deck["edit_url"] == "http://presenton.local/edit/p1"
+    assert deck["presentations"]["pdf"] == {
+        "presentation_id": "p2",
+        "edit_url": "http://presenton.local/edit/p2",
+    }
+    assert padrao.headers["X-Cache"] == "HIT"
+    assert invalido.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_padrao_exporta_os_dois_formatos(presenton):
+    """Testa se, sem `formats`, pptx e pdf são exportados (comportamento usado pela interface)."""
+    chamadas, _ = presenton
+    resultado, cache_hit = await slides.run_slides(slides.SlideRequest(topic="Clima"))
+
+    assert sorted(chamadas) == ["pdf", "pptx"]
+    assert not cache_hit
+    assert resultado["pptx_url"] and resultado["pdf_url"]
@@ -0,0 +1,64 @@
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from llama_index.core.llms.mock import MockLLM
+
+from app.api.routers import unit
+from app.api.services import generation_cache, streaming
+from app.api.services.generation_cache import GenerationCache
+from app.engine.llm import astream_complete
+from tests.mocks.sse import ler_eventos
+
+PLANO = {"titulo": "Frações no cotidiano", "objetivos": ["Comparar frações"]}
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        generation_cache, "_generation_cache", GenerationCache(path=str(tmp_path / "g.sqlite3"))
+    )
+
+    async def prompt_falso(request):
+        return "prompt"
+
+    async def stream_falso(prompt):
+        texto = json.dumps(PLANO, ensure_ascii=False)
+        for i in range(0, len(texto), 10):
+            yield texto[i:i + 10]
+
+    monkeypatch.setattr(unit, "build_lesson_plan_prompt", prompt_falso)
+    monkeypatch.setattr(streaming, "astream_complete", stream_falso)
+    app = FastAPI()
+    app.include_router(unit.unit_router, prefix="/api/units")
+    return app
+
+
+@pytest.mark.asyncio
+async def test_astream_complete_consome_llm_sincrono_em_thread():
+    """Testa se o stream de um LLM sem API async chega em partes, sem bloquear o event loop."""
+    partes = [parte async for parte in astream_complete("plano de aula curto", llm=MockLLM())]
+    assert len(partes) > 1
+    assert "".join(partes) == "plano de aula curto"
+
+
+@pytest.mark.asyncio
+async def test_plano_de_aula_em_sse(app):
+    """Testa se o endpoint SSE envia os tokens, o objeto final validado e usa o cache na repetição."""
+    corpo = {"disciplina": "Matemática", "serieAno": "5º ano", "unidade": "Frações", "descricao": ""}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://teste") as client:
+        resposta = await client.post("/api/units/lesson-plan/stream", json=corpo)
+        assert resposta.headers["content-type"].startswith("text/event-stream")
+        assert resposta.headers["x-cache"] == "MISS"
+        eventos = ler_eventos(resposta.text)
+
+        repetida = await client.post("/api/units/lesson-plan/stream", json=corpo)
+        assert repetida.headers["x-cache"] == "HIT"
+
+    tokens = [dados["text"] for evento, dados in eventos if evento == "token"]
+    assert json.loads("".join(tokens)) == PLANO
+    assert ("item", {"field": "objetivos", "index": 0, "value": "Comparar frações"}) in eventos
+    assert eventos[-1] == ("result", {"conteudo": PLANO})
+    assert ler_eventos(repetida.text) == [("result", {"conteudo": PLANO})]
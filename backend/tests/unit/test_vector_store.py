@@ -0,0 +1,171 @@
+import numpy as np
+import pytest
+from llama_index.core.schema import NodeRelationship, RelatedNodeInfo, TextNode
+from llama_index.core.vector_stores import (
+    MetadataFilter,
+    MetadataFilters,
+    SimpleVectorStore,
+    VectorStoreQuery,
+)
+
+from app.engine.vector_store import MmapVectorStore
+
+CATEGORIAS = ["normativa", "apoio", "legal", "pedagogica"]
+
+
+def criar_nos(quantidade=200, dim=16):
+    rng = np.random.default_rng(42)
+    return [
+        TextNode(
+            id_=f"no-{i}",
+            text=f"trecho {i}",
+            embedding=rng.normal(size=dim).tolist(),
+            metadata={"category": CATEGORIAS[i % 4]},
+        )
+        for i in range(quantidade)
+    ]
+
+
+def filtros(*categorias):
+    return MetadataFilters(
+        filters=[MetadataFilter(key="category", value=c) for c in categorias],
+        condition="or",
+    )
+
+
+def test_resultados_iguais_ao_simple_vector_store():
+    """Testa se o top-k (com e sem filtros de categoria) coincide com o SimpleVectorStore."""
+    nos = criar_nos()
+    mmap_store, simple_store = MmapVectorStore(), SimpleVectorStore()
+    mmap_store.add(nos)
+    simple_store.add(nos)
+    consulta = np.random.default_rng(7).normal(size=16).tolist()
+
+    for filtro in [None, filtros("normativa", "apoio")]:
+        query = VectorStoreQuery(query_embedding=consulta, similarity_top_k=5, filters=filtro)
+        esperado = simple_store.query(query)
+        obtido = mmap_store.query(query)
+        assert obtido.ids == esperado.ids
+        assert np.allclose(obtido.similarities, esperado.similarities, atol=1e-5)
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16"])
+def test_persistencia_carrega_com_mmap(tmp_path, dtype):
+    """Testa se o store persistido é carregado por mmap, sem cópia, e responde igual."""
+    store = MmapVectorStore(dtype=dtype)
+    store.add(criar_nos())
+    store.persist(str(tmp_path / "default__vector_store.json"))
+    assert MmapVectorStore.exists(str(tmp_path))
+
+    carregado = MmapVectorStore.from_persist_dir(str(tmp_path))
+    assert isinstance(carregado.matrix, np.memmap)
+    assert carregado.matrix.dtype == np.dtype(dtype)
+
+    consulta = np.random.default_rng(7).normal(size=16).tolist()
+    query = VectorStoreQuery(query_embedding=consulta, similarity_top_k=3, filters=filtros("legal"))
+    assert carregado.query(query).ids == store.query(query).ids
+
+
+def test_remocao_por_documento(tmp_path):
+    """Testa se delete remove apenas os vetores do documento, inclusive após carregar via mmap."""
+    nos = criar_nos(quantidade=6)
+    for i, no in enumerate(nos):
+        no.relationships = {NodeRelationship.SOURCE: RelatedNodeInfo(node_id=f"doc-{i % 2}")}
+    store = MmapVectorStore()
+    store.add(nos)
+    store.persist(str(tmp_path / "default__vector_store.json"))
+    carregado = MmapVectorStore.from_persist_dir(str(tmp_path))
+
+    carregado.delete("doc-0")
+    assert carregado.node_count == 3
+    consulta = VectorStoreQuery(query_embedding=nos[0].embedding, similarity_top_k=6)
+    assert sorted(carregado.query(consulta).ids) == ["no-1", "no-3", "no-5"]
+
+
+def test_particoes_por_categoria(tmp_path):
+    """Testa se as categorias ficam contíguas no arquivo e se filtros mistos continuam corretos."""
+    nos = criar_nos()
+    for i, no in enumerate(nos):
+        no.metadata["private"] = "true" if i % 3 == 0 else "false"
+    store, simple_store = MmapVectorStore(), SimpleVectorStore()
+    store.add(nos)
+    simple_store.add(nos)
+    store.persist(str(tmp_path / "default__vector_store.json"))
+    carregado = MmapVectorStore.from_persist_dir(str(tmp_path))
+
+    for categoria, linhas in carregado.partitions().items():
+        assert all(carregado._metadata[linha]["category"] == categoria for linha in linhas)
+        assert linhas[-1] - linhas[0] + 1 == len(linhas)
+
+    consulta = np.random.default_rng(3).normal(size=16).tolist()
+    mistos = MetadataFilters(
+        filters=[
+            MetadataFilter(key="category", value="apoio"),
+            MetadataFilter(key="private", value="false"),
+        ]
+    )
+    for filtro in [filtros("pedagogica", "legal"), mistos, filtros("inexistente")]:
+        query = VectorStoreQuery(query_embedding=consulta, similarity_top_k=4, filters=filtro)
+        assert carregado.query(query).ids == simple_store.query(query).ids
+
+
+def test_indice_aproximado(tmp_path):
+    """Testa o IVF: gravado só acima do mínimo, exato com todas as listas sondadas e bom recall."""
+    persist_path = str(tmp_path / "default__vector_store.json")
+    nos = criar_nos(quantidade=2000)
+    consultas = np.random.default_rng(11).normal(size=(20, 16))
+
+    pequeno = MmapVectorStore(ann_min_nodes=5000)
+    pequeno.add(nos)
+    pequeno.persist(persist_path)
+    assert not (tmp_path / "default__mmap_ivf.npz").exists()
+
+    exato = MmapVectorStore(ann_min_nodes=0)
+    exato.add(nos)
+    store = MmapVectorStore(ann_min_nodes=1000, ann_nlist=20)
+    store.add(nos)
+    store.persist(persist_path)
+    assert (tmp_path / "default__mmap_ivf.npz").exists()
+
+    completo = MmapVectorStore.from_persist_dir(str(tmp_path), ann_nprobe=20)
+    parcial = MmapVectorStore.from_persist_dir(str(tmp_path), ann_nprobe=5)
+    assert completo.uses_ann and parcial.uses_ann
+
+    acertos = 0
+    for consulta in consultas:
+        for filtro in [None, filtros("apoio")]:
+            query = VectorStoreQuery(
+                query_embedding=consulta.tolist(), similarity_top_k=10, filters=filtro
+            )
+            esperado = exato.query(query).ids
+            assert completo.query(query).ids == esperado
+            acertos += len(set(parcial.query(query).ids) & set(esperado))
+    assert acertos / (len(consultas) * 2 * 10) > 0.5
+
+
+def test_insercao_pela_matriz_do_embedding():
+    """Testa se a matriz do `embed_matrix` vai direto para o store, com o mesmo resultado do llama-index."""
+    from llama_index.core import StorageContext, VectorStoreIndex
+
+    from app.engine.vector_store import insert_nodes
+    from app.settings import _SimpleLocalEmbedding
+
+    class EmbeddingSemListas(_SimpleLocalEmbedding):
+        def get_text_embedding_batch(self, texts, show_progress=False, **kwargs):
+            raise AssertionError("o lote não deveria passar por listas de floats")
+
+    def indexar(embedding, inserir):
+        nos = [TextNode(id_=f"no-{i}", text=f"trecho {i}") for i in range(20)]
+        contexto = StorageContext.from_defaults(vector_store=MmapVectorStore())
+        index = VectorStoreIndex(nodes=[], storage_context=contexto, embed_model=embedding)
+        inserir(index, nos)
+        return index
+
+    rapido = indexar(EmbeddingSemListas(dim=16), lambda index, nos: insert_nodes(index, nos, index._embed_model))
+    normal = indexar(_SimpleLocalEmbedding(dim=16), lambda index, nos: index.insert_nodes(nos))
+
+    consulta = _SimpleLocalEmbedding(dim=16).get_query_embedding("trecho 3")
+    query = VectorStoreQuery(query_embedding=consulta, similarity_top_k=5)
+    assert rapido.vector_store.query(query).ids == normal.vector_store.query(query).ids
+    assert rapido.docstore.get_node("no-3").get_content() == "trecho 3"
+    assert rapido.docstore.get_node("no-3").embedding is None